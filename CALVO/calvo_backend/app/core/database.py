@@ -1,23 +1,151 @@
 # File: app/core/database.py
 # Purpose: Database connection session handling.
 
-from sqlalchemy import create_engine
+import logging
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import sqlite, postgresql
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.core import metrics
 
-# 1. Create Engine
-# connect_args={"check_same_thread": False} is required for SQLite
+logger = logging.getLogger(__name__)
+
+# Sync driver -> async driver used by the non-blocking request paths
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def normalize_url(url: str) -> str:
+    """
+    Accepts the "postgres://" scheme many hosts hand out (SQLAlchemy only knows "postgresql://").
+    """
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+def to_async_url(url: str) -> str:
+    """
+    Maps a sync DATABASE_URL onto its asyncio driver (e.g. sqlite -> sqlite+aiosqlite).
+    URLs that already name an async driver are returned unchanged.
+    """
+    scheme, sep, rest = normalize_url(url).partition("://")
+    if scheme not in ASYNC_DRIVERS:
+        return normalize_url(url)
+    return f"{ASYNC_DRIVERS[scheme]}{sep}{rest}"
+
+def engine_options(url: str) -> dict:
+    """
+    Dialect-specific create_engine() arguments, chosen from the URL.
+    - SQLite: connections are shared across threads; SQLAlchemy picks the pool class itself.
+    - Server databases (PostgreSQL): sized, pre-pinged and recycled connection pool.
+    """
+    url = normalize_url(url)
+    scheme = url.partition("://")[0]
+    if scheme.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if scheme == "postgresql+asyncpg":
+        options["connect_args"] = {
+            "timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+            "server_settings": {"application_name": settings.PROJECT_NAME},
+        }
+    elif scheme.startswith("postgresql"):
+        options["connect_args"] = {
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+            "application_name": settings.PROJECT_NAME,
+        }
+    return options
+
+# 1. Create Engine (startup tasks, migrations and the remaining sync endpoints)
 engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    normalize_url(settings.DATABASE_URL),
+    echo=settings.DB_ECHO,
+    **engine_options(settings.DATABASE_URL)
 )
 
 # 2. Create Session Factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 3. Base Class for Models
+# 3. Async Engine + Session Factory (used by the webhook pipeline)
+ASYNC_DATABASE_URL = to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.DB_ECHO,
+    **engine_options(ASYNC_DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 3b. SQLite concurrent mode (SQLITE_MODE="concurrent"): WAL lets readers run while a
+#     write is in progress, and the group-commit writer below turns many small
+#     request transactions into one commit.
+SQLITE_CONCURRENT_MODE = settings.SQLITE_MODE == "concurrent" and engine.dialect.name == "sqlite"
+
+def sqlite_pragmas() -> list[str]:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",    # Durable across app crashes; fsync at checkpoints only
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+def _apply_sqlite_busy_timeout(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _sqlite_disable_implicit_begin(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+if SQLITE_CONCURRENT_MODE:
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+elif engine.dialect.name == "sqlite":
+    # Default mode keeps the stock pragmas, but a writer still waits for the lock instead of failing
+    event.listen(engine, "connect", _apply_sqlite_busy_timeout)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_busy_timeout)
+
+# Execution option set by unit_of_work(): the transaction is opened with BEGIN IMMEDIATE
+SQLITE_WRITE_TRANSACTION = {"sqlite_begin": "IMMEDIATE"}
+
+if async_engine.dialect.name == "sqlite":
+    # pysqlite/aiosqlite defer BEGIN and mishandle SAVEPOINT; let SQLAlchemy emit BEGIN itself
+    # so begin_nested() (per-item savepoints in batch ingestion) works as documented.
+    event.listen(async_engine.sync_engine, "connect", _sqlite_disable_implicit_begin)
+
+    @event.listens_for(async_engine.sync_engine, "begin")
+    def _sqlite_explicit_begin(conn):
+        # Reads keep a deferred BEGIN. Write units of work take the write lock up front: a deferred
+        # transaction that read first cannot be upgraded while another one writes, and SQLite
+        # fails it with "database is locked" at once instead of waiting out busy_timeout.
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', '')}".rstrip())
+
+# 4. Base Class for Models
 Base = declarative_base()
 
+# INSERT with on_conflict_do_update / on_conflict_do_nothing, per dialect (one statement, no SELECT first)
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
 # Dependency to get DB session in API endpoints
 def get_db():
     db = SessionLocal()
@@ -25,4 +153,200 @@ def get_db():
         # BREAKPOINT: Log database access if needed for debugging
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async dependency: never blocks the event loop on database I/O
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@asynccontextmanager
+async def unit_of_work(db: AsyncSession):
+    """
+    One transaction per request: services only add / flush, the block commits once.
+    Any error rolls back everything done inside it.
+    On SQLite the transaction is opened with BEGIN IMMEDIATE (unless the session already has one).
+    """
+    if db.get_bind().dialect.name == "sqlite" and not db.in_transaction():
+        await db.connection(execution_options=SQLITE_WRITE_TRANSACTION)
+    try:
+        yield db
+        with metrics.stage_timer("db_commit"):
+            await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+
+
+class WriterStopped(RuntimeError):
+    """
+    The group-commit writer stopped before it started this write (safe to run it elsewhere).
+    """
+
+
+class GroupCommitWriter:
+    """
+    Single writer task for SQLite concurrent mode.
+    Requests submit a write function (async fn(db) -> result). The writer collects
+    whatever arrived within SQLITE_GROUP_COMMIT_WINDOW_MS (up to SQLITE_GROUP_COMMIT_MAX_BATCH),
+    runs each function in its own savepoint on one connection and commits once.
+    A failing function only rolls back its own savepoint; its caller gets the exception.
+    If the batch itself fails (session, rollback), its callers get the error and the writer stops;
+    writes still queued get WriterStopped, and run_write falls back to a unit of work.
+    """
+
+    def __init__(self, max_batch: int, window_ms: float):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._queue = None
+        self._task = None
+        self._engine = None
+        self._session_factory = None
+
+        self.commits = 0
+        self.writes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        # Dedicated connection; BEGIN IMMEDIATE takes the write lock up front, so the
+        # read-then-write work inside a batch can never fail with SQLITE_BUSY mid-transaction
+        self._engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=1, max_overflow=0,
+                                           connect_args={"check_same_thread": False})
+        event.listen(self._engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        event.listen(self._engine.sync_engine, "connect", _sqlite_disable_implicit_begin)
+        event.listen(self._engine.sync_engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN IMMEDIATE"))
+        self._session_factory = async_sessionmaker(self._engine, autoflush=False, expire_on_commit=False)
+
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Writes everything already queued, then closes the connection.
+        New writes go to run_write's unit of work right away.
+        """
+        task, self._task = self._task, None
+        if task and not task.done():
+            self._queue.put_nowait(None)  # Marker: everything before it is still written
+            await task
+        if self._engine:
+            await self._engine.dispose()
+            self._engine = None
+
+    async def submit(self, work):
+        if not self.is_running:
+            raise WriterStopped()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((work, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "writes": self.writes,
+            "avg_batch": self.writes / self.commits if self.commits else 0.0,
+        }
+
+    async def _collect(self) -> tuple[list, bool]:
+        """
+        (batch, closing): closing once stop()'s marker was reached.
+        """
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        batch = []
+        try:
+            while True:
+                batch, closing = await self._collect()
+                if batch:
+                    try:
+                        outcomes = await self._write(batch)
+                    except Exception as e:
+                        logger.exception("Group-commit writer failed; writes fall back to per-request transactions")
+                        metrics.record_error("db_commit")
+                        self._resolve([(future, None, e) for _, future in batch])
+                        batch = []
+                        return
+                    self._resolve(outcomes)
+                    batch = []
+                if closing:
+                    return
+        finally:
+            # Cancelled mid-batch: the outcome is unknown, so those callers get an error (no retry).
+            # Never started: WriterStopped, run_write runs them in a unit of work.
+            self._resolve([(future, None, RuntimeError("Group-commit writer stopped during the write"))
+                           for _, future in batch])
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not None:
+                    self._resolve([(item[1], None, WriterStopped())])
+
+    async def _write(self, batch: list) -> list:
+        outcomes = []
+        async with self._session_factory() as db:
+            for work, future in batch:
+                try:
+                    async with db.begin_nested():
+                        outcomes.append((future, await work(db), None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            try:
+                with metrics.stage_timer("db_commit"):
+                    await db.commit()
+            except Exception as e:
+                logger.error("Group commit of %d writes failed: %s", len(batch), e)
+                metrics.record_error("db_commit")
+                await db.rollback()
+                outcomes = [(future, None, e) for future, _, _ in outcomes]
+
+        self.commits += 1
+        self.writes += len(batch)
+        return outcomes
+
+    @staticmethod
+    def _resolve(outcomes: list):
+        for future, result, error in outcomes:
+            if future.done():
+                continue  # Caller went away (request cancelled)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+group_writer = GroupCommitWriter(
+    max_batch=settings.SQLITE_GROUP_COMMIT_MAX_BATCH,
+    window_ms=settings.SQLITE_GROUP_COMMIT_WINDOW_MS
+)
+
+async def run_write(db: AsyncSession, work):
+    """
+    Runs an ingestion write (async fn(db) -> result) as one unit of work.
+    In SQLite concurrent mode it is handed to the group-commit writer instead.
+    """
+    if group_writer.is_running:
+        try:
+            return await group_writer.submit(work)
+        except WriterStopped:
+            pass  # Stopped before this write ran: one transaction of its own instead
+    async with unit_of_work(db):
+        return await work(db)
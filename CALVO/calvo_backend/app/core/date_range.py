@@ -0,0 +1,17 @@
+# File: app/core/date_range.py
+# Purpose: Report date range query parameters shared by the report routers (finance, usage).
+# Language: English
+
+from datetime import date, timedelta
+from fastapi import HTTPException, status
+
+
+def resolve_range(start: date | None, end: date | None) -> tuple[date, date]:
+    """
+    Defaults to the last 30 days ending today.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    return start, end
@@ -0,0 +1,163 @@
+# File: app/core/logger.py
+# Purpose: Non-blocking, structured logging for the whole app.
+# Responsibility: Request paths only enqueue records (bounded queue, drop when full);
+#                 a listener thread redacts PII, formats and writes them.
+# Usage: logger = logging.getLogger(__name__), then logger.debug / info / warning with %-style args.
+# Language: English
+
+import re
+import sys
+import json
+import queue
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.config import settings
+from app.core import metrics
+
+# Root of every app logger (module loggers are named after their module: app.modules.gatekeeper.agent, ...)
+APP_LOGGER = "app"
+
+# Notification content carries account numbers, balances, phone numbers and e-mail addresses
+PII_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"(?:\+84|\b0)\d{9,10}\b"), "<phone>"),
+    (re.compile(r"[*xX]{2,}\d{2,}"), "<acct>"),
+    (re.compile(r"\b\d{8,}\b"), "<number>"),
+    (re.compile(r"\b(SD|So du|Số dư|Balance)(\s*:?\s*)[+-]?[\d.,]+", re.IGNORECASE), r"\1\2<balance>"),
+]
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in PII_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler on a bounded queue: when the writer falls behind, records are dropped
+    (and counted) instead of blocking the event loop or growing memory.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only freeze the message (args may be mutated after the call);
+        # formatting and redaction happen on the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps a fraction of DEBUG records (the per-notification lines on hot paths).
+    INFO and above always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class RedactingFormatter(logging.Formatter):
+    """
+    "text": 2026-10-18 10:22:01 INFO app.modules.mobile.services | message key=value
+    "json": one object per line with time, level, logger, message and the extra={...} fields.
+    """
+
+    def __init__(self, output_format: str, redact_pii: bool, max_chars: int):
+        super().__init__()
+        self.output_format = output_format
+        self.redact_pii = redact_pii
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES}
+        message = self._clean(message)
+        fields = {k: self._clean(str(v)) if isinstance(v, str) else v for k, v in fields.items()}
+
+        timestamp = datetime.fromtimestamp(record.created, tz=timezone.utc)
+        if self.output_format == "json":
+            return json.dumps({
+                "time": timestamp.isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": message,
+                **fields,
+            }, ensure_ascii=False, default=str)
+
+        extras = "".join(f" {k}={v}" for k, v in fields.items())
+        return f"{timestamp:%Y-%m-%d %H:%M:%S} {record.levelname} {record.name} | {message}{extras}"
+
+    def _clean(self, text: str) -> str:
+        if self.redact_pii:
+            text = redact(text)
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + "...(truncated)"
+        return text
+
+
+_handler = None
+_listener = None
+
+
+def setup_logging():
+    """
+    Configures the "app" logger tree on first call and (re)starts the writer thread.
+    Called on app startup; idempotent.
+    """
+    global _handler, _listener
+    if _handler is None:
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+        root = logging.getLogger(APP_LOGGER)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        root.addHandler(_handler)
+        root.propagate = False
+        for name, level in settings.LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        metrics.registry.gauge_function(
+            "calvo_log_records_dropped", "Log records dropped because the log queue was full.", (),
+            lambda: {(): _handler.dropped}
+        )
+
+    if _listener is None:
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(RedactingFormatter(
+            settings.LOG_FORMAT, settings.LOG_REDACT_PII, settings.LOG_MAX_MESSAGE_CHARS
+        ))
+        _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """
+    Writes what is still queued and stops the writer thread (called on app shutdown).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,249 @@
+# File: app/core/metrics.py
+# Purpose: In-process metrics (counters, histograms, scrape-time gauges) rendered as Prometheus text.
+# Responsibility: Cheap enough for the hot path: a bisect and two list updates per observation, no I/O.
+# Note: Updates take no lock. They happen on the event loop; the rare update from a worker thread
+#       may lose an increment under contention, which is acceptable for monitoring.
+# Language: English
+
+import logging
+import time
+import bisect
+import functools
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds. Covers cache hits (sub-ms) up to slow LLM calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, one value per label combination.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> list:
+        items = sorted(list(self._values.items()))
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics), one series per label combination.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        items = sorted((labels, list(series)) for labels, series in list(self._series.items()))
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class GaugeFunction:
+    """
+    Gauge read at scrape time: fn() -> {labelvalues tuple: value}. Used for cache statistics,
+    so the caches keep their own plain counters and pay nothing extra per lookup.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, fn):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> list:
+        try:
+            items = sorted(self.fn().items())
+        except Exception as e:
+            logger.warning("Gauge %s failed: %s", self.name, e)
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._caches = {}   # cache name -> stats() callable
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_function(self, name: str, help_text: str, labelnames: tuple, fn) -> GaugeFunction:
+        return self._register(GaugeFunction(name, help_text, labelnames, fn))
+
+    def register_cache(self, cache_name: str, stats_fn):
+        """
+        stats_fn() -> dict with at least "hits" and "misses" (the caches' existing stats()).
+        """
+        self._caches[cache_name] = stats_fn
+
+    def cache_stats(self) -> dict:
+        return {name: stats_fn() for name, stats_fn in self._caches.items()}
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "calvo_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+STAGE_SECONDS = registry.histogram(
+    "calvo_stage_duration_seconds", "Latency of one pipeline stage.", ("stage",)
+)
+LLM_TOKENS = registry.counter(
+    "calvo_llm_tokens_total", "Tokens reported by the model API.", ("agent", "kind")
+)
+LLM_CALLS = registry.counter(
+    "calvo_llm_calls_total", "Successful model API calls.", ("agent",)
+)
+ERRORS = registry.counter(
+    "calvo_errors_total", "Exceptions caught and handled inside a stage.", ("stage",)
+)
+FALLBACKS = registry.counter(
+    "calvo_fallbacks_total", "Degraded answers returned instead of a model / parser result.", ("stage", "reason")
+)
+
+
+def _cache_gauge(field: str):
+    def collect() -> dict:
+        return {(name,): stats.get(field, 0) for name, stats in registry.cache_stats().items()}
+    return collect
+
+
+registry.gauge_function("calvo_cache_hits", "Cache hits since start.", ("cache",), _cache_gauge("hits"))
+registry.gauge_function("calvo_cache_misses", "Cache misses since start.", ("cache",), _cache_gauge("misses"))
+registry.gauge_function("calvo_cache_hit_ratio", "hits / (hits + misses) since start.", ("cache",), _cache_gauge("hit_rate"))
+
+
+# --- Helpers used by the services ---
+
+def stage_timer(stage: str):
+    """
+    with stage_timer("fx_convert"): ...
+    """
+    return STAGE_SECONDS.time(stage)
+
+
+def timed(stage: str):
+    """
+    Decorator recording the duration of an async function as a pipeline stage.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        return wrapper
+    return decorate
+
+
+def record_llm_usage(agent: str, response):
+    """
+    Counts one successful model call and its token usage (if the API reported any).
+    """
+    LLM_CALLS.inc(agent)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    LLM_TOKENS.inc(agent, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    LLM_TOKENS.inc(agent, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_error(stage: str):
+    ERRORS.inc(stage)
+
+
+def record_fallback(stage: str, reason: str):
+    FALLBACKS.inc(stage, reason)
+
+
+def render() -> str:
+    return registry.render()
+
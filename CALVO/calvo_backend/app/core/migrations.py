@@ -0,0 +1,123 @@
+# File: app/core/migrations.py
+# Purpose: Lightweight schema upgrade for existing databases (e.g. an old calvo.db).
+# Note: Base.metadata.create_all() only creates missing TABLES. Columns and indexes
+#       added to the models later are applied here. Safe to run on every startup.
+# Usage: python -m app.core.migrations
+
+import logging
+from sqlalchemy import inspect, text, select, update, delete, func
+from app.core.database import engine, Base
+# Every model registered on Base.metadata (the model modules only, no app / agent imports)
+from app.modules.finance.models import Account, Transaction, DailySpendingRollup
+from app.modules.gatekeeper import models as gatekeeper_models  # noqa: F401
+from app.modules.schedule import models as schedule_models  # noqa: F401
+from app.modules.usage import models as usage_models  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+def merge_duplicate_accounts(conn) -> int:
+    """
+    Before ux_accounts_user_institution: accounts sharing (user_id, institution_name) are merged
+    into the oldest one (balances added, transactions and rollups moved). Returns accounts removed.
+    """
+    groups = conn.execute(
+        select(Account.user_id, Account.institution_name, func.min(Account.id))
+        .group_by(Account.user_id, Account.institution_name).having(func.count(Account.id) > 1)
+    ).all()
+    tables = set(inspect(conn).get_table_names())
+    removed = 0
+    for user_id, institution_name, keep_id in groups:
+        duplicates = conn.execute(
+            select(Account.id, Account.balance).where(
+                Account.user_id == user_id, Account.institution_name == institution_name, Account.id != keep_id
+            )
+        ).all()
+        duplicate_ids = [account_id for account_id, _ in duplicates]
+        conn.execute(
+            update(Account).where(Account.id == keep_id)
+            .values(balance=func.coalesce(Account.balance, 0.0) + sum(balance or 0.0 for _, balance in duplicates))
+        )
+        conn.execute(update(Transaction).where(Transaction.account_id.in_(duplicate_ids)).values(account_id=keep_id))
+        if DailySpendingRollup.__tablename__ in tables:
+            _move_rollups(conn, duplicate_ids, keep_id)
+        conn.execute(delete(Account).where(Account.id.in_(duplicate_ids)))
+        removed += len(duplicate_ids)
+    if removed:
+        logger.warning("Merged %d duplicate accounts into %d", removed, len(groups))
+    return removed
+
+
+def _move_rollups(conn, from_ids: list[int], to_id: int):
+    # Added to the kept account's bucket when it has one, re-pointed otherwise
+    rollup = DailySpendingRollup
+    rows = conn.execute(select(rollup).where(rollup.account_id.in_(from_ids))).all()
+    for row in rows:
+        merged = conn.execute(
+            update(rollup).where(
+                rollup.user_id == row.user_id, rollup.account_id == to_id,
+                rollup.day == row.day, rollup.type_of_transaction == row.type_of_transaction
+            ).values(total_amount=rollup.total_amount + (row.total_amount or 0.0),
+                     tx_count=rollup.tx_count + (row.tx_count or 0))
+        ).rowcount
+        if merged:
+            conn.execute(delete(rollup).where(rollup.id == row.id))
+        else:
+            conn.execute(update(rollup).where(rollup.id == row.id).values(account_id=to_id))
+
+
+# Data fixes a unique index needs before it can be created
+BEFORE_INDEX = {
+    "ux_accounts_user_institution": merge_duplicate_accounts,
+}
+
+
+def upgrade_schema(bind=engine) -> dict:
+    """
+    Adds missing nullable columns and missing indexes to existing tables.
+    Returns what was changed. A unique index that still cannot be created fails the upgrade:
+    the code relies on it (insert ... on conflict).
+    """
+    added_columns = []
+    added_indexes = []
+    inspector = inspect(bind)
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue  # create_all() creates it with everything
+
+            # 1. Columns
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if column.primary_key or (not column.nullable and column.server_default is None):
+                    logger.warning("Cannot add required column %s.%s; skipped", table.name, column.name)
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added_columns.append(f"{table.name}.{column.name}")
+
+            # 2. Indexes (declared with index=True or in __table_args__)
+            existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                if index.name in BEFORE_INDEX:
+                    BEFORE_INDEX[index.name](conn)
+                index.create(conn, checkfirst=True)
+                added_indexes.append(index.name)
+
+        # Refresh planner statistics so SQLite actually picks the new indexes
+        if added_indexes and bind.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+    if added_columns or added_indexes:
+        logger.info("Added columns: %s | Added indexes: %s", added_columns, added_indexes)
+    return {"columns": added_columns, "indexes": added_indexes}
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
@@ -2,12 +2,14 @@
 # Purpose: JWT Authentication AND Source Verification Logic.
 # Language: English
 
+import secrets
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.modules.finance.models import Account
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.modules.finance.account_cache import account_index
 
 SECRET_KEY = "CHANGE_THIS_IN_PRODUCTION"
 ALGORITHM = "HS256"
@@ -30,18 +32,28 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
             detail="Invalid authentication token"
         )
 
+def require_admin(x_admin_token: str | None = Header(None)):
+    """
+    Operator endpoints covering every user: X-Admin-Token must match ADMIN_API_TOKEN
+    (no token configured = the endpoints are disabled).
+    """
+    expected = settings.ADMIN_API_TOKEN
+    if not expected or not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
 # --- NEW FUNCTION ADDED FOR GATEKEEPER ---
-def verify_source_trust(db: Session, user_id: int, source_app: str) -> dict:
+async def verify_source_trust(db: AsyncSession, user_id: int, source_app: str) -> dict:
     """
     Checks if the source_app exists in the user's registered financial whitelist.
+    O(1) lookup in the per-user account index (loaded from the DB once per user).
     """
-    trusted_accounts = db.query(Account).filter(Account.user_id == user_id).all()
-    whitelist = [acc.institution_name.lower() for acc in trusted_accounts]
-
-    if source_app.lower() in whitelist:
+    if await account_index.is_trusted(db, user_id, source_app):
         return {"is_trusted": True, "reason": "Verified Source"}
     
     return {
         "is_trusted": False, 
         "reason": f"UNTRUSTED SOURCE: '{source_app}' is not in your registered accounts."
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,306 @@
+# File: app/core/tracing.py
+# Purpose: Sampled, batched tracing for agent calls and routes (replaces opik.track).
+# Responsibility: The decorated call only records a span in memory; a background thread
+#                 exports spans in batches. Unsampled calls and the "none" backend cost ~nothing.
+# Backends: "opik" (needs the opik package + OPIK_API_KEY), "log" (one log line per span), "none".
+# Language: English
+
+import time
+import queue
+import random
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from uuid import uuid4
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core import metrics
+from app.core.logger import redact
+
+logger = logging.getLogger(__name__)
+
+# Longest repr kept for one traced argument / result
+MAX_FIELD_CHARS = 300
+
+# Set while a traced call is running: its span when sampled, NOT_SAMPLED otherwise.
+# Nested traced calls follow it instead of re-sampling (a trace is recorded whole or not at all)
+_current_span = contextvars.ContextVar("current_span", default=None)
+NOT_SAMPLED = object()
+
+
+@dataclass
+class Span:
+    name: str
+    route: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid4().hex)
+    parent_id: str | None = None
+    start_time: datetime = None
+    end_time: datetime = None
+    duration_ms: float = 0.0
+    input: dict = field(default_factory=dict)
+    output: dict | None = None
+    error: str | None = None
+
+
+def _summarize(value) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return redact(text[:MAX_FIELD_CHARS])
+
+
+# --- Backends ---
+
+class NoopBackend:
+    name = "none"
+
+    def export(self, spans: list):
+        pass
+
+    def flush(self):
+        pass
+
+
+class LogBackend:
+    name = "log"
+
+    def export(self, spans: list):
+        for span in spans:
+            logger.info("span %s route=%s %.1f ms error=%s", span.name, span.route, span.duration_ms, span.error)
+
+    def flush(self):
+        pass
+
+
+class OpikBackend:
+    """
+    One Opik trace per span (parent / trace ids go into the metadata).
+    """
+
+    name = "opik"
+
+    def __init__(self):
+        import opik  # Optional: only needed when this backend is selected
+        self.client = opik.Opik(project_name=settings.OPIK_PROJECT_NAME, api_key=settings.OPIK_API_KEY or None,
+                                _show_misconfiguration_message=False)
+
+    def export(self, spans: list):
+        for span in spans:
+            self.client.trace(
+                name=span.name,
+                start_time=span.start_time,
+                end_time=span.end_time,
+                input=span.input,
+                output=span.output,
+                metadata={"route": span.route, "trace_id": span.trace_id,
+                          "span_id": span.span_id, "parent_id": span.parent_id},
+                error_info={"exception_type": "Exception", "message": span.error, "traceback": ""} if span.error else None,
+            )
+
+    def flush(self):
+        self.client.flush()
+
+
+def create_backend(name: str):
+    if name == "auto":
+        name = "opik" if settings.OPIK_API_KEY else "none"
+    if name == "opik":
+        try:
+            return OpikBackend()
+        except Exception as e:
+            logger.warning("Opik tracing unavailable (%s); spans are discarded", e)
+            return NoopBackend()
+    if name == "log":
+        return LogBackend()
+    return NoopBackend()
+
+
+# --- Exporter ---
+
+class BatchSpanExporter:
+    """
+    Bounded buffer + one daemon thread. The request path only does put_nowait;
+    when the buffer is full the span is dropped (and counted), never waited on.
+    The thread sends up to TRACING_BATCH_SIZE spans per export, at least every flush interval.
+    """
+
+    def __init__(self, backend, buffer_size: int, batch_size: int, flush_interval: float):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = queue.Queue(maxsize=buffer_size)
+        self._thread = None
+        self._stopping = threading.Event()
+
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running or isinstance(self.backend, NoopBackend):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Exports what is buffered, then stops the thread.
+        """
+        if not self.is_running:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, span: Span):
+        try:
+            self._buffer.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, "buffered": self._buffer.qsize(),
+                "exported": self.exported, "dropped": self.dropped, "failed": self.failed}
+
+    def _take_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or (self._stopping.is_set() and self._buffer.empty()):
+                break
+            try:
+                batch.append(self._buffer.get(timeout=min(timeout, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._buffer.empty()):
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                self.backend.export(batch)
+                self.backend.flush()
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.warning("Exporting %d spans failed: %s", len(batch), e)
+
+
+exporter = BatchSpanExporter(
+    backend=create_backend(settings.TRACING_BACKEND),
+    buffer_size=settings.TRACING_BUFFER_SIZE,
+    batch_size=settings.TRACING_BATCH_SIZE,
+    flush_interval=settings.TRACING_FLUSH_INTERVAL_SECONDS
+)
+
+metrics.registry.gauge_function(
+    "calvo_spans", "Spans by outcome since start.", ("outcome",),
+    lambda: {("exported",): exporter.exported, ("dropped",): exporter.dropped, ("failed",): exporter.failed}
+)
+
+
+# --- Decorator ---
+
+def route_enabled(route: str) -> bool:
+    return settings.TRACING_ROUTES.get(route, True)
+
+
+def _start_span(name: str, route: str, fn, args, kwargs) -> Span | None:
+    """
+    Returns a span to fill in, or None when this call is not traced.
+    A call inside a traced call follows its parent (complete traces); a top-level call is sampled.
+    """
+    parent = _current_span.get()
+    if parent is NOT_SAMPLED:
+        return None
+    if parent is None and random.random() >= settings.TRACING_SAMPLE_RATE:
+        return None
+    try:
+        bound = inspect.signature(fn).bind_partial(*args, **kwargs)
+        arguments = {k: _summarize(v) for k, v in bound.arguments.items() if k != "db"}
+    except TypeError:
+        arguments = {}
+    return Span(
+        name=name, route=route,
+        trace_id=parent.trace_id if parent else uuid4().hex,
+        parent_id=parent.span_id if parent else None,
+        start_time=datetime.now(timezone.utc),
+        input=arguments,
+    )
+
+
+def _finish_span(span: Span, started: float, result=None, error: BaseException = None):
+    span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    span.end_time = datetime.now(timezone.utc)
+    if error is not None:
+        span.error = f"{type(error).__name__}: {_summarize(str(error))}"
+    else:
+        span.output = {"result": _summarize(result)}
+    exporter.submit(span)
+
+
+def trace(name: str, route: str):
+    """
+    @trace("Gatekeeper Classification", route="gatekeeper.classify")
+    "none" backend or disabled route (TRACING_ROUTES) -> the function is returned undecorated.
+    """
+    def decorate(fn):
+        if isinstance(exporter.backend, NoopBackend) or not route_enabled(route):
+            return fn
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                span = _start_span(name, route, fn, args, kwargs)
+                if span is None:
+                    token = _current_span.set(NOT_SAMPLED)
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        _current_span.reset(token)
+                token = _current_span.set(span)
+                started = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    _finish_span(span, started, error=e)
+                    raise
+                finally:
+                    _current_span.reset(token)
+                _finish_span(span, started, result=result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            span = _start_span(name, route, fn, args, kwargs)
+            if span is None:
+                token = _current_span.set(NOT_SAMPLED)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _current_span.reset(token)
+            token = _current_span.set(span)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                _finish_span(span, started, error=e)
+                raise
+            finally:
+                _current_span.reset(token)
+            _finish_span(span, started, result=result)
+            return result
+        return wrapper
+    return decorate
@@ -2,13 +2,33 @@
 # Purpose: FastAPI initialization.
 # Language: English
 
-from fastapi import FastAPI
+import time
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core import metrics, tracing
+from app.core.logger import setup_logging, shutdown_logging
+from app.core.database import engine, async_engine, Base, SQLITE_CONCURRENT_MODE, group_writer
+from app.core.migrations import upgrade_schema
+from app.modules.finance import currency_service
+from app.modules.finance.rollups import backfill_rollups
+from app.modules.finance.account_cache import account_index
+from app.modules.finance.bank_formats import registry as bank_formats
+from app.modules.gatekeeper.cache import classification_cache
+from app.modules.gatekeeper.dedup import recent_notifications
+from app.modules.gatekeeper import app_resolver
+from app.modules.gatekeeper.app_resolver import app_name_resolver
+from app.modules.gatekeeper.retention import run_retention_job
+from app.modules.mobile.services import briefing_scheduler
+from app.modules.gatekeeper.queue import ingestion_queue
+from app.modules.usage.services import usage_recorder
 
 from app.modules.gatekeeper.router import router as gatekeeper_router
 from app.modules.auth.router import router as auth_router
 from app.modules.mobile.router import router as mobile_router
+from app.modules.finance.router import router as finance_router
+from app.modules.usage.router import router as usage_router
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -16,14 +36,85 @@ app = FastAPI(
     description="Calvo AI Backend"
 )
 
+# Long-running jobs started with the app (cancelled on shutdown)
+background_tasks = []
+
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
+    setup_logging()
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    await app_name_resolver.warm()
+    currency_service.rate_table.load_snapshot()
+    backfill_rollups(engine, only_if_empty=True)  # First start after the rollups table was added
+    background_tasks.append(asyncio.create_task(currency_service.rate_table.run_refresher()))
+    background_tasks.append(asyncio.create_task(run_retention_job()))
+    background_tasks.append(asyncio.create_task(usage_recorder.run_flusher()))
+    if SQLITE_CONCURRENT_MODE:
+        group_writer.start()
+    await ingestion_queue.start()
+    tracing.exporter.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    briefing_scheduler.cancel_all()
+    await ingestion_queue.stop()
+    await group_writer.stop()
+    await usage_recorder.flush()  # Usage rows still buffered
+    await asyncio.to_thread(tracing.exporter.stop)  # Exports what is still buffered
+    await currency_service.http_client.aclose()
+    await app_resolver.http_client.aclose()
+    await async_engine.dispose()
+    engine.dispose()
+    shutdown_logging()
 
 @app.get("/")
 def health_check():
     return {"status": "Calvo backend running"}
 
+if settings.METRICS_ENABLED:
+    metrics.registry.register_cache("classification", classification_cache.stats)
+    metrics.registry.register_cache("app_name", app_name_resolver.stats)
+    metrics.registry.register_cache("account_index", account_index.stats)
+    metrics.registry.register_cache("dedup", recent_notifications.stats)
+    # Bank-format fast path: a "hit" is a notification parsed without the CFO model call
+    metrics.registry.register_cache("bank_formats", lambda: {
+        "hits": bank_formats.matches, "misses": bank_formats.misses, "hit_rate": bank_formats.match_rate()
+    })
+
+    def route_template(request: Request) -> str:
+        """
+        /api/v1/webhook/jobs/42 -> /api/v1/webhook/jobs/{job_id}, so the labels stay bounded.
+        """
+        if request.scope.get("route") is None:
+            return "unmatched"
+        params = {str(value): name for name, value in request.path_params.items()}
+        return "/".join(
+            "{" + params[segment] + "}" if segment in params else segment
+            for segment in request.url.path.split("/")
+        )
+
+    @app.middleware("http")
+    async def time_requests(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, request.method, route_template(request), status
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(gatekeeper_router, prefix="/api/v1", tags=["Gatekeeper"])
 app.include_router(mobile_router, prefix="/api/v1/mobile", tags=["Mobile"])
+app.include_router(finance_router, prefix="/api/v1/finance", tags=["Finance"])
+app.include_router(usage_router, prefix="/api/v1/usage", tags=["Usage"])
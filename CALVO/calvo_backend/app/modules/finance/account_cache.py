@@ -0,0 +1,159 @@
+# File: app/modules/finance/account_cache.py
+# Purpose: Per-user in-memory index of accounts (lowercased institution name -> account).
+# Responsibility: O(1) account resolution and whitelist checks without a DB round trip.
+# Language: English
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.modules.finance.models import Account
+
+# Session.info key listing the users whose cached accounts were written in the current transaction
+TOUCHED_USERS_KEY = "account_cache_users"
+
+
+@dataclass
+class AccountEntry:
+    id: int
+    institution_name: str
+    balance: float      # Last balance seen (refreshed by every UPDATE ... RETURNING); not authoritative
+    currency: str
+
+
+class AccountIndex:
+    """
+    user_id -> {institution_name.lower(): AccountEntry}, LRU-bounded over users.
+    Loaded once per user, then kept up to date write-through by the finance service.
+    If a transaction that touched a user rolls back, that user is dropped and reloaded.
+    The index is per process: a name missing from a cached user is looked up in the DB
+    before answering "no", since another worker may have created the account meanwhile.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.db_lookups = 0
+
+    async def accounts(self, db: AsyncSession, user_id: int) -> dict:
+        return (await self._accounts(db, user_id))[0]
+
+    async def _accounts(self, db: AsyncSession, user_id: int) -> tuple[dict, bool]:
+        """
+        (accounts, fresh): fresh means they were just loaded from the DB.
+        """
+        accounts = self._users.get(user_id)
+        if accounts is not None:
+            self.hits += 1
+            self._users.move_to_end(user_id)
+            return accounts, False
+
+        self.misses += 1
+        rows = (await db.execute(
+            select(Account).where(Account.user_id == user_id).order_by(Account.id)
+        )).scalars().all()
+        accounts = {}
+        for row in rows:
+            # Keep the oldest account if two share a name (matches query().first())
+            accounts.setdefault((row.institution_name or "").lower(), AccountEntry(
+                id=row.id, institution_name=row.institution_name, balance=row.balance or 0.0, currency=row.currency
+            ))
+        self._store(user_id, accounts)
+        return accounts, True
+
+    async def find(self, db: AsyncSession, user_id: int, institution_name: str) -> AccountEntry | None:
+        """
+        "General" means any account of the user (the first one registered).
+        """
+        accounts, fresh = await self._accounts(db, user_id)
+        general = institution_name == "General"
+        entry = next(iter(accounts.values()), None) if general else accounts.get((institution_name or "").lower())
+        if entry is None and not fresh:
+            entry = await self._load_one(db, user_id, institution_name, general)
+        return entry
+
+    async def is_trusted(self, db: AsyncSession, user_id: int, source_app: str) -> bool:
+        accounts, fresh = await self._accounts(db, user_id)
+        if (source_app or "").lower() in accounts:
+            return True
+        return not fresh and await self._load_one(db, user_id, source_app, general=False) is not None
+
+    def put(self, db: AsyncSession, user_id: int, entry: AccountEntry):
+        """
+        Write-through for a newly created account.
+        """
+        self._touch(db, user_id)
+        accounts = self._users.get(user_id)
+        if accounts is not None:
+            accounts.setdefault(entry.institution_name.lower(), entry)
+
+    async def _load_one(self, db: AsyncSession, user_id: int, institution_name: str, general: bool) -> AccountEntry | None:
+        """
+        DB lookup for a name the cached user does not have; a hit is added to the index.
+        """
+        self.db_lookups += 1
+        query = (
+            select(Account.id, Account.institution_name, Account.balance, Account.currency)
+            .where(Account.user_id == user_id).order_by(Account.id).limit(1)
+        )
+        if not general:
+            query = query.where(func.lower(Account.institution_name) == (institution_name or "").lower())
+        row = (await db.execute(query)).first()
+        if row is None:
+            return None
+        entry = AccountEntry(id=row.id, institution_name=row.institution_name, balance=row.balance or 0.0, currency=row.currency)
+        self.put(db, user_id, entry)
+        return self._users.get(user_id, {}).get(entry.institution_name.lower(), entry)
+
+    def set_balance(self, db: AsyncSession, user_id: int, entry: AccountEntry, balance: float):
+        """
+        Write-through for a balance change: the balance the UPDATE ... RETURNING gave back.
+        """
+        self._touch(db, user_id)
+        entry.balance = balance
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "db_lookups": self.db_lookups,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _store(self, user_id: int, accounts: dict):
+        self._users[user_id] = accounts
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def _touch(self, db: AsyncSession, user_id: int):
+        db.info.setdefault(TOUCHED_USERS_KEY, set()).add(user_id)
+
+
+account_index = AccountIndex(max_users=settings.ACCOUNT_CACHE_MAX_USERS)
+
+
+# Keep the cache consistent with what was actually committed
+@event.listens_for(Session, "after_commit")
+def _forget_touched_users(session):
+    session.info.pop(TOUCHED_USERS_KEY, None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_touched_users(session, previous_transaction):
+    for user_id in session.info.pop(TOUCHED_USERS_KEY, ()):
+        account_index.invalidate(user_id)
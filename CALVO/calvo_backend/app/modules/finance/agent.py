@@ -3,42 +3,57 @@
 # Responsibility: Extract financial data safely using AI.
 # Language: English
 
+import logging
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.config import settings
-from opik import track
+from app.core import metrics, tracing
 from app.modules.prompts_config import SYSTEM_PROMPT_CFO
+from app.modules.finance.bank_formats import registry as bank_formats
+from app.modules.prompt_compaction import compact
+from app.modules.usage.services import usage_recorder
+
+logger = logging.getLogger(__name__)
 
 user_id = 0  # Placeholder, to be set when calling the function
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
 
-@track(name="CFO Agent Extraction")
+@tracing.trace("CFO Agent Extraction", route="cfo.extract")
+@metrics.timed("cfo_extract")
 #sửa hàm đầu vào
-def extract_financial_data(received_at, summary, user_lang: str = "Vietnamese", user_id: int = 0):
+async def extract_financial_data(received_at, summary, user_lang: str = "Vietnamese", user_id: int = 0, content: str = None):
     """
     Extracts amount, currency, and transaction type.
+    Fast path: known bank formats are parsed from the raw content without the LLM.
     Fail-safe design: If AI output is invalid, returns UNKNOWN safely.
     """
     default_currency = "VND" if user_lang == "Vietnamese" else "EUR"
+
+    parsed = bank_formats.extract(content or summary, received_at)
+    if parsed:
+        return parsed
+
     # sửa prompt
     system_prompt = SYSTEM_PROMPT_CFO
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"summary: {summary}\n received_at: {received_at}"}
+                {"role": "user", "content": f"summary: {compact('cfo', summary)}\n received_at: {received_at}"}
             ],
             response_format={"type": "json_object"},
             temperature=0.1
         )
+        usage_recorder.record("cfo", response)
 
         data = json.loads(response.choices[0].message.content)
 
         # Basic validation
         if not isinstance(data.get("amount"), (int, float)):
+            metrics.record_fallback("cfo_extract", "invalid_amount")
             return {"amount": None, "currency": default_currency, "type_of_transaction": "UNKNOWN"}
 
         if data.get("type_of_transaction") not in ["DEPOSIT", "WITHDRAW"]:
@@ -47,7 +62,9 @@ def extract_financial_data(received_at, summary, user_lang: str = "Vietnamese",
         return data
     # sửa output khi lỗi
     except Exception as e:
-        print(f"[CFO Agent] Fail-safe triggered: {e}")
+        logger.warning("Fail-safe triggered: %s", e)
+        metrics.record_error("cfo_extract")
+        metrics.record_fallback("cfo_extract", "error")
         return {
                 "amount": 0.0,
                 "currency": "VND",
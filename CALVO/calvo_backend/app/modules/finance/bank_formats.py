@@ -0,0 +1,241 @@
+# File: app/modules/finance/bank_formats.py
+# Purpose: Deterministic fast path for the CFO stage.
+# Responsibility: Parse well-known Vietnamese bank SMS / notification formats without an LLM call.
+
+import re
+from datetime import datetime
+from dataclasses import dataclass, field
+
+CURRENCY_ALIASES = {"VND": "VND", "VNĐ": "VND", "Đ": "VND", "D": "VND", "USD": "USD", "$": "USD", "EUR": "EUR"}
+
+# Reusable pattern fragments
+AMOUNT = r"\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?"
+CURRENCY = r"VND|VNĐ|đ|USD|EUR"
+DATE = r"\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?"
+TIME = r"\d{1,2}:\d{2}(?::\d{2})?"
+# Start of a sentence: e-wallet verbs only count when the user ("Bạn" / "You") is the subject
+SENTENCE_START = r"(?:^|[.:!;]\s*)"
+
+# Never a transaction of the user's own, whatever amounts they mention
+NON_TRANSACTION_PATTERN = re.compile(r"\bOTP\b|mã xác (?:thực|nhận)|ma xac (?:thuc|nhan)|verification code", re.IGNORECASE)
+# Any amount followed by a currency (used to reject messages with more than one amount)
+MONEY_PATTERN = re.compile(rf"(?:{AMOUNT})\s*(?:{CURRENCY})(?!\w)", re.IGNORECASE)
+
+
+@dataclass
+class BankFormat:
+    """
+    One institution's notification layout.
+    Patterns use named groups: sign, amount, currency, balance, date, time.
+    A format without a "sign" group must set transaction_type (e.g. wallet "you received").
+    reject: texts that look like a match but are not the user's transaction (promotions, "cho bạn").
+    single_amount: only accept texts with exactly one amount besides the balance (ambiguous -> LLM).
+    """
+    institution: str
+    patterns: list = field(default_factory=list)
+    transaction_type: str | None = None
+    default_currency: str = "VND"
+    reject: re.Pattern | None = None
+    single_amount: bool = False
+
+
+class ExtractorRegistry:
+    """
+    Ordered registry of bank formats. The first pattern that matches wins.
+    Keeps match / miss counters so the LLM fallback rate can be monitored.
+    """
+
+    def __init__(self):
+        self._formats = []
+        self.matches = 0
+        self.misses = 0
+        self.matches_by_institution = {}
+
+    def register(self, institution: str, *patterns: str, transaction_type: str = None, default_currency: str = "VND",
+                 reject: str = None, single_amount: bool = False):
+        compiled = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in patterns]
+        self._formats.append(BankFormat(
+            institution, compiled, transaction_type, default_currency,
+            re.compile(reject, re.IGNORECASE) if reject else None, single_amount
+        ))
+
+    def extract(self, text: str, received_at=None) -> dict | None:
+        """
+        Returns a CFO-shaped dict on a match, None on a miss (caller falls back to the LLM).
+        """
+        if text and not NON_TRANSACTION_PATTERN.search(text):
+            for bank_format in self._formats:
+                if bank_format.reject is not None and bank_format.reject.search(text):
+                    continue
+                for pattern in bank_format.patterns:
+                    match = pattern.search(text)
+                    if match and bank_format.single_amount and not has_single_amount(text, match):
+                        continue
+                    if match:
+                        result = self._build_result(bank_format, match, received_at)
+                        if result:
+                            self.matches += 1
+                            self.matches_by_institution[bank_format.institution] = \
+                                self.matches_by_institution.get(bank_format.institution, 0) + 1
+                            return result
+        self.misses += 1
+        return None
+
+    def match_rate(self) -> float:
+        total = self.matches + self.misses
+        return self.matches / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "matches": self.matches,
+            "misses": self.misses,
+            "match_rate": self.match_rate(),
+            "matches_by_institution": dict(self.matches_by_institution),
+        }
+
+    def _build_result(self, bank_format: BankFormat, match: re.Match, received_at) -> dict | None:
+        groups = match.groupdict()
+
+        if groups.get("sign"):
+            transaction_type = "DEPOSIT" if groups["sign"].strip() == "+" else "WITHDRAW"
+        else:
+            transaction_type = bank_format.transaction_type
+        if transaction_type not in ("DEPOSIT", "WITHDRAW"):
+            return None
+
+        currency = normalize_currency(groups.get("currency"), bank_format.default_currency)
+        amount = parse_amount(groups.get("amount"), currency)
+        if amount is None:
+            return None
+
+        balance = parse_amount(groups.get("balance"), currency)
+        created_at = parse_timestamp(groups.get("date"), groups.get("time"), received_at)
+
+        return {
+            "amount": amount,
+            "currency": currency,
+            "created_at": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "type_of_transaction": transaction_type,
+            "balance": balance,
+            "confidence_score": 1.0,
+            "reasoning": f"Matched {bank_format.institution} format",
+        }
+
+
+def normalize_currency(raw: str | None, default: str = "VND") -> str:
+    if not raw:
+        return default
+    return CURRENCY_ALIASES.get(raw.strip().upper(), raw.strip().upper())
+
+
+def has_single_amount(text: str, match: re.Match) -> bool:
+    """
+    True if the matched amount is the only one in the text (the matched balance does not count).
+    """
+    balance_span = match.span("balance") if "balance" in match.groupdict() else (-1, -1)
+    amounts = [m for m in MONEY_PATTERN.finditer(text)
+               if not (balance_span[0] <= m.start() < balance_span[1])]
+    return len(amounts) == 1
+
+
+def parse_amount(raw: str | None, currency: str = "VND") -> float | None:
+    """
+    "5,000,000" / "5.000.000" -> 5000000.0, "12.50" (USD) -> 12.5.
+    VND has no minor unit: separators must be thousands separators, except a zero
+    minor part ("1,000,000.00"). Anything else ("1.5" VND) is ambiguous and rejected.
+    """
+    if not raw:
+        return None
+    raw = raw.strip()
+    if currency == "VND":
+        whole = re.fullmatch(r"(\d{1,3}(?:[.,]\d{3})+|\d+)(?:[.,]00?)?", raw)
+        if not whole:
+            return None
+        return float(re.sub(r"[.,]", "", whole.group(1)))
+
+    # Last separator followed by 1-2 digits is the decimal point
+    decimal = re.search(r"[.,](\d{1,2})$", raw)
+    integer_part = raw[:decimal.start()] if decimal else raw
+    integer_part = re.sub(r"[.,]", "", integer_part)
+    if not integer_part.isdigit():
+        return None
+    return float(f"{integer_part}.{decimal.group(1)}") if decimal else float(integer_part)
+
+
+def parse_timestamp(date_str: str | None, time_str: str | None, received_at=None) -> datetime:
+    """
+    Combines the (optional) date and time found in the text, defaulting to received_at.
+    Vietnamese banks write dates day-first.
+    """
+    base = received_at if isinstance(received_at, datetime) else datetime.now()
+    day, month, year = base.day, base.month, base.year
+    hour, minute, second = base.hour, base.minute, base.second
+
+    if date_str:
+        parts = [int(p) for p in re.split(r"[/-]", date_str)]
+        day, month = parts[0], parts[1]
+        if len(parts) == 3:
+            year = parts[2] + 2000 if parts[2] < 100 else parts[2]
+    if time_str:
+        parts = [int(p) for p in time_str.split(":")]
+        hour, minute = parts[0], parts[1]
+        second = parts[2] if len(parts) == 3 else 0
+
+    try:
+        return datetime(year, month, day, hour, minute, second)
+    except ValueError:
+        return base
+
+
+# --- Registered formats (most specific first) ---
+registry = ExtractorRegistry()
+
+# Vietcombank: "SD TK 0011001234567 +1,000,000VND luc 18-10-2026 10:22:33. SD 5,000,000VND. Ref ..."
+registry.register(
+    "Vietcombank",
+    rf"SD TK\s*\S+\s*(?P<sign>[+-])\s*(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY})\s*luc\s*(?P<date>{DATE})\s*(?P<time>{TIME})"
+    rf".*?\bSD\s*(?P<balance>{AMOUNT})",
+)
+
+# Techcombank: "TK 1903xxxx1234 So tien GD:-500,000 So du:1,234,567 ..."
+registry.register(
+    "Techcombank",
+    rf"So tien GD\s*:\s*(?P<sign>[+-])\s*(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY})?.*?So du\s*:\s*(?P<balance>{AMOUNT})",
+)
+
+# BIDV: "Số dư TK BIDV 1234567 +200,000VND vào 10:22 18/10/2026. Số dư: 1,000,000VND"
+registry.register(
+    "BIDV",
+    rf"TK BIDV\s*\S+\s*(?P<sign>[+-])\s*(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY})\s*vào\s*(?P<time>{TIME})\s*(?P<date>{DATE})?"
+    rf".*?Số dư\s*:?\s*(?P<balance>{AMOUNT})",
+)
+
+# MB Bank and most generic layouts: "TK ****1234 +5,000,000VND lúc 10:22 SD: 12,345,678VND"
+registry.register(
+    "Generic bank",
+    rf"\bTK\s*\S+\s*(?P<sign>[+-])\s*(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY})"
+    rf"(?:\s*(?:lúc|luc|at)\s*(?P<time>{TIME})(?:\s*(?:ngày|ngay)?\s*(?P<date>{DATE}))?)?"
+    rf"(?:.*?(?:SD|Số dư|So du)\s*:?\s*(?P<balance>{AMOUNT}))?",
+)
+
+# E-wallets (MoMo, ZaloPay, ...): no sign, the verb decides the direction, so only
+# "Bạn đã / vừa <verb> <amount>" with a single amount is parsed; anything looser goes to the LLM.
+# "A đã chuyển 500.000đ cho bạn" (incoming) and promotions ("Ưu đãi nhận 10.000đ") are rejected.
+E_WALLET_REJECT = r"\bcho (?:bạn|ban)\b|\bto you\b|ưu đãi|uu dai|khuyến mãi|khuyen mai|voucher|giảm giá|giam gia|tặng|\bpromo"
+E_WALLET_SUBJECT = rf"{SENTENCE_START}(?:Bạn|Ban|You)\s+(?:đã\s+|vừa\s+|da\s+|vua\s+|have\s+)?"
+E_WALLET_BALANCE = rf"(?:.*?(?:Số dư|So du|SD|Balance)(?:\s*(?:ví|vi))?\s*:?\s*(?P<balance>{AMOUNT}))?"
+registry.register(
+    "E-wallet deposit",
+    rf"{E_WALLET_SUBJECT}(?:nhận|nhan|received)\s*(?:được\s*|duoc\s*)?(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY})"
+    rf"{E_WALLET_BALANCE}",
+    transaction_type="DEPOSIT", reject=E_WALLET_REJECT, single_amount=True,
+)
+registry.register(
+    "E-wallet payment",
+    rf"{E_WALLET_SUBJECT}(?:thanh toán|thanh toan|chuyển|chuyen|paid)\s*(?:thành công\s*|thanh cong\s*)?"
+    rf"(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY}){E_WALLET_BALANCE}",
+    # Receipt style without a subject: "Thanh toán thành công 45.000đ tại Circle K"
+    rf"{SENTENCE_START}(?:Thanh toán thành công|Thanh toan thanh cong|Payment successful)\s*:?\s*"
+    rf"(?P<amount>{AMOUNT})\s*(?P<currency>{CURRENCY}){E_WALLET_BALANCE}",
+    transaction_type="WITHDRAW", reject=E_WALLET_REJECT, single_amount=True,
+)
@@ -1,27 +1,327 @@
 # File: app/modules/finance/budget_manager.py
-# Purpose: Logic to determine if a transaction violates budget thresholds.
+# Purpose: Rolling-window budget engine (per-user rules, running totals per window).
 # Language: English
+# Note: Evaluating a withdrawal reads in-memory counters (O(1) per rule). Counters are
+#       seeded per user from daily_spending_rollups, never from the transactions table, and
+#       re-seeded every BUDGET_RECONCILE_SECONDS so spend recorded by other worker processes
+#       (and their rule changes) is picked up.
 
-class BudgetManager:
-    # Hardcoded thresholds for now (Future: Load from User Settings DB)
-    ALERT_THRESHOLD_ABSOLUTE_VND = 5000000.0  # 5 Million VND
-    ALERT_THRESHOLD_PERCENT = 0.20            # 20% of current balance
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import select, update, event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-    @staticmethod
-    def check_over_budget(amount_in_account_currency: float, current_balance: float) -> bool:
+from app.core.config import settings
+from app.modules.finance.models import Account, BudgetRule, Transaction, DailySpendingRollup
+from app.modules.finance.account_cache import account_index
+from app.modules.finance.rollups import period_start
+from app.modules.finance import currency_service
+
+# Counters and comparisons use one currency
+BUDGET_CURRENCY = "VND"
+WINDOWS = ("TRANSACTION", "DAY", "WEEK", "MONTH")
+RUNNING_WINDOWS = ("DAY", "WEEK", "MONTH")
+
+# Session.info key listing the users whose counters were changed in the current transaction
+TOUCHED_USERS_KEY = "budget_engine_users"
+
+
+@dataclass
+class RuleSpec:
+    id: int | None
+    window: str
+    limit_amount: float | None = None
+    currency: str = BUDGET_CURRENCY
+    percent_of_balance: float | None = None
+    institution_name: str | None = None
+
+    def applies_to(self, institution_name: str) -> bool:
+        return not self.institution_name or self.institution_name.lower() == (institution_name or "").lower()
+
+    def limit_in_budget_currency(self) -> float | None:
+        if self.limit_amount is None:
+            return None
+        return currency_service.convert_currency(self.limit_amount, self.currency, BUDGET_CURRENCY)
+
+    def is_violated(self, spent: float, balance_before: float) -> bool:
+        limit = self.limit_in_budget_currency()
+        if limit is not None and spent >= limit:
+            return True
+        if self.percent_of_balance is not None and balance_before > 0:
+            return spent >= self.percent_of_balance * balance_before
+        return False
+
+
+def default_rules() -> list[RuleSpec]:
+    """
+    The original hardcoded checks, used while a user has no rules of their own.
+    """
+    return [
+        RuleSpec(id=None, window="TRANSACTION", limit_amount=settings.BUDGET_DEFAULT_TRANSACTION_LIMIT_VND),
+        RuleSpec(id=None, window="TRANSACTION", percent_of_balance=settings.BUDGET_DEFAULT_PERCENT_OF_BALANCE),
+    ]
+
+
+def to_spec(rule: BudgetRule) -> RuleSpec:
+    return RuleSpec(
+        id=rule.id,
+        window=rule.window,
+        limit_amount=rule.limit_amount,
+        currency=rule.currency or BUDGET_CURRENCY,
+        percent_of_balance=rule.percent_of_balance,
+        institution_name=rule.institution_name
+    )
+
+
+class UserBudget:
+    """
+    One user's rules + running totals.
+    counters: (account_id or None for all accounts, window) -> [window_start, total]
+    """
+
+    def __init__(self, rules: list[RuleSpec]):
+        self.rules = rules
+        self.counters = {}
+        self.loaded_at = time.monotonic()
+
+    def total(self, account_id: int | None, window: str, day: date) -> float:
+        entry = self.counters.get((account_id, window))
+        if entry and entry[0] == period_start(day, window.lower()):
+            return entry[1]
+        return 0.0  # The window rolled over since the last withdrawal
+
+    def add(self, account_id: int, amount: float, day: date):
+        for scope in (None, account_id):
+            for window in RUNNING_WINDOWS:
+                start = period_start(day, window.lower())
+                entry = self.counters.get((scope, window))
+                if not entry or entry[0] != start:
+                    entry = self.counters[(scope, window)] = [start, 0.0]
+                entry[1] += amount
+
+
+class BudgetEngine:
+    """
+    user_id -> UserBudget, LRU-bounded over users.
+    process_transaction calls evaluate() then record() for every WITHDRAW.
+    Rule changes invalidate the user and re-flag history with reevaluate().
+    The counters are per process: record() only sees this process's withdrawals, so an entry
+    older than BUDGET_RECONCILE_SECONDS is reloaded from the rollups, which every worker writes.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._users = OrderedDict()
+
+    async def evaluate(self, db: AsyncSession, user_id: int, account_id: int, institution_name: str,
+                       amount: float, balance_before: float, when: datetime) -> list[RuleSpec]:
         """
-        Determines if a withdrawal is risky.
-        Returns True if alert should be triggered.
+        Rules violated by a withdrawal of `amount` (budget currency). Does not change the counters.
+        balance_before comes from the balance update's RETURNING, so it is current across workers.
         """
-        # Rule 1: Absolute Amount Check
-        if amount_in_account_currency >= BudgetManager.ALERT_THRESHOLD_ABSOLUTE_VND:
-            return True
-            
-        # Rule 2: Percentage Check
-        # Only check if balance is positive to avoid division by zero
-        if current_balance > 0:
-            spending_ratio = amount_in_account_currency / current_balance
-            if spending_ratio >= BudgetManager.ALERT_THRESHOLD_PERCENT:
-                return True
-                
-        return False
\ No newline at end of file
+        budget = await self._budget(db, user_id)
+        violated = []
+        for rule in budget.rules:
+            if not rule.applies_to(institution_name):
+                continue
+            if rule.window == "TRANSACTION":
+                spent = amount
+            else:
+                scope = account_id if rule.institution_name else None
+                spent = budget.total(scope, rule.window, when.date()) + amount
+            if rule.is_violated(spent, balance_before):
+                violated.append(rule)
+        return violated
+
+    def record(self, db: AsyncSession, user_id: int, account_id: int, amount: float, when: datetime):
+        """
+        Write-through for a withdrawal (the same amount goes into the daily rollup).
+        """
+        db.info.setdefault(TOUCHED_USERS_KEY, set()).add(user_id)
+        budget = self._users.get(user_id)
+        if budget is not None:
+            budget.add(account_id, amount, when.date())
+
+    async def status(self, db: AsyncSession, user_id: int, today: date | None = None) -> list[dict]:
+        """
+        Current spend against every rule (running windows only report a remaining amount).
+        """
+        today = today or date.today()
+        budget = await self._budget(db, user_id)
+        result = []
+        for rule in budget.rules:
+            spent = None
+            if rule.window != "TRANSACTION":
+                scope = None
+                if rule.institution_name:
+                    account = await account_index.find(db, user_id, rule.institution_name)
+                    scope = account.id if account else -1
+                spent = budget.total(scope, rule.window, today)
+            limit = rule.limit_in_budget_currency()
+            result.append({
+                "rule": rule,
+                "window_start": period_start(today, rule.window.lower()) if rule.window != "TRANSACTION" else None,
+                "spent": spent,
+                "limit": limit,
+                "remaining": max(0.0, limit - spent) if limit is not None and spent is not None else None,
+            })
+        return result
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+
+    async def _budget(self, db: AsyncSession, user_id: int) -> UserBudget:
+        budget = self._users.get(user_id)
+        if budget is not None and time.monotonic() - budget.loaded_at < settings.BUDGET_RECONCILE_SECONDS:
+            self._users.move_to_end(user_id)
+            return budget
+
+        rules = (await db.execute(
+            select(BudgetRule).where(BudgetRule.user_id == user_id, BudgetRule.is_active.is_(True)).order_by(BudgetRule.id)
+        )).scalars().all()
+        budget = UserBudget([to_spec(rule) for rule in rules] or default_rules())
+
+        # Seed the running totals from the daily rollups of the current week / month
+        today = date.today()
+        since = min(period_start(today, "week"), period_start(today, "month"))
+        rows = (await db.execute(
+            select(DailySpendingRollup.account_id, DailySpendingRollup.day,
+                   DailySpendingRollup.currency, DailySpendingRollup.total_amount).where(
+                DailySpendingRollup.user_id == user_id,
+                DailySpendingRollup.type_of_transaction == "WITHDRAW",
+                DailySpendingRollup.day >= since
+            )
+        )).all()
+        amounts = currency_service.convert_many([(total or 0.0, currency, BUDGET_CURRENCY) for _, _, currency, total in rows])
+        for (account_id, day, _, _), amount in zip(rows, amounts):
+            day = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+            for window in RUNNING_WINDOWS:
+                start = period_start(today, window.lower())
+                if day >= start:
+                    for scope in (None, account_id):
+                        budget.counters.setdefault((scope, window), [start, 0.0])[1] += amount
+
+        self._users[user_id] = budget
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return budget
+
+
+def running_window_totals(keys: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """
+    Inclusive running sum of `amounts` that restarts whenever `keys` changes (rows sorted by time).
+    """
+    cumulative = np.cumsum(amounts)
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+    return cumulative - (cumulative - amounts)[group_start]
+
+
+async def reevaluate(db: AsyncSession, user_id: int, now: datetime | None = None) -> dict:
+    """
+    Bulk mode: recomputes is_over_budget_alert for the user's withdrawals of the last
+    BUDGET_REEVALUATION_DAYS with the current rules, vectorized over all rows at once.
+    Balances before each transaction are rebuilt backwards from today's balances.
+    Does not commit.
+    """
+    now = now or datetime.now()
+    since = (now - timedelta(days=settings.BUDGET_REEVALUATION_DAYS)).date()
+    # Start at a window boundary so the first week / month totals are complete
+    load_from = min(period_start(since, "week"), period_start(since, "month"))
+
+    rows = (await db.execute(
+        select(Transaction.id, Transaction.account_id, Transaction.created_at, Transaction.amount,
+               Transaction.currency, Transaction.type_of_transaction).where(
+            Transaction.user_id == user_id,
+            Transaction.created_at >= datetime.combine(load_from, datetime.min.time()),
+            Transaction.type_of_transaction.in_(["DEPOSIT", "WITHDRAW"])
+        ).order_by(Transaction.created_at, Transaction.id)
+    )).all()
+    if not rows:
+        return {"evaluated": 0, "alerts": 0}
+
+    ids = np.array([row.id for row in rows])
+    account_ids = np.array([row.account_id or 0 for row in rows])
+    days = np.array([row.created_at.toordinal() for row in rows])
+    months = np.array([row.created_at.year * 12 + row.created_at.month for row in rows])
+    is_withdraw = np.array([row.type_of_transaction == "WITHDRAW" for row in rows])
+    rates = {currency: currency_service.get_exchange_rate(currency or BUDGET_CURRENCY, BUDGET_CURRENCY)
+             for currency in {row.currency for row in rows}}
+    amounts = np.array([(row.amount or 0.0) * rates[row.currency] for row in rows])
+
+    # Balance before each transaction = today's balance - every later delta of that account
+    # (balances from the DB: the account index is per process and its balances may be stale)
+    accounts = (await db.execute(
+        select(Account.id, Account.institution_name, Account.balance, Account.currency).where(Account.user_id == user_id)
+    )).all()
+    balances_now = {account.id: currency_service.convert_currency(account.balance or 0.0, account.currency, BUDGET_CURRENCY)
+                    for account in accounts}
+    deltas = np.where(is_withdraw, -amounts, amounts)
+    balance_before = np.zeros(len(rows))
+    for account_id in np.unique(account_ids):
+        mask = account_ids == account_id
+        later_deltas = np.cumsum(deltas[mask][::-1])[::-1]
+        balance_before[mask] = balances_now.get(int(account_id), 0.0) - later_deltas
+
+    window_keys = {"DAY": days, "WEEK": days - (days - 1) % 7, "MONTH": months}  # ordinal 1 is a Monday
+    withdrawn = np.where(is_withdraw, amounts, 0.0)
+    institutions = {account.id: account.institution_name for account in accounts}
+
+    rules = (await db.execute(
+        select(BudgetRule).where(BudgetRule.user_id == user_id, BudgetRule.is_active.is_(True))
+    )).scalars().all()
+    alerts = np.zeros(len(rows), dtype=bool)
+    for rule in [to_spec(rule) for rule in rules] or default_rules():
+        scope = is_withdraw.copy()
+        if rule.institution_name:
+            scope &= np.isin(account_ids, [account_id for account_id, name in institutions.items()
+                                           if rule.applies_to(name)])
+        if rule.window == "TRANSACTION":
+            spent = amounts
+        else:
+            spent = running_window_totals(window_keys[rule.window], np.where(scope, withdrawn, 0.0))
+
+        violated = np.zeros(len(rows), dtype=bool)
+        limit = rule.limit_in_budget_currency()
+        if limit is not None:
+            violated |= spent >= limit
+        if rule.percent_of_balance is not None:
+            violated |= (balance_before > 0) & (spent >= rule.percent_of_balance * balance_before)
+        alerts |= scope & violated
+
+    # Only rows whose windows are fully inside the loaded range are rewritten
+    in_range = days >= since.toordinal()
+    for flag in (True, False):
+        flagged = ids[in_range & (alerts == flag)].tolist()
+        for offset in range(0, len(flagged), 500):
+            await db.execute(
+                update(Transaction).where(Transaction.id.in_(flagged[offset:offset + 500]))
+                .values(is_over_budget_alert=flag)
+            )
+
+    budget_engine.invalidate(user_id)
+    return {"evaluated": int(in_range.sum()), "alerts": int((alerts & in_range).sum())}
+
+
+budget_engine = BudgetEngine(max_users=settings.ACCOUNT_CACHE_MAX_USERS)
+
+
+# Keep the counters consistent with what was actually committed
+@event.listens_for(Session, "after_commit")
+def _forget_touched_users(session):
+    session.info.pop(TOUCHED_USERS_KEY, None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_touched_users(session, previous_transaction):
+    for user_id in session.info.pop(TOUCHED_USERS_KEY, ()):
+        budget_engine.invalidate(user_id)
@@ -1,63 +1,155 @@
 # File: app/modules/finance/currency_service.py
 # Purpose: Handle currency conversion logic using real-time API.
 # Language: English
+# Note: Conversions read an in-memory rate table. The network is only used by the
+#       background refresher, never by a transaction.
 
-import requests
+import logging
+import httpx
 import os
+import json
+import time
+import asyncio
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # External API Provider (ExchangeRate-API or Open Exchange Rates)
 API_KEY = os.getenv("EXCHANGE_RATE_API_KEY", "")
-BASE_URL = f"https://api.exchangerate-api.com/v4/latest"
+BASE_URL = settings.FX_API_BASE_URL
+
+# Shared async client: keeps connections alive and never blocks the event loop
+http_client = httpx.AsyncClient(timeout=5)
+
+# Fallback Static Rates (Safety net)
+# Base reference: 1 Unit -> VND
+FALLBACK_RATES_TO_VND = {
+    "USD": 25400.0,
+    "EUR": 27500.0,
+    "JPY": 170.0,
+    "KRW": 18.5,
+    "VND": 1.0
+}
+
+
+class RateTable:
+    """
+    One base currency's full rate table (units of X per 1 base).
+    Every cross rate is derived in memory: rate(A -> B) = rates[B] / rates[A].
+    The last good table is persisted to disk so a cold start has real rates.
+    """
+
+    def __init__(self, base_currency: str, refresh_interval: int, snapshot_path: str = ""):
+        self.base_currency = base_currency.upper()
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = snapshot_path
+        self.rates = {}
+        self.fetched_at = 0.0
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.refresh_interval
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("base") != self.base_currency:
+                return False
+            self.rates = {k: float(v) for k, v in snapshot["rates"].items()}
+            self.fetched_at = float(snapshot["fetched_at"])
+            logger.info("Loaded %d rates from snapshot", len(self.rates))
+            return True
+        except Exception as e:
+            logger.warning("Ignoring unreadable snapshot: %s", e)
+            return False
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"base": self.base_currency, "fetched_at": self.fetched_at, "rates": self.rates}, f)
+        os.replace(tmp_path, self.snapshot_path)  # atomic: never leave a half-written snapshot
+
+    async def refresh(self) -> bool:
+        """
+        Fetches the full table for the base currency (one HTTP call for every pair).
+        """
+        try:
+            response = await http_client.get(f"{BASE_URL}/{self.base_currency}")
+            data = response.json()
+            if response.status_code == 200 and "rates" in data:
+                self.rates = {k.upper(): float(v) for k, v in data["rates"].items() if v}
+                self.fetched_at = time.time()
+                await asyncio.to_thread(self.save_snapshot)
+                return True
+        except Exception as e:
+            logger.warning("Rate API error: %s. Keeping last known rates.", e)
+        return False
+
+    async def run_refresher(self):
+        """
+        Background loop: refresh whenever the table is stale (started on app startup).
+        """
+        while True:
+            if self.is_stale:
+                await self.refresh()
+            # Retry sooner while we only have fallback / stale rates
+            await asyncio.sleep(self.refresh_interval if not self.is_stale else min(60, self.refresh_interval))
+
+    def rate(self, from_curr: str, to_curr: str) -> float:
+        from_curr = from_curr.upper()
+        to_curr = to_curr.upper()
+
+        # 1. Optimization: Same currency needs no conversion
+        if from_curr == to_curr:
+            return 1.0
+
+        # 2. Cross rate from the live table
+        if from_curr in self.rates and to_curr in self.rates:
+            return self.rates[to_curr] / self.rates[from_curr]
+
+        # 3. Fallback static rates
+        rate_to_vnd = FALLBACK_RATES_TO_VND.get(from_curr, 1.0)
+        rate_from_vnd = 1.0 / FALLBACK_RATES_TO_VND.get(to_curr, 1.0)
+        return rate_to_vnd * rate_from_vnd
+
+
+rate_table = RateTable(
+    base_currency=settings.FX_BASE_CURRENCY,
+    refresh_interval=settings.FX_REFRESH_INTERVAL_SECONDS,
+    snapshot_path=settings.FX_SNAPSHOT_PATH
+)
+
 
 def get_exchange_rate(from_currency: str, to_currency: str = "VND") -> float:
     """
-    Fetches the exchange rate. 
+    Returns the exchange rate from the in-memory table (no network round trip).
     Priority:
-    1. API with Key (Production).
-    2. Fallback hardcoded values (if Network/API fails).
-    """
-    from_curr = from_currency.upper()
-    to_curr = to_currency.upper()
-
-    # 1. Optimization: Same currency needs no conversion
-    if from_curr == to_curr:
-        return 1.0
-
-    # 2. Try fetching from Live API
-    try:
-        # Construct URL (Using standard endpoint format)
-        url = f"{BASE_URL}/{from_curr}"
-        
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        
-        if response.status_code == 200 and "rates" in data:
-            rate = data["rates"].get(to_curr)
-            if rate:
-                return float(rate)
-    except Exception as e:
-        print(f"   [Currency Service] API Connection Error: {e}. Switching to Fallback.")
-
-    # 3. Fallback Static Rates (Safety net)
-    # Base reference: 1 Unit -> VND
-    fallback_rates_to_vnd = {
-        "USD": 25400.0,
-        "EUR": 27500.0,
-        "JPY": 170.0,
-        "KRW": 18.5,
-        "VND": 1.0
-    }
-    
-    rate_to_vnd = fallback_rates_to_vnd.get(from_curr, 1.0)
-    rate_from_vnd = 1.0 / fallback_rates_to_vnd.get(to_curr, 1.0)
-    
-    # Calculate cross rate
-    return rate_to_vnd * rate_from_vnd
+    1. Latest table fetched by the background refresher (or its disk snapshot).
+    2. Fallback hardcoded values.
+    """
+    return rate_table.rate(from_currency, to_currency)
 
 def convert_currency(amount: float, from_curr: str, to_curr: str) -> float:
     """
     Utility function to convert amount.
     """
     rate = get_exchange_rate(from_curr, to_curr)
-    return amount * rate
\ No newline at end of file
+    return amount * rate
+
+def convert_many(items: list[tuple[float, str, str]]) -> list[float]:
+    """
+    Bulk conversion of (amount, from_curr, to_curr) tuples. Each distinct pair is resolved once.
+    """
+    pair_rates = {}
+    converted = []
+    for amount, from_curr, to_curr in items:
+        pair = (from_curr, to_curr)
+        if pair not in pair_rates:
+            pair_rates[pair] = get_exchange_rate(from_curr, to_curr)
+        converted.append(amount * pair_rates[pair])
+    return converted
@@ -2,7 +2,7 @@
 # Purpose: Define database schemas for Financial operations.
 # Language: English
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -12,6 +12,10 @@ class Account(Base):
     Represents a user's financial account (Whitelist).
     """
     __tablename__ = "accounts"
+    __table_args__ = (
+        # One account per institution and user, also across workers (insert ... on conflict do nothing)
+        Index("ux_accounts_user_institution", "user_id", "institution_name", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
@@ -48,3 +52,45 @@ class Transaction(Base):
     created_at = Column(DateTime, default=datetime.now)
     
     account = relationship("Account", back_populates="transactions")
+
+class DailySpendingRollup(Base):
+    """
+    Pre-aggregated money flow per (user, account, day, type).
+    Maintained incrementally by process_transaction; spending reports read only this table.
+    Amounts are in the account's currency (the same normalized amount applied to the balance).
+    """
+    __tablename__ = "daily_spending_rollups"
+    __table_args__ = (
+        # Upsert target (one row per key)
+        Index("ux_daily_spending_rollups_key", "user_id", "account_id", "day", "type_of_transaction", unique=True),
+        # Report range scans: user's rows for a date range
+        Index("ix_daily_spending_rollups_user_day", "user_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer)
+    account_id = Column(Integer, ForeignKey("accounts.id"))
+    day = Column(Date)
+    type_of_transaction = Column(String)    # DEPOSIT / WITHDRAW
+    currency = Column(String, default="VND")
+    total_amount = Column(Float, default=0.0)
+    tx_count = Column(Integer, default=0)
+
+class BudgetRule(Base):
+    """
+    A user's spending limit, evaluated on every WITHDRAW by the budget engine.
+    - window: TRANSACTION (the single withdrawal) or DAY / WEEK / MONTH (running total).
+    - limit_amount (in currency) and / or percent_of_balance (0.2 = 20% of the balance before the withdrawal).
+    - institution_name: only withdrawals from that account count (None = all accounts).
+    """
+    __tablename__ = "budget_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True)
+    window = Column(String, default="MONTH")
+    limit_amount = Column(Float, nullable=True)
+    currency = Column(String, default="VND")
+    percent_of_balance = Column(Float, nullable=True)
+    institution_name = Column(String, nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,181 @@
+# File: app/modules/finance/rollups.py
+# Purpose: Daily spending rollups (write side + report queries).
+# Responsibility: Keep daily_spending_rollups in step with transactions so reports never scan them.
+# Usage (rebuild from transactions): python -m app.modules.finance.rollups
+
+import logging
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine, SessionLocal, UPSERT_DIALECTS
+from app.modules.finance.models import Account, Transaction, DailySpendingRollup
+from app.modules.finance import currency_service
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ["user_id", "account_id", "day", "type_of_transaction"]
+PERIODS = ("day", "week", "month")
+
+
+def upsert_statement(dialect_name: str, rows: list[dict]):
+    """
+    INSERT ... ON CONFLICT (key) DO UPDATE total += excluded, count += excluded.
+    """
+    insert = UPSERT_DIALECTS[dialect_name]
+    stmt = insert(DailySpendingRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "total_amount": DailySpendingRollup.total_amount + stmt.excluded.total_amount,
+            "tx_count": DailySpendingRollup.tx_count + stmt.excluded.tx_count,
+        }
+    )
+
+
+async def record_rollup(db: AsyncSession, user_id: int, account_id: int, day: date,
+                        transaction_type: str, currency: str, amount: float):
+    """
+    Adds one transaction to its daily bucket, inside the caller's transaction.
+    """
+    await db.execute(upsert_statement(db.get_bind().dialect.name, [{
+        "user_id": user_id,
+        "account_id": account_id,
+        "day": day,
+        "type_of_transaction": transaction_type,
+        "currency": currency,
+        "total_amount": amount,
+        "tx_count": 1,
+    }]))
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())  # ISO week, Monday
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _to_date(value) -> date:
+    # SQLite returns date() / Date columns as strings in aggregate queries
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+async def spending_by_period(db: AsyncSession, user_id: int, start: date, end: date, period: str,
+                             transaction_type: str, currency: str) -> list[dict]:
+    """
+    Totals per day / week / month in the requested currency.
+    SQL collapses accounts into one row per (day, currency); buckets are folded in Python.
+    """
+    rows = (await db.execute(
+        select(
+            DailySpendingRollup.day,
+            DailySpendingRollup.currency,
+            func.sum(DailySpendingRollup.total_amount),
+            func.sum(DailySpendingRollup.tx_count)
+        ).where(
+            DailySpendingRollup.user_id == user_id,
+            DailySpendingRollup.type_of_transaction == transaction_type,
+            DailySpendingRollup.day >= start,
+            DailySpendingRollup.day <= end
+        ).group_by(DailySpendingRollup.day, DailySpendingRollup.currency)
+    )).all()
+
+    converted = currency_service.convert_many([(total or 0.0, row_currency, currency) for _, row_currency, total, _ in rows])
+    buckets = {}
+    for (day, _, _, count), amount in zip(rows, converted):
+        key = period_start(_to_date(day), period)
+        bucket = buckets.setdefault(key, {"period_start": key, "total": 0.0, "count": 0})
+        bucket["total"] += amount
+        bucket["count"] += count or 0
+    return [buckets[key] for key in sorted(buckets)]
+
+
+async def spending_by_institution(db: AsyncSession, user_id: int, start: date, end: date,
+                                  transaction_type: str, currency: str) -> list[dict]:
+    """
+    Totals per account (institution) in the requested currency, largest first.
+    """
+    rows = (await db.execute(
+        select(
+            Account.institution_name,
+            DailySpendingRollup.currency,
+            func.sum(DailySpendingRollup.total_amount),
+            func.sum(DailySpendingRollup.tx_count)
+        ).join(Account, Account.id == DailySpendingRollup.account_id).where(
+            DailySpendingRollup.user_id == user_id,
+            DailySpendingRollup.type_of_transaction == transaction_type,
+            DailySpendingRollup.day >= start,
+            DailySpendingRollup.day <= end
+        ).group_by(DailySpendingRollup.account_id, Account.institution_name, DailySpendingRollup.currency)
+    )).all()
+
+    converted = currency_service.convert_many([(total or 0.0, row_currency, currency) for _, row_currency, total, _ in rows])
+    institutions = {}
+    for (institution, _, _, count), amount in zip(rows, converted):
+        entry = institutions.setdefault(institution, {"institution": institution, "total": 0.0, "count": 0})
+        entry["total"] += amount
+        entry["count"] += count or 0
+    return sorted(institutions.values(), key=lambda entry: entry["total"], reverse=True)
+
+
+def backfill_rollups(bind=engine, only_if_empty: bool = False) -> int:
+    """
+    Rebuilds every rollup from the transactions table (e.g. for an existing calvo.db).
+    Transactions are converted to their account's currency, like process_transaction does.
+    Returns the number of rollup rows written.
+    """
+    with SessionLocal(bind=bind) as db:
+        if only_if_empty and db.query(DailySpendingRollup.id).first() is not None:
+            return 0
+
+        day = func.date(Transaction.created_at)
+        rows = db.execute(
+            select(
+                Transaction.user_id,
+                Transaction.account_id,
+                day,
+                Transaction.type_of_transaction,
+                Transaction.currency,
+                Account.currency,
+                func.sum(Transaction.amount),
+                func.count(Transaction.id)
+            ).join(Account, Account.id == Transaction.account_id).where(
+                Transaction.created_at.isnot(None),
+                Transaction.type_of_transaction.in_(["DEPOSIT", "WITHDRAW"])
+            ).group_by(
+                Transaction.user_id, Transaction.account_id, day,
+                Transaction.type_of_transaction, Transaction.currency, Account.currency
+            )
+        ).all()
+        if not rows:
+            return 0
+
+        converted = currency_service.convert_many(
+            [(total or 0.0, tx_currency or "VND", account_currency or "VND")
+             for _, _, _, _, tx_currency, account_currency, total, _ in rows]
+        )
+        merged = {}
+        for (user_id, account_id, tx_day, tx_type, _, account_currency, _, count), amount in zip(rows, converted):
+            key = (user_id, account_id, _to_date(tx_day), tx_type)
+            entry = merged.setdefault(key, {
+                "user_id": user_id, "account_id": account_id, "day": key[2], "type_of_transaction": tx_type,
+                "currency": account_currency or "VND", "total_amount": 0.0, "tx_count": 0
+            })
+            entry["total_amount"] += amount
+            entry["tx_count"] += count
+
+        db.execute(delete(DailySpendingRollup))
+        db.execute(insert(DailySpendingRollup), list(merged.values()))
+        db.commit()
+
+    logger.info("Backfilled %d daily rollups from %d transactions", len(merged), sum(r[-1] for r in rows))
+    return len(merged)
+
+
+if __name__ == "__main__":
+    from app.core.database import Base
+    import app.main  # noqa: F401  (registers every model)
+    Base.metadata.create_all(bind=engine)
+    backfill_rollups()
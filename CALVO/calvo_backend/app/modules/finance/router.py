@@ -0,0 +1,137 @@
+# File: app/modules/finance/router.py
+# Purpose: Spending reports and budget rules for the mobile app.
+# Note: Reports read only daily_spending_rollups (never scans transactions), so multi-year ranges stay fast.
+
+from datetime import date
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db, unit_of_work
+from app.core.date_range import resolve_range
+from app.core.security import get_current_user
+from app.modules.finance import rollups
+from app.modules.finance.models import BudgetRule
+from app.modules.finance.budget_manager import budget_engine, reevaluate, to_spec, BUDGET_CURRENCY
+from app.modules.finance.schemas import (
+    SpendingSummaryResponse, InstitutionSummaryResponse,
+    BudgetRuleCreate, BudgetRuleOut, BudgetRuleChange, BudgetStatusResponse
+)
+
+router = APIRouter()
+
+TransactionType = Literal["WITHDRAW", "DEPOSIT"]
+
+
+@router.get("/summary", response_model=SpendingSummaryResponse)
+async def spending_summary(
+    period: Literal["day", "week", "month"] = "day",
+    start: date | None = None,
+    end: date | None = None,
+    type: TransactionType = "WITHDRAW",
+    currency: str = Query("VND", min_length=3, max_length=3),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    start, end = resolve_range(start, end)
+    buckets = await rollups.spending_by_period(db, user_id, start, end, period, type, currency.upper())
+    return {
+        "period": period,
+        "type_of_transaction": type,
+        "currency": currency.upper(),
+        "start": start,
+        "end": end,
+        "total": sum(bucket["total"] for bucket in buckets),
+        "buckets": buckets
+    }
+
+
+@router.get("/summary/institutions", response_model=InstitutionSummaryResponse)
+async def spending_by_institution(
+    start: date | None = None,
+    end: date | None = None,
+    type: TransactionType = "WITHDRAW",
+    currency: str = Query("VND", min_length=3, max_length=3),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    start, end = resolve_range(start, end)
+    institutions = await rollups.spending_by_institution(db, user_id, start, end, type, currency.upper())
+    return {
+        "type_of_transaction": type,
+        "currency": currency.upper(),
+        "start": start,
+        "end": end,
+        "total": sum(entry["total"] for entry in institutions),
+        "institutions": institutions
+    }
+
+
+# --- Budget rules ---
+
+@router.get("/budget/rules", response_model=list[BudgetRuleOut])
+async def list_budget_rules(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    rules = (await db.execute(
+        select(BudgetRule).where(BudgetRule.user_id == user_id, BudgetRule.is_active.is_(True)).order_by(BudgetRule.id)
+    )).scalars().all()
+    return [to_spec(rule) for rule in rules]
+
+
+@router.post("/budget/rules", response_model=BudgetRuleChange, status_code=status.HTTP_201_CREATED)
+async def create_budget_rule(
+    req: BudgetRuleCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Adds a rule and re-flags recent withdrawals against the new rule set.
+    """
+    async with unit_of_work(db):
+        rule = BudgetRule(user_id=user_id, **req.model_dump())
+        db.add(rule)
+        await db.flush()
+        result = await reevaluate(db, user_id)
+    budget_engine.invalidate(user_id)  # Counters / rules reload with the committed rule set
+    return {"rule": to_spec(rule), **result}
+
+
+@router.delete("/budget/rules/{rule_id}", response_model=BudgetRuleChange)
+async def delete_budget_rule(
+    rule_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    async with unit_of_work(db):
+        rule = await db.get(BudgetRule, rule_id)
+        if not rule or rule.user_id != user_id or not rule.is_active:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+        rule.is_active = False
+        await db.flush()
+        result = await reevaluate(db, user_id)
+    budget_engine.invalidate(user_id)  # Counters / rules reload with the committed rule set
+    return {"rule": to_spec(rule), **result}
+
+
+@router.post("/budget/reevaluate", response_model=BudgetRuleChange)
+async def reevaluate_budget(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    async with unit_of_work(db):
+        result = await reevaluate(db, user_id)
+    return result
+
+
+@router.get("/budget/status", response_model=BudgetStatusResponse)
+async def budget_status(
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    Spend so far in each rule's current window (served from the in-memory counters).
+    """
+    return {"currency": BUDGET_CURRENCY, "rules": await budget_engine.status(db, user_id)}
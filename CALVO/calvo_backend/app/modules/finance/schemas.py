@@ -0,0 +1,75 @@
+# File: app/modules/finance/schemas.py
+# Purpose: Request / response models for the finance APIs (spending summary, budget rules).
+
+from datetime import date
+from typing import Literal
+from pydantic import BaseModel, Field, model_validator
+
+
+class SpendingBucket(BaseModel):
+    period_start: date
+    total: float
+    count: int
+
+class SpendingSummaryResponse(BaseModel):
+    period: str             # day / week / month
+    type_of_transaction: str
+    currency: str
+    start: date
+    end: date
+    total: float
+    buckets: list[SpendingBucket]
+
+class InstitutionSpending(BaseModel):
+    institution: str
+    total: float
+    count: int
+
+class InstitutionSummaryResponse(BaseModel):
+    type_of_transaction: str
+    currency: str
+    start: date
+    end: date
+    total: float
+    institutions: list[InstitutionSpending]
+
+
+# --- Budget rules ---
+
+class BudgetRuleCreate(BaseModel):
+    window: Literal["TRANSACTION", "DAY", "WEEK", "MONTH"] = "MONTH"
+    limit_amount: float | None = Field(default=None, gt=0)
+    currency: str = Field(default="VND", min_length=3, max_length=3)
+    percent_of_balance: float | None = Field(default=None, gt=0, le=1)  # 0.2 = 20%
+    institution_name: str | None = None  # None = every account
+
+    @model_validator(mode="after")
+    def check_threshold(self):
+        if self.limit_amount is None and self.percent_of_balance is None:
+            raise ValueError("Set limit_amount and/or percent_of_balance")
+        self.currency = self.currency.upper()
+        return self
+
+class BudgetRuleOut(BaseModel):
+    id: int | None  # None for the built-in default rules
+    window: str
+    limit_amount: float | None = None
+    currency: str
+    percent_of_balance: float | None = None
+    institution_name: str | None = None
+
+class BudgetRuleChange(BaseModel):
+    rule: BudgetRuleOut | None = None
+    evaluated: int  # Withdrawals re-checked against the new rules
+    alerts: int
+
+class BudgetRuleStatus(BaseModel):
+    rule: BudgetRuleOut
+    window_start: date | None = None
+    spent: float | None = None      # In VND; None for TRANSACTION rules
+    limit: float | None = None      # In VND
+    remaining: float | None = None
+
+class BudgetStatusResponse(BaseModel):
+    currency: str
+    rules: list[BudgetRuleStatus]
@@ -2,17 +2,24 @@
 # Purpose: Business logic for processing transactions safely.
 # Language: English
 
+import logging
 from datetime import datetime
 from fastapi import Depends
-from app.core.database import get_db
-from sqlalchemy.orm import Session
+from app.core.database import get_async_db, UPSERT_DIALECTS
+from app.core import metrics
+from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.finance.models import Account, Transaction
+from app.modules.finance.account_cache import account_index
 from app.modules.finance import currency_service
-from app.modules.finance.budget_manager import BudgetManager
+from app.modules.finance.rollups import record_rollup
+from app.modules.finance.budget_manager import budget_engine, BUDGET_CURRENCY
 
+logger = logging.getLogger(__name__)
 
 
-def process_transaction(db: Session = Depends(get_db), 
+
+async def process_transaction(db: AsyncSession = Depends(get_async_db), 
                         user_id: int = None, 
                         institution_name: str = "General", 
                         amount: float = 0.0, 
@@ -22,9 +29,10 @@ def process_transaction(db: Session = Depends(get_db),
 ):
     """
     Safely processes a financial transaction with full business logic.
+    Does not commit: changes are written by the caller's unit of work.
     """
     
-    print(f"[Finance Service] Processing {transaction_type} {amount} {currency}")
+    logger.debug("Processing %s %s %s", transaction_type, amount, currency)
 
     # 1. Reject unsafe AI output or invalid types
     if transaction_type == "UNKNOWN" or amount is None:
@@ -33,77 +41,84 @@ def process_transaction(db: Session = Depends(get_db),
             "message": "Transaction type unclear or amount missing. Logged for review."
         }
 
-    # 2. Find account
-    query = db.query(Account).filter(Account.user_id == user_id)
-    
-    if institution_name != "General":
-        query = query.filter(Account.institution_name == institution_name)
-    
-    account = query.first()
+    # 2. Find account (per-user in-memory index, no DB round trip once loaded)
+    account = await account_index.find(db, user_id, institution_name)
 
     if not account:
-        account = Account(
-            user_id=user_id,
-            institution_name=institution_name,
-            balance=0.0,
-            currency=currency 
+        # Rare, only for a first-seen institution. Another worker may be creating the same account:
+        # the unique (user_id, institution_name) index makes both transactions land on one row.
+        insert = UPSERT_DIALECTS[db.get_bind().dialect.name]
+        await db.execute(
+            insert(Account)
+            .values(user_id=user_id, institution_name=institution_name, balance=0.0, currency=currency)
+            .on_conflict_do_nothing(index_elements=["user_id", "institution_name"])
         )
-        db.add(account)
-        db.commit()
-        db.refresh(account)
+        account = await account_index.find(db, user_id, institution_name)
 
     # 3. Normalize currency (QUAN TRỌNG: Giữ tính năng này)
     normalized_amount = amount
     if currency != account.currency:
-        try:
-            normalized_amount = currency_service.convert_currency(amount, currency, account.currency)
-        except Exception as e:
-            print(f"[Finance][WARN] Currency conversion failed: {e}. Using original amount.")
-            normalized_amount = amount
-
-    # 4. Budget alert check
-    is_alert = False
+        with metrics.stage_timer("fx_convert"):
+            try:
+                normalized_amount = currency_service.convert_currency(amount, currency, account.currency)
+            except Exception as e:
+                logger.warning("Currency conversion failed: %s. Using original amount.", e)
+                metrics.record_error("fx_convert")
+                metrics.record_fallback("fx_convert", "original_amount")
+                normalized_amount = amount
+
+    # 4. Update balance: atomic increment in SQL. The balance it returns is the current one
+    #    (the index is per process: other workers may have moved it), written through to the cache
+    delta = normalized_amount if transaction_type == "DEPOSIT" else -normalized_amount
+    new_balance = (await db.execute(
+        update(Account).where(Account.id == account.id)
+        .values(balance=func.coalesce(Account.balance, 0.0) + delta)
+        .returning(Account.balance)
+    )).scalar_one()
+    account_index.set_balance(db, user_id, account, new_balance)
+
+    # 5. Budget rules (per-user caps over rolling windows, in-memory running totals)
+    created_at = datetime.now()
+    violated_rules = []
+    budget_amount = 0.0
     if transaction_type == "WITHDRAW":
-        is_alert = BudgetManager.check_over_budget(normalized_amount, account.balance)
-
-    # 5. Update balance
-    if transaction_type == "DEPOSIT":
-        account.balance += normalized_amount
-    elif transaction_type == "WITHDRAW":
-        account.balance -= normalized_amount
-
-    # Auto-generate transaction id
-    last_transaction = db.query(Transaction).filter(Transaction.user_id == user_id).order_by(Transaction.id.desc()).first()
-    new_transaction_id = 1 if not last_transaction else last_transaction.id + 1
+        budget_amount = currency_service.convert_currency(normalized_amount, account.currency, BUDGET_CURRENCY)
+        balance_before = currency_service.convert_currency(new_balance - delta, account.currency, BUDGET_CURRENCY)
+        violated_rules = await budget_engine.evaluate(
+            db, user_id, account.id, account.institution_name, budget_amount, balance_before, created_at
+        )
+    is_alert = bool(violated_rules)
 
-    # 6. Save transaction history
+    # 6. Save transaction history (id is generated by the database on flush)
     new_trans = Transaction(
-        id = new_transaction_id,
         user_id=user_id,
         account_id=account.id,
         amount=amount,
         currency=currency,
         type_of_transaction=transaction_type,
-        created_at=datetime.now(),
-        account=account
+        is_over_budget_alert=is_alert,
+        created_at=created_at
     )
-
     db.add(new_trans)
-    db.commit()
-    db.refresh(new_trans) 
-    db.refresh(account)  
+
+    # 7. Daily spending rollup (same transaction, so reports always match the history)
+    await record_rollup(db, user_id, account.id, created_at.date(), transaction_type, account.currency, normalized_amount)
+    if transaction_type == "WITHDRAW":
+        budget_engine.record(db, user_id, account.id, budget_amount, created_at)
 
     # AI suggestion
     ai_suggestion = None
     if is_alert:
         ai_suggestion = "Consider limiting spending for the rest of the day."
 
-    print(f"[Finance][SUCCESS] New Balance: {account.balance} {account.currency}")
+    logger.debug("New balance: %s %s", new_balance, account.currency)
 
     return {
-        "new_balance": account.balance,
+        "new_balance": new_balance,
         "amount": amount,
         "created_at": received_at,
         "currency": currency,
         "type_of_transaction": transaction_type,
+        "is_over_budget_alert": is_alert,
+        "ai_suggestion": ai_suggestion,
     }
@@ -1,39 +1,77 @@
 # File: app/modules/gatekeeper/agent.py
 # Purpose: The Gatekeeper Agent.
 # Responsibility: Classify intent ONLY. Does NOT extract money or time (to save tokens).
+#                 Optional fused mode classifies and extracts in one call (GATEKEEPER_FUSED_MODE).
 
+import logging
 import json
-from openai import OpenAI
+import time
+from datetime import datetime
+from pydantic import ValidationError
+from openai import AsyncOpenAI
 from app.core.config import settings
-from opik import track
-from app.modules.prompts_config import SYSTEM_PROMPT_GATE_KEEPER
-from google_play_scraper import app
+from app.core import metrics, tracing
+from app.modules.prompts_config import SYSTEM_PROMPT_GATE_KEEPER, SYSTEM_PROMPT_FUSED
+from app.modules.prompt_compaction import compact_fields
+from app.modules.usage.services import usage_recorder
+from app.modules.gatekeeper.schemas import FusedResult
+from app.modules.gatekeeper.cache import classification_cache, template_fingerprint, summary_template, fill_summary
+from app.modules.gatekeeper.app_resolver import app_name_resolver
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-@track(name="Gatekeeper Classification")
-def classify_notification(app_name: str, content: str, title: str, received_at):
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+
+@tracing.trace("Gatekeeper Classification", route="gatekeeper.classify")
+@metrics.timed("classify")
+async def classify_notification(app_name: str, content: str, title: str, received_at):
     """
     Decides if the notification is FINANCE, SCHEDULE or OTHER.
     """
-    print(f"   [Gatekeeper] Classifying: {content[:30]}...") # BREAKPOINT
+    logger.debug("Classifying: %.30s...", content)
+
+    # 1. Same template seen before -> reuse its classification and summary, skip the LLM
+    fingerprint = template_fingerprint(app_name, title, content)
+    if settings.GATEKEEPER_CACHE_ENABLED:
+        cached = await classification_cache.get(fingerprint)
+        summary = fill_summary(cached.get("summary_template"), title, content) if cached else None
+        if summary is not None:
+            return {
+                "source_app": app_name,
+                "is_spam": cached["is_spam"],
+                "classification": cached["classification"],
+                "priority": cached["priority"],
+                "summary": summary,
+                "received_at": received_at,
+                "cached": True,
+            }
 
     system_prompt = SYSTEM_PROMPT_GATE_KEEPER
+    prompt_content, prompt_title = compact_fields("gatekeeper", content, title)
     
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"App: {app_name}, Content: {content}, Title: {title}"}
+                {"role": "user", "content": (
+                    f"App: {app_name}, Content: {prompt_content}, Title: {prompt_title}"
+                )}
             ],
             response_format={"type": "json_object"},
             temperature=0.3
         )
-        return json.loads(response.choices[0].message.content)
+        usage_recorder.record("gatekeeper", response)
+        result = json.loads(response.choices[0].message.content)
+
+        # 2. Remember confident answers for the next notification with this template
+        await remember_classification(fingerprint, result, title, content)
+        return result
     
     except Exception as e:
-        print(f"   [Gatekeeper] Error: {e}")
+        logger.warning("Classification failed: %s", e)
+        metrics.record_error("classify")
+        metrics.record_fallback("classify", "default_other")
         return {
                 "source_app": app_name,
                 "is_spam": False,
@@ -42,11 +80,73 @@ def classify_notification(app_name: str, content: str, title: str, received_at):
                 "priority": 3,
             }
     
-# Helper to get real app name from package name
-def get_real_app_name(package_name):
+async def remember_classification(fingerprint: str, result: dict, title: str, content: str):
+    """
+    Stores a confident classification in the template cache, with its summary as a template
+    (hits never see the raw notification text). Results whose summary cannot be templated are not cached.
+    """
+    confidence = result.get("confidence_score")
+    if not (settings.GATEKEEPER_CACHE_ENABLED
+            and isinstance(confidence, (int, float))
+            and confidence >= settings.GATEKEEPER_CACHE_MIN_CONFIDENCE
+            and result.get("classification")):
+        return
+    template = summary_template(result.get("summary"), title, content)
+    if template is None:
+        return
+    await classification_cache.put(fingerprint, {
+        "classification": result["classification"],
+        "priority": result.get("priority", 3),
+        "is_spam": bool(result.get("is_spam", False)),
+        "summary_template": template,
+    })
+
+@tracing.trace("Fused Classification + Extraction", route="gatekeeper.fused")
+@metrics.timed("classify_fused")
+async def classify_and_extract(app_name: str, content: str, title: str, received_at):
+    """
+    One structured-output call returning the Gatekeeper fields plus the CFO or Strategist fields.
+    Returns a validated dict, or None when the answer is unusable (caller falls back to the staged pipeline).
+    """
+    logger.debug("Fused classification: %.30s...", content)
+    current_time = datetime.now()
+    prompt_content, prompt_title = compact_fields("gatekeeper_fused", content, title)
+
     try:
-        result = app(package_name, lang='vi', country='vn')
-        return result['title']
-    except Exception:
-        # Nếu không tìm thấy, trả về phần cuối của package name làm dự phòng
-        return package_name.split('.')[-1].capitalize()
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT_FUSED},
+                {"role": "user", "content": (
+                    f"Current Time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                    f"Received At: {received_at}\n"
+                    f"App: {app_name}, Content: {prompt_content}, Title: {prompt_title}"
+                )}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1
+        )
+        usage_recorder.record("gatekeeper_fused", response)
+        result = FusedResult.model_validate_json(response.choices[0].message.content)
+    except ValidationError as e:
+        logger.warning("Fused result rejected, falling back: %d validation errors", e.error_count())
+        metrics.record_fallback("classify_fused", "invalid_output")
+        return None
+    except Exception as e:
+        logger.warning("Fused call failed, falling back: %s", e)
+        metrics.record_error("classify_fused")
+        metrics.record_fallback("classify_fused", "error")
+        return None
+
+    fused = result.model_dump()
+    await remember_classification(template_fingerprint(app_name, title, content), fused, title, content)
+    return fused
+
+# Helper to get real app name from package name
+async def get_real_app_name(package_name):
+    # Served from the resolver's cache; only never-seen packages wait on a Play Store scrape
+    # (timed inline rather than with @metrics.timed: the cache hit is only a few microseconds)
+    started = time.perf_counter()
+    name = await app_name_resolver.resolve(package_name)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "app_name_resolve")
+    return name
@@ -0,0 +1,185 @@
+# File: app/modules/gatekeeper/app_resolver.py
+# Purpose: Package name -> human readable app title (e.g. com.mbmobile -> MB Bank).
+# Responsibility: Keep Play Store scraping off the webhook path for every package seen before.
+
+import logging
+import time
+import asyncio
+import httpx
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import select
+from google_play_scraper import app
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, UPSERT_DIALECTS
+from app.modules.gatekeeper.models import AppPackage
+
+logger = logging.getLogger(__name__)
+
+
+def fallback_app_name(package_name: str) -> str:
+    # Nếu không tìm thấy, trả về phần cuối của package name làm dự phòng
+    return package_name.split('.')[-1].capitalize()
+
+
+# Only used when APP_RESOLVER_BASE_URL points at a JSON lookup service (e.g. the load-test stand-in)
+http_client = httpx.AsyncClient(timeout=5)
+
+
+async def fetch_app_title(package_name: str) -> str:
+    """
+    Scrapes the Play Store. google_play_scraper is blocking (urllib), so it runs in a thread.
+    """
+    if settings.APP_RESOLVER_BASE_URL:
+        response = await http_client.get(f"{settings.APP_RESOLVER_BASE_URL.rstrip('/')}/{package_name}")
+        response.raise_for_status()
+        return response.json()['title']
+    result = await asyncio.to_thread(app, package_name, lang='vi', country='vn')
+    return result['title']
+
+
+class AppNameResolver:
+    """
+    In-process LRU in front of the app_packages table.
+    - Known package, fresh      -> served from memory.
+    - Known package, stale      -> served from memory, refreshed in the background.
+    - Failed package            -> fallback name until the failure TTL expires.
+    - Memory miss               -> one table lookup (then one scrape if unknown), shared by
+                                   all concurrent callers of that package.
+    """
+
+    def __init__(self, max_entries: int, refresh_after: int, failure_ttl: int):
+        self.max_entries = max_entries
+        self.refresh_after = refresh_after
+        self.failure_ttl = failure_ttl
+        self._entries = OrderedDict()  # package_name -> (title, is_resolved, fetched_at_ts)
+        self._inflight = {}            # package_name -> asyncio.Task resolving to an entry (single flight)
+        self._background = set()       # strong refs to refresh tasks
+
+        self.hits = 0
+        self.misses = 0
+        self.scrapes = 0
+
+    async def warm(self):
+        """
+        Loads the most recently fetched packages into memory (called on startup).
+        """
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(AppPackage).order_by(AppPackage.fetched_at.desc()).limit(self.max_entries)
+            )).scalars().all()
+        for row in reversed(rows):
+            self._remember(row.package_name, row.title, row.is_resolved, row.fetched_at.timestamp())
+        logger.info("Warmed %d package names", len(rows))
+
+    async def resolve(self, package_name: str) -> str:
+        entry = self._entries.get(package_name)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(package_name)
+        else:
+            # The task is registered before anything is awaited, so concurrent misses join it
+            # (a background refresh already running for this package is joined as well).
+            # shield: a cancelled request must not cancel the work other callers share
+            task = self._inflight.get(package_name) or self._start(package_name, self._load_or_fetch(package_name))
+            entry = await asyncio.shield(task)
+
+        title, is_resolved, fetched_at = entry
+        age = time.time() - fetched_at
+        if (is_resolved and age > self.refresh_after) or (not is_resolved and age > self.failure_ttl):
+            self._refresh_in_background(package_name)
+        return title if is_resolved else fallback_app_name(package_name)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "scrapes": self.scrapes,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    async def _load_or_fetch(self, package_name: str):
+        """
+        Memory miss (evicted or not warmed): check the table, scrape only if the package is unknown.
+        """
+        async with AsyncSessionLocal() as db:
+            row = await db.get(AppPackage, package_name)
+        if row is not None:
+            self.hits += 1
+            return self._remember(row.package_name, row.title, row.is_resolved, row.fetched_at.timestamp())
+        # Never seen: the only case where callers wait on a scrape
+        self.misses += 1
+        return await self._fetch_and_store(package_name)
+
+    def _start(self, package_name: str, work) -> asyncio.Task:
+        task = asyncio.create_task(work)
+        self._inflight[package_name] = task
+        task.add_done_callback(lambda _: self._inflight.pop(package_name, None))
+        return task
+
+    def _refresh_in_background(self, package_name: str):
+        if package_name in self._inflight:
+            return
+        task = self._start(package_name, self._fetch_and_store(package_name))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _fetch_and_store(self, package_name: str):
+        self.scrapes += 1
+        try:
+            title, is_resolved = await fetch_app_title(package_name), True
+        except Exception as e:
+            logger.warning("Play Store lookup failed for %s: %s", package_name, e)
+            title, is_resolved = None, False
+
+        # Keep the last good title if a refresh of a known package fails
+        previous = self._entries.get(package_name)
+        if not is_resolved and previous and previous[1]:
+            title, is_resolved = previous[0], True
+
+        fetched_at = datetime.now()
+        entry = self._remember(package_name, title, is_resolved, fetched_at.timestamp())
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(self._upsert_statement(
+                    db.get_bind().dialect.name, package_name, title, is_resolved, fetched_at
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.warning("Could not persist %s: %s", package_name, e)
+        return entry
+
+    @staticmethod
+    def _upsert_statement(dialect_name: str, package_name: str, title, is_resolved: bool, fetched_at: datetime):
+        """
+        One INSERT ... ON CONFLICT DO UPDATE (no SELECT first, so it never upgrades a read lock).
+        A failed lookup never overwrites a stored good title.
+        """
+        insert = UPSERT_DIALECTS[dialect_name]
+        stmt = insert(AppPackage).values(
+            package_name=package_name, title=title, is_resolved=is_resolved, fetched_at=fetched_at
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=["package_name"],
+            set_={"title": stmt.excluded.title, "is_resolved": stmt.excluded.is_resolved,
+                  "fetched_at": stmt.excluded.fetched_at},
+            where=stmt.excluded.is_resolved | AppPackage.is_resolved.is_(False),
+        )
+
+    def _remember(self, package_name: str, title, is_resolved: bool, fetched_at: float):
+        entry = (title, is_resolved, fetched_at)
+        self._entries[package_name] = entry
+        self._entries.move_to_end(package_name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+app_name_resolver = AppNameResolver(
+    max_entries=settings.APP_RESOLVER_MAX_ENTRIES,
+    refresh_after=settings.APP_RESOLVER_REFRESH_AFTER_SECONDS,
+    failure_ttl=settings.APP_RESOLVER_FAILURE_TTL_SECONDS
+)
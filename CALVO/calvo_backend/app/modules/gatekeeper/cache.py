@@ -0,0 +1,213 @@
+# File: app/modules/gatekeeper/cache.py
+# Purpose: Template-fingerprint cache in front of the Gatekeeper LLM call.
+# Responsibility: Bank / OTP / delivery apps repeat the same template with only the
+#                 numbers changed, so we key on the template instead of the raw text.
+
+import re
+import json
+import asyncio
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+
+# Masked account / card numbers: ****1234, xxxx1234, TK 0123456789
+MASKED_ACCOUNT_PATTERN = re.compile(r"(?:\*{2,}|[xX]{3,})\s?\d+|\b(?:tk|stk|acc|account)\s*[:#]?\s*\d{6,}", re.IGNORECASE)
+# Amounts with an optional sign and currency: +5,000,000VND, -120.000 đ, $12.50
+AMOUNT_PATTERN = re.compile(
+    r"[+-]?\s?\$?\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?\s?(?:vnd|vnđ|đ|usd|eur|jpy|krw)?"
+    r"|[+-]?\s?\$?\d+(?:[.,]\d+)?\s?(?:vnd|vnđ|đ|usd|eur|jpy|krw)\b",
+    re.IGNORECASE
+)
+DIGITS_PATTERN = re.compile(r"\d+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Numbers as written, for summary templates: 50,000 / 1.000.000 / 10 / 22 (from 10:22)
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+# Slot in a summary template: <v2> = the third number of the notification
+SLOT_PATTERN = re.compile(r"<v(\d+)>")
+
+
+def normalize_template(text: str) -> str:
+    """
+    Replaces the variable parts of a notification with placeholders.
+    "TK ****1234 +5,000,000VND lúc 10:22" -> "tk <acct> <amount> lúc <num>:<num>"
+    """
+    text = (text or "").lower()
+    text = MASKED_ACCOUNT_PATTERN.sub(" <acct> ", text)
+    text = AMOUNT_PATTERN.sub(" <amount> ", text)
+    text = DIGITS_PATTERN.sub("<num>", text)
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def template_fingerprint(source_app: str, title: str, content: str) -> str:
+    """
+    Stable cache key for (source app, title template, content template).
+    """
+    key = "\x1f".join([(source_app or "").lower(), normalize_template(title), normalize_template(content)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _numbers(text: str) -> list[str]:
+    return NUMBER_PATTERN.findall(text or "")
+
+
+def _digits(number: str) -> str:
+    # "50,000" and "50.000" are the same number
+    return re.sub(r"[.,]", "", number)
+
+
+def summary_template(summary: str, title: str, content: str) -> str | None:
+    """
+    The model's summary with every number replaced by a slot pointing at the same number in
+    the notification. Notifications sharing a fingerprint differ only in their numbers, so
+    filling the slots gives the summary the model would have written.
+    None when a number cannot be traced back unambiguously (computed, or repeated with
+    different positions): such results are not cached.
+    """
+    if not summary:
+        return None
+    positions = {}
+    for index, number in enumerate(_numbers(f"{title}\n{content}")):
+        positions.setdefault(_digits(number), []).append(index)
+
+    def slot(match):
+        found = positions.get(_digits(match.group(0)), [])
+        if len(found) != 1:
+            raise LookupError(match.group(0))
+        return f"<v{found[0]}>"
+
+    try:
+        return NUMBER_PATTERN.sub(slot, summary)
+    except LookupError:
+        return None
+
+
+def fill_summary(template: str | None, title: str, content: str) -> str | None:
+    """
+    Summary for a cache hit: the template's slots filled from this notification's numbers.
+    None when there is no usable template (the caller asks the model instead).
+    """
+    if not template:
+        return None
+    numbers = _numbers(f"{title}\n{content}")
+    if any(int(index) >= len(numbers) for index in SLOT_PATTERN.findall(template)):
+        return None
+    return SLOT_PATTERN.sub(lambda m: numbers[int(m.group(1))], template)
+
+
+class ClassificationCache:
+    """
+    Two-tier cache: in-process LRU with TTL, plus an optional SQLite table that
+    survives restarts. Values are small dicts (classification, priority, is_spam).
+    The memory tier is only touched on the event loop; the SQLite tier runs in a worker
+    thread (asyncio.to_thread), so disk I/O never blocks the loop.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 86400, db_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # fingerprint -> (stored_at, value)
+        self._db_lock = threading.Lock()  # One sqlite3 connection shared by the worker threads
+        self._db = None
+        self._writes = 0
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS classification_cache ("
+                "fingerprint TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    async def get(self, fingerprint: str):
+        now = time.time()
+        entry = self._entries.get(fingerprint)
+        if entry and now - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self._entries[fingerprint]
+
+        # Fall through to the persistent tier
+        if self._db is not None:
+            row = await asyncio.to_thread(self._load, fingerprint)
+            if row and now - row[1] < self.ttl_seconds:
+                value = json.loads(row[0])
+                self._remember(fingerprint, row[1], value)
+                self.hits += 1
+                self.persistent_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def contains(self, fingerprint: str) -> bool:
+        """
+        Memory-tier check that does not count as a lookup.
+        """
+        entry = self._entries.get(fingerprint)
+        return entry is not None and time.time() - entry[0] < self.ttl_seconds
+
+    async def put(self, fingerprint: str, value: dict):
+        now = time.time()
+        self._remember(fingerprint, now, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._store, fingerprint, json.dumps(value), now)
+
+    def _load(self, fingerprint: str):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT payload, stored_at FROM classification_cache WHERE fingerprint = ?",
+                (fingerprint,)
+            ).fetchone()
+
+    def _store(self, fingerprint: str, payload: str, now: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO classification_cache (fingerprint, payload, stored_at) VALUES (?, ?, ?)",
+                (fingerprint, payload, now)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                # Expired rows are skipped on read; drop them now and then
+                self._db.execute(
+                    "DELETE FROM classification_cache WHERE stored_at < ?", (now - self.ttl_seconds,)
+                )
+            self._db.commit()
+
+    def _remember(self, fingerprint: str, stored_at: float, value: dict):
+        self._entries[fingerprint] = (stored_at, value)
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM classification_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+classification_cache = ClassificationCache(
+    max_entries=settings.GATEKEEPER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.GATEKEEPER_CACHE_TTL_SECONDS,
+    db_path=settings.GATEKEEPER_CACHE_DB_PATH
+)
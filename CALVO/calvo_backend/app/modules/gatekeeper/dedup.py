@@ -0,0 +1,130 @@
+# File: app/modules/gatekeeper/dedup.py
+# Purpose: Idempotent ingestion for reposted notifications (Android re-posts / updates the same one).
+# Responsibility: A duplicate returns the original result without any LLM call or DB write.
+#                 Memory first (recent keys + in-flight requests), then the stored log by key
+#                 (other workers, before a restart); the unique index on
+#                 notification_logs.dedup_key is the backstop for races.
+# Language: English
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper.models import NotificationLog
+
+
+def dedup_key(req) -> str:
+    """
+    sha256 of (user, app, title, content, received_at window). Whitespace is normalized;
+    reposts within the same DEDUP_WINDOW_SECONDS bucket share a key.
+    """
+    window = int(req.received_at.timestamp() // settings.DEDUP_WINDOW_SECONDS)
+    parts = [str(req.user_id), req.source_app, " ".join(req.title.split()), " ".join(req.content.split()), str(window)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def result_from_log(log) -> dict:
+    """
+    GatekeeperResponse rebuilt from a stored log (used when the original result is no longer in memory;
+    the sub-agent details are not stored with the log).
+    """
+    return {
+        "source_app": log.source_app,
+        "is_spam": bool(log.is_risk),
+        "priority": log.priority,
+        "content": log.raw_content,
+        "received_at": log.received_at,
+        "classification": log.category,
+        "finance_data": None,
+        "schedule_data": None,
+    }
+
+
+class RecentNotifications:
+    """
+    dedup key -> original GatekeeperResponse payload, LRU-bounded.
+    Also tracks keys being processed right now, so a repost arriving while the original
+    is still in the pipeline waits for it instead of classifying it again.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._inflight = {}    # key -> asyncio.Future resolved with the result (None if it failed)
+
+        self.hits = 0
+        self.misses = 0
+
+    async def find(self, key: str) -> dict | None:
+        """
+        The original result if `key` was seen recently (waits for an in-flight original).
+        """
+        result = self._results.get(key)
+        if result is None and key in self._inflight:
+            # shield: a cancelled duplicate must not cancel the original's future
+            result = await asyncio.shield(self._inflight[key])
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if key in self._results:
+            self._results.move_to_end(key)
+        return dict(result)
+
+    def begin(self, key: str):
+        """
+        Marks `key` as being processed (call after find() returned None).
+        """
+        if key not in self._inflight:
+            self._inflight[key] = asyncio.get_running_loop().create_future()
+
+    def finish(self, key: str, result: dict | None):
+        """
+        Ends processing: a result is remembered and handed to the waiting duplicates;
+        None (failure) lets them run the pipeline themselves.
+        """
+        if result is not None:
+            self.remember(key, result)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def remember(self, key: str, result: dict):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._results),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+recent_notifications = RecentNotifications(max_entries=settings.DEDUP_MAX_ENTRIES)
+
+
+async def load_original(keys: list[str]) -> dict:
+    """
+    key -> rebuilt result for the keys that already have a stored log.
+    Uses its own short session, so no read transaction stays open on the caller's session
+    while the agents run (it would block SQLite writers).
+    """
+    if not keys:
+        return {}
+    async with AsyncSessionLocal() as db:
+        logs = (await db.execute(
+            select(NotificationLog).where(NotificationLog.dedup_key.in_(keys))
+        )).scalars().all()
+    return {log.dedup_key: result_from_log(log) for log in logs}
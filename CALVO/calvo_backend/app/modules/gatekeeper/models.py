@@ -1,11 +1,21 @@
 # File: app/modules/gatekeeper/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
 
 class NotificationLog(Base):
     __tablename__ = "notification_logs"
+    __table_args__ = (
+        # Per-user timelines (briefing window, recent activity)
+        Index("ix_notification_logs_user_received", "user_id", "received_at"),
+        # /mobile/alerts: user + category + newest first
+        Index("ix_notification_logs_user_category_received", "user_id", "category", "received_at"),
+        # Briefing: logs of a user not yet included, in time order
+        Index("ix_notification_logs_user_briefing", "user_id", "is_included_in_briefing", "received_at"),
+        # Idempotent ingestion: one log per reposted notification (NULL for logs stored before dedup)
+        Index("ux_notification_logs_dedup_key", "dedup_key", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)                     # NOTE
@@ -14,15 +24,54 @@ class NotificationLog(Base):
     raw_content = Column(Text)
     summary = Column(String)
     category = Column(String) # FINANCE, SCHEDULE, IMPORTANT, TRASH
-    received_at = Column(DateTime, default=datetime.now)
+    received_at = Column(DateTime, default=datetime.now, index=True)  # Used by the retention job
     is_included_in_briefing = Column(Boolean, default=False)
     is_risk = Column(Boolean, default=False)
+    dedup_key = Column(String, nullable=True)  # gatekeeper/dedup.py dedup_key()
 
 class DailyBriefing(Base):
     __tablename__ = "daily_briefings"
+    __table_args__ = (
+        # One materialized briefing per user per day
+        Index("ix_daily_briefings_user_date", "user_id", "briefing_date", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True)
+    briefing_date = Column(Date, nullable=True)
     type = Column(String) # MORNING / EVENING
     content = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)  # Last rebuild
+
+class AppPackage(Base):
+    """
+    Known Android package name -> Play Store title (resolver cache, survives restarts).
+    """
+    __tablename__ = "app_packages"
+
+    package_name = Column(String, primary_key=True)
+    title = Column(String, nullable=True)
+    is_resolved = Column(Boolean, default=True)  # False = scrape failed (negative cache entry)
+    fetched_at = Column(DateTime, default=datetime.now)
+
+class IngestionJob(Base):
+    """
+    Durable queue entry for /webhook/async. Workers claim PENDING jobs whose
+    available_at has passed; failures are retried with backoff, then dead-lettered.
+    """
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        # Worker poll: next PENDING job that is due
+        Index("ix_ingestion_jobs_status_available", "status", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True)
+    payload = Column(Text)                          # WebhookRequest JSON
+    status = Column(String, default="PENDING")      # PENDING / RUNNING / DONE / DEAD
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)            # GatekeeperResponse JSON once DONE
+    available_at = Column(DateTime, default=datetime.now)
     created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,187 @@
+# File: app/modules/gatekeeper/queue.py
+# Purpose: Durable ingestion queue + worker pool behind /webhook/async.
+# Responsibility: Accept fast (202), process the full pipeline in the background with retries.
+
+import logging
+import json
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper.models import IngestionJob
+from app.modules.gatekeeper.schemas import WebhookRequest
+from app.modules.gatekeeper import services as gatekeeper_services
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueue:
+    """
+    Jobs live in the ingestion_jobs table, so accepted notifications survive a restart.
+    Workers claim a job with a single conditional UPDATE (status PENDING -> RUNNING),
+    which is safe with several workers and several processes.
+    A claim is a lease: the worker renews updated_at while it runs the job, and only RUNNING
+    jobs whose lease expired (worker crashed, process killed) are re-queued, so starting
+    another process never steals jobs that are still being processed.
+    """
+
+    def __init__(self, workers: int, max_attempts: int, retry_backoff: float, poll_interval: float, lease: float):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._next_recovery = 0.0
+
+        self.processed = 0
+        self.retried = 0
+        self.dead = 0
+        self.recovered = 0
+
+    async def enqueue(self, req: WebhookRequest) -> IngestionJob:
+        async with AsyncSessionLocal() as db:
+            job = IngestionJob(user_id=req.user_id, payload=req.model_dump_json())
+            db.add(job)
+            await db.commit()
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: int) -> IngestionJob | None:
+        async with AsyncSessionLocal() as db:
+            return await db.get(IngestionJob, job_id)
+
+    async def start(self):
+        await self.recover_expired()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(max(1, self.workers))]
+
+    async def recover_expired(self) -> int:
+        """
+        Jobs left RUNNING by a crashed worker (lease not renewed in time) go back to the queue.
+        """
+        self._next_recovery = asyncio.get_running_loop().time() + self.lease / 2
+        async with AsyncSessionLocal() as db:
+            recovered = (await db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.status == "RUNNING",
+                       IngestionJob.updated_at < datetime.now() - timedelta(seconds=self.lease))
+                .values(status="PENDING", updated_at=datetime.now())
+            )).rowcount
+            await db.commit()
+        if recovered:
+            self.recovered += recovered
+            logger.info("Re-queued %d interrupted jobs", recovered)
+        return recovered
+
+    async def stop(self):
+        # Waits for the workers to unwind, so no session is still closing when the engine is disposed
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"workers": len(self._tasks), "processed": self.processed, "retried": self.retried, "dead": self.dead,
+                "recovered": self.recovered}
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.warning("Worker %d could not claim a job: %s", worker_id, e)
+                job = None
+
+            if job is None:
+                # Idle: pick up jobs of crashed workers now and then (other processes included)
+                if asyncio.get_running_loop().time() >= self._next_recovery:
+                    try:
+                        await self.recover_expired()
+                    except Exception as e:
+                        logger.warning("Worker %d could not recover expired jobs: %s", worker_id, e)
+                # Sleep until a new job is enqueued or the next retry may be due
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _claim(self) -> IngestionJob | None:
+        # One write statement picks and claims the next due job, so concurrent workers
+        # never upgrade a read lock (SQLite) and never claim the same row twice
+        next_due = (
+            select(IngestionJob.id)
+            .where(IngestionJob.status == "PENDING", IngestionJob.available_at <= datetime.now())
+            .order_by(IngestionJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)  # PostgreSQL: workers skip rows being claimed; no-op on SQLite
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as db:
+            job_id = (await db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == next_due, IngestionJob.status == "PENDING")
+                .values(status="RUNNING", attempts=IngestionJob.attempts + 1, updated_at=datetime.now())
+                .returning(IngestionJob.id)
+            )).scalar()
+            await db.commit()
+            if job_id is None:
+                return None
+            return await db.get(IngestionJob, job_id)
+
+    async def _process(self, job: IngestionJob):
+        heartbeat = asyncio.create_task(self._renew_lease(job.id))
+        try:
+            req = WebhookRequest.model_validate_json(job.payload)
+            async with AsyncSessionLocal() as db:
+                result = await gatekeeper_services.ingest_notification(db, req)
+            await self._finish(job.id, status="DONE", result=json.dumps(result, default=str))
+            self.processed += 1
+        except Exception as e:
+            logger.exception("Job %s failed (attempt %d)", job.id, job.attempts)
+            if job.attempts >= self.max_attempts:
+                logger.error("Job %s dead-lettered after %d attempts: %s", job.id, job.attempts, e)
+                await self._finish(job.id, status="DEAD", last_error=str(e))
+                self.dead += 1
+            else:
+                delay = self.retry_backoff * (2 ** (job.attempts - 1))
+                await self._finish(job.id, status="PENDING", last_error=str(e),
+                                   available_at=datetime.now() + timedelta(seconds=delay))
+                self.retried += 1
+        finally:
+            heartbeat.cancel()
+
+    async def _renew_lease(self, job_id: int):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(IngestionJob).where(IngestionJob.id == job_id, IngestionJob.status == "RUNNING")
+                        .values(updated_at=datetime.now())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning("Could not renew the lease of job %s: %s", job_id, e)
+
+    async def _finish(self, job_id: int, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IngestionJob).where(IngestionJob.id == job_id).values(updated_at=datetime.now(), **values)
+            )
+            await db.commit()
+
+
+ingestion_queue = IngestionQueue(
+    workers=settings.INGESTION_WORKERS,
+    max_attempts=settings.INGESTION_MAX_ATTEMPTS,
+    retry_backoff=settings.INGESTION_RETRY_BACKOFF_SECONDS,
+    poll_interval=settings.INGESTION_POLL_INTERVAL_SECONDS,
+    lease=settings.INGESTION_LEASE_SECONDS
+)
@@ -0,0 +1,111 @@
+# File: app/modules/gatekeeper/retention.py
+# Purpose: Background retention job for notification_logs.
+# Responsibility: Delete expired logs in small batches, off the webhook path.
+
+import logging
+import time
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, or_
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper.models import NotificationLog, IngestionJob
+from app.modules.usage.models import LlmUsage
+
+logger = logging.getLogger(__name__)
+
+# Result of the most recent run (for inspection / monitoring)
+last_report = None
+
+
+def retention_policy() -> dict:
+    """
+    category -> retention days. None is the default for every unlisted category.
+    """
+    policy = {category: days for category, days in settings.LOG_RETENTION_DAYS_BY_CATEGORY.items()}
+    policy[None] = settings.LOG_RETENTION_DAYS
+    return policy
+
+
+async def _delete_batch(cutoff: datetime, category, listed_categories: list, batch_size: int) -> int:
+    """
+    Deletes at most batch_size expired rows in its own short transaction.
+    The id subquery walks the received_at index instead of scanning the table.
+    """
+    expired = select(NotificationLog.id).where(NotificationLog.received_at < cutoff)
+    if category is None:
+        expired = expired.where(or_(
+            NotificationLog.category.is_(None),
+            NotificationLog.category.notin_(listed_categories)
+        ))
+    else:
+        expired = expired.where(NotificationLog.category == category)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(NotificationLog).where(NotificationLog.id.in_(expired.limit(batch_size).scalar_subquery()))
+        )
+        await db.commit()
+    return result.rowcount or 0
+
+
+async def prune_notification_logs(now: datetime = None, batch_size: int = None) -> dict:
+    """
+    Runs one full retention pass. Returns rows pruned per category and time spent.
+    """
+    global last_report
+    now = now or datetime.now()
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    policy = retention_policy()
+    listed_categories = [c for c in policy if c is not None]
+
+    started = time.perf_counter()
+    pruned = {}
+    for category, days in policy.items():
+        cutoff = now - timedelta(days=days)
+        total = 0
+        while True:
+            deleted = await _delete_batch(cutoff, category, listed_categories, batch_size)
+            total += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)  # Let ingestion writes in between batches
+        pruned[category or "DEFAULT"] = total
+
+    # Finished ingestion jobs (their results are already in notification_logs)
+    async with AsyncSessionLocal() as db:
+        job_cutoff = now - timedelta(days=settings.INGESTION_JOB_RETENTION_DAYS)
+        pruned["INGESTION_JOBS"] = (await db.execute(
+            delete(IngestionJob).where(
+                IngestionJob.status.in_(["DONE", "DEAD"]),
+                IngestionJob.updated_at < job_cutoff
+            )
+        )).rowcount or 0
+        # LLM usage rows (the usage report reads them by date range)
+        usage_cutoff = now - timedelta(days=settings.LLM_USAGE_RETENTION_DAYS)
+        pruned["LLM_USAGE"] = (await db.execute(
+            delete(LlmUsage).where(LlmUsage.created_at < usage_cutoff)
+        )).rowcount or 0
+        await db.commit()
+
+    last_report = {
+        "rows_pruned": sum(pruned.values()),
+        "by_category": pruned,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "ran_at": now.isoformat(),
+    }
+    logger.info("Pruned %d logs in %s ms %s", last_report["rows_pruned"], last_report["elapsed_ms"], pruned)
+    return last_report
+
+
+async def run_retention_job():
+    """
+    Background loop started on app startup.
+    """
+    while True:
+        try:
+            await prune_notification_logs()
+        except Exception as e:
+            logger.warning("Pruning failed: %s", e)
+        await asyncio.sleep(settings.LOG_RETENTION_INTERVAL_SECONDS)
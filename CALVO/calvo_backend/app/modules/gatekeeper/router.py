@@ -1,121 +1,151 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from openai import OpenAI
-
-from app.core.database import get_db
+import logging
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db, run_write
 from app.core.config import settings
-from app.core import security
 
-from app.modules.gatekeeper import schemas, agent as gatekeeper_agent, models as gk_models
-from app.modules.finance import agent as cfo_agent, services as finance_services, models as cfo_models
-from app.modules.schedule import agent as strategist_agent, services as schedule_services, models as sch_models
+from app.modules.gatekeeper import schemas, services as gatekeeper_services, models as gk_models, dedup
+from app.modules.gatekeeper.queue import ingestion_queue
+from app.modules.mobile.services import briefing_scheduler
 
-import traceback
+logger = logging.getLogger(__name__)
 
-from app.modules.gatekeeper.agent import get_real_app_name
 
 
 router = APIRouter()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
 @router.post("/webhook", response_model=schemas.GatekeeperResponse)
-async def receive_notification(req: schemas.WebhookRequest, db: Session = Depends(get_db)):
+async def receive_notification(req: schemas.WebhookRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Receives notification, classifies it, validates security, and routes to sub-agents.
     """
+    return await gatekeeper_services.ingest_notification(db, req)
+
 
-    # Auto-clean logs older than 30 days
-    cutoff_date = datetime.now() - timedelta(days=30)
-    db.query(gk_models.NotificationLog).filter(
-        gk_models.NotificationLog.received_at < cutoff_date
-    ).delete()
-    
-
-    # 1. Classify notification
-    gk_result = gatekeeper_agent.classify_notification(
-         req.source_app, content=req.content, title=req.title, received_at=req.received_at
-    )
-    category = gk_result.get("classification")
-    summary = gk_result.get("summary")
-    priority = gk_result.get("priority")
-    action_log = f"Classified as {category} with priority {priority}."
-    source_app = get_real_app_name(req.source_app)
-
-    is_risk = gk_result.get("is_spam")
-
-    # # 2. Security Check (Only for Finance)
-    # if category == "FINANCE":
-    #     trust_check = security.verify_source_trust(db, req.user_id, req.source_app)
-    #     if not trust_check["is_trusted"]:
-    #         category = "RISK"
-    #         is_risk = True
-    #         priority = 5
-    #         summary = f"[SECURITY ALERT] {trust_check['reason']}"
-    #         action_log += f" -> BLOCKED by Security: {trust_check['reason']}"
-
-    # 3. Save Log
-    log = gk_models.NotificationLog(
-        id=None,
-        user_id=req.user_id,
-        received_at=req.received_at,
-        source_app=source_app,
-        raw_content=req.content,
-        is_included_in_briefing=False,
-        summary=summary,
-        category=category,
-        priority=priority,
-        is_risk=is_risk
-    )
-    db.add(log)
-
-    # 4. Route to agents if safe
-    if not is_risk:
-        if category == "FINANCE":
-            finance_data = cfo_agent.extract_financial_data(received_at=req.received_at,
-                                                            summary=summary, 
-                                                            user_lang="Vietnamese", 
-                                                            user_id=req.user_id
-                                                            )
-            if finance_data.get("amount") is not None:
-                # --- FIXED: USING KEYWORD ARGUMENTS TO PREVENT MISMATCH ---
-                finance_result = finance_services.process_transaction(
-                    db=db,
-                    user_id=req.user_id,
-                    amount=finance_data["amount"],
-                    currency=finance_data["currency"],
-                    transaction_type=finance_data["type_of_transaction"],
-                    institution_name=source_app,
-                    received_at=req.received_at
-                )
-
-                action_log += f" Finance result: {finance_result.get('status')}."
-            else:
-                 action_log += " CFO could not extract amount."
-
-        elif category == "SCHEDULE":
-            schedule_data = strategist_agent.extract_schedule_data(req.content)
-            if schedule_data.get("event_title") and schedule_data.get("start_time"):
-                schedule_result = schedule_services.create_event(
-                    db=db,
-                    user_id=req.user_id,
-                    title=schedule_data.get("event_title"),
-                    start_time_str=schedule_data.get("start_time"),
-                    end_time_str=schedule_data.get("end_time"),
-                    source=source_app
-                )
-                action_log += " Schedule event created."
-
-    db.commit()
-    
+@router.post("/webhook/batch", response_model=schemas.WebhookBatchResponse)
+async def receive_notification_batch(req: schemas.WebhookBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Ingests a burst of notifications (e.g. flushed after the phone reconnects).
+    Classification runs concurrently (bounded), DB writes run in order, and all
+    NotificationLog rows are written with a single bulk insert.
+    Reposts (already ingested, or repeated within the batch) reuse the original result.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.WEBHOOK_BATCH_CONCURRENCY))
+
+    async def analyze(item: schemas.WebhookRequest):
+        async with semaphore:
+            return await gatekeeper_services.analyze_notification(item)
+
+    # 0. Duplicates: memory first, then one query for the keys not seen recently
+    keys = [dedup.dedup_key(item) if settings.DEDUP_ENABLED else None for item in req.items]
+    originals = {}
+    for key in dict.fromkeys(k for k in keys if k):
+        original = await dedup.recent_notifications.find(key)
+        if original is not None:
+            originals[key] = original
+    originals.update(await dedup.load_original([k for k in dict.fromkeys(keys) if k and k not in originals]))
+
+    first_of_key = {}   # key -> index of the item that is actually processed
+    todo = []
+    for index, key in enumerate(keys):
+        if key in originals or (key is not None and key in first_of_key):
+            continue
+        if key is not None:
+            first_of_key[key] = index
+            dedup.recent_notifications.begin(key)
+        todo.append(index)
+
+    results_by_index = {}
+    try:
+        # 1. Classify every new item concurrently; a failure stays attached to its item
+        analyses = dict(zip(todo, await asyncio.gather(
+            *(analyze(req.items[index]) for index in todo), return_exceptions=True
+        )))
+
+        # 2. Persist sub-agent results one by one (the session is not concurrency-safe).
+        #    Everything is committed once; each item runs in a savepoint so a failure
+        #    only discards that item's writes.
+        async def persist(db: AsyncSession) -> dict:
+            results = {}
+            log_rows = []
+            for index, analysis in analyses.items():
+                item = req.items[index]
+                if isinstance(analysis, BaseException):
+                    logger.warning("Batch item %d failed to classify: %s", index, analysis)
+                    results[index] = {"index": index, "success": False, "error": str(analysis)}
+                    continue
+
+                try:
+                    async with db.begin_nested():
+                        result = await gatekeeper_services.apply_analysis(db, item, analysis)
+                except Exception as e:
+                    logger.exception("Batch item %d failed to persist", index)
+                    results[index] = {"index": index, "success": False, "error": str(e)}
+                    continue
+
+                log_rows.append(gatekeeper_services.build_log_row(item, analysis, keys[index]))
+                results[index] = {"index": index, "success": True, "result": result}
+
+            # 3. One bulk insert for all logs. A key stored concurrently by another process fails
+            #    the unique index and rolls the whole batch back (nothing posted twice; a retry is deduplicated)
+            if log_rows:
+                await db.execute(insert(gk_models.NotificationLog), log_rows)
+            return results
+
+        results_by_index = await run_write(db, persist)
+    finally:
+        for key, index in first_of_key.items():
+            outcome = results_by_index.get(index)
+            dedup.recent_notifications.finish(key, outcome["result"] if outcome and outcome["success"] else None)
+
+    results = []
+    for index, key in enumerate(keys):
+        if key in originals:
+            results.append({"index": index, "success": True, "result": originals[key]})
+        elif index in results_by_index:
+            results.append(results_by_index[index])
+        else:
+            # Repeated within this batch: same outcome as its first occurrence
+            results.append({**results_by_index[first_of_key[key]], "index": index})
+
+    for user_id in {req.items[index].user_id for index, r in results_by_index.items()
+                    if r["success"] and r["result"]["classification"] != "TRASH"}:
+        briefing_scheduler.mark_dirty(user_id)
+
+    succeeded = sum(1 for r in results if r["success"])
     return {
-        "source_app": source_app,
-        "is_spam": is_risk,
-        "priority": priority,
-        "content": req.content,
-        "received_at": req.received_at,
-        "classification": category,
-        "finance_data": finance_result if category == "FINANCE" else None,
-        "schedule_data": schedule_result if category == "SCHEDULE" else None
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
     }
 
+
+@router.post("/webhook/async", response_model=schemas.IngestionJobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def receive_notification_async(req: schemas.WebhookRequest):
+    """
+    Validates and durably queues the notification, then returns 202 immediately.
+    The ingestion workers run the same pipeline as /webhook; poll /webhook/jobs/{job_id}.
+    """
+    job = await ingestion_queue.enqueue(req)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/webhook/jobs/{job_id}", response_model=schemas.IngestionJobStatus)
+async def get_ingestion_job(job_id: int):
+    job = await ingestion_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "result": json.loads(job.result) if job.result else None,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
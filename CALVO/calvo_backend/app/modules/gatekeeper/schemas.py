@@ -2,7 +2,9 @@
 # Purpose: Define Pydantic models (DTOs) for API validation.
 
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Literal
+from pydantic import BaseModel, Field, model_validator
+from app.core.config import settings
 
 class WebhookRequest(BaseModel):
     user_id: int
@@ -21,3 +23,72 @@ class GatekeeperResponse(BaseModel):
     received_at: datetime
     finance_data: dict | None = None
     schedule_data: dict | None = None
+
+class WebhookBatchRequest(BaseModel):
+    items: list[WebhookRequest] = Field(min_length=1, max_length=settings.WEBHOOK_BATCH_MAX_ITEMS)
+
+class WebhookBatchItemResult(BaseModel):
+    index: int  # Position in the request, results are returned in the same order
+    success: bool
+    result: GatekeeperResponse | None = None
+    error: str | None = None
+
+class WebhookBatchResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: list[WebhookBatchItemResult]
+
+class IngestionJobAccepted(BaseModel):
+    job_id: int
+    status: str
+
+class IngestionJobStatus(BaseModel):
+    job_id: int
+    status: str  # PENDING / RUNNING / DONE / DEAD
+    attempts: int
+    last_error: str | None = None
+    result: GatekeeperResponse | None = None
+    created_at: datetime
+    updated_at: datetime
+
+# --- Fused mode: one LLM call returns the Gatekeeper fields plus CFO / Strategist fields ---
+
+class FusedFinance(BaseModel):
+    amount: float = Field(gt=0)
+    currency: str = "VND"
+    type_of_transaction: Literal["DEPOSIT", "WITHDRAW"]
+    created_at: str | None = None
+
+class FusedSchedule(BaseModel):
+    event_title: str = Field(min_length=1)
+    start_time: str
+    end_time: str | None = None
+
+    @model_validator(mode="after")
+    def check_time_format(self):
+        # Same format the Strategist returns and create_event parses
+        datetime.strptime(self.start_time, "%Y-%m-%d %H:%M")
+        if self.end_time:
+            datetime.strptime(self.end_time, "%Y-%m-%d %H:%M")
+        return self
+
+class FusedResult(BaseModel):
+    source_app: str | None = None
+    is_spam: bool
+    classification: Literal["FINANCE", "SCHEDULE", "OTHER"]
+    priority: int = Field(ge=1, le=5)
+    summary: str | None = None
+    reasoning: str | None = None
+    confidence_score: float | None = None
+    finance: FusedFinance | None = None
+    schedule: FusedSchedule | None = None
+
+    @model_validator(mode="after")
+    def check_payload_matches_classification(self):
+        # A FINANCE / SCHEDULE answer is only usable with its extraction attached
+        if not self.is_spam and self.classification == "FINANCE" and self.finance is None:
+            raise ValueError("FINANCE classification without finance fields")
+        if not self.is_spam and self.classification == "SCHEDULE" and self.schedule is None:
+            raise ValueError("SCHEDULE classification without schedule fields")
+        return self
@@ -0,0 +1,220 @@
+# File: app/modules/gatekeeper/services.py
+# Purpose: Notification pipeline shared by the single and batch webhooks.
+# Responsibility: Run the agents (no DB), then persist the outcome (DB only).
+
+import asyncio
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import run_write
+from app.core import security
+from app.modules.gatekeeper import agent as gatekeeper_agent
+from app.modules.gatekeeper.cache import classification_cache, template_fingerprint
+from app.modules.gatekeeper import dedup
+from app.modules.finance import agent as cfo_agent, services as finance_services
+from app.modules.schedule import agent as strategist_agent, services as schedule_services
+from app.modules.gatekeeper.schemas import WebhookRequest
+from app.modules.gatekeeper.models import NotificationLog
+from app.modules.usage.services import attribute_to
+from app.modules.mobile.services import briefing_scheduler
+
+
+async def analyze_notification(req: WebhookRequest) -> dict:
+    """
+    Stage 1: classification, app-name resolution and sub-agent extraction.
+    Touches no database state, so many notifications can be analyzed concurrently.
+    """
+    with attribute_to(req.user_id):  # Model calls below are billed to this user
+        # Fused mode only pays off on a cache miss: a cached template skips the classification call anyway
+        if settings.GATEKEEPER_FUSED_MODE and not classification_cache.contains(
+                template_fingerprint(req.source_app, req.title, req.content)):
+            analysis = await analyze_notification_fused(req)
+            if analysis is not None:
+                return analysis
+
+        # The Play Store lookup runs concurrently with the LLM call
+        gk_result, source_app = await asyncio.gather(
+            gatekeeper_agent.classify_notification(
+                req.source_app, content=req.content, title=req.title, received_at=req.received_at
+            ),
+            gatekeeper_agent.get_real_app_name(req.source_app)
+        )
+
+        analysis = {
+            "source_app": source_app,
+            "category": gk_result.get("classification"),
+            "summary": gk_result.get("summary"),
+            "priority": gk_result.get("priority"),
+            "is_risk": gk_result.get("is_spam"),
+            "finance_data": None,
+            "schedule_data": None,
+        }
+
+        # Route to sub-agents if safe
+        if not analysis["is_risk"]:
+            if analysis["category"] == "FINANCE":
+                analysis["finance_data"] = await cfo_agent.extract_financial_data(
+                    received_at=req.received_at,
+                    summary=analysis["summary"],
+                    user_lang="Vietnamese",
+                    user_id=req.user_id,
+                    content=req.content
+                )
+            elif analysis["category"] == "SCHEDULE":
+                analysis["schedule_data"] = await strategist_agent.extract_schedule_data(req.content)
+
+        return analysis
+
+
+async def analyze_notification_fused(req: WebhookRequest) -> dict | None:
+    """
+    Fused mode: one LLM call for classification + extraction.
+    Returns None if the combined answer failed validation (caller runs the staged pipeline).
+    """
+    fused, source_app = await asyncio.gather(
+        gatekeeper_agent.classify_and_extract(
+            req.source_app, content=req.content, title=req.title, received_at=req.received_at
+        ),
+        gatekeeper_agent.get_real_app_name(req.source_app)
+    )
+    if fused is None:
+        return None
+
+    is_risk = fused["is_spam"]
+    return {
+        "source_app": source_app,
+        "category": fused["classification"],
+        "summary": fused["summary"],
+        "priority": fused["priority"],
+        "is_risk": is_risk,
+        "finance_data": fused["finance"] if not is_risk and fused["classification"] == "FINANCE" else None,
+        "schedule_data": fused["schedule"] if not is_risk and fused["classification"] == "SCHEDULE" else None,
+    }
+
+
+def build_log_row(req: WebhookRequest, analysis: dict, dedup_key: str = None) -> dict:
+    """
+    Column values for the NotificationLog row of one notification.
+    """
+    return {
+        "dedup_key": dedup_key,
+        "user_id": req.user_id,
+        "received_at": req.received_at,
+        "source_app": analysis["source_app"],
+        "raw_content": req.content,
+        "is_included_in_briefing": False,
+        "summary": analysis["summary"],
+        "category": analysis["category"],
+        "priority": analysis["priority"],
+        "is_risk": analysis["is_risk"],
+    }
+
+
+async def apply_analysis(db: AsyncSession, req: WebhookRequest, analysis: dict) -> dict:
+    """
+    Stage 2: persist transactions / events and build the GatekeeperResponse payload.
+    The NotificationLog row itself is written by the caller.
+    """
+    finance_result = None
+    schedule_result = None
+
+    finance_data = analysis["finance_data"]
+    if finance_data and finance_data.get("amount") is not None:
+        # --- FIXED: USING KEYWORD ARGUMENTS TO PREVENT MISMATCH ---
+        finance_result = await finance_services.process_transaction(
+            db=db,
+            user_id=req.user_id,
+            amount=finance_data["amount"],
+            currency=finance_data["currency"],
+            transaction_type=finance_data["type_of_transaction"],
+            institution_name=analysis["source_app"],
+            received_at=req.received_at
+        )
+
+    schedule_data = analysis["schedule_data"]
+    if schedule_data and schedule_data.get("event_title") and schedule_data.get("start_time"):
+        schedule_result = await schedule_services.create_event(
+            db=db,
+            user_id=req.user_id,
+            title=schedule_data.get("event_title"),
+            start_time_str=schedule_data.get("start_time"),
+            end_time_str=schedule_data.get("end_time"),
+            source=analysis["source_app"]
+        )
+
+    return {
+        "source_app": analysis["source_app"],
+        "is_spam": analysis["is_risk"],
+        "priority": analysis["priority"],
+        "content": req.content,
+        "received_at": req.received_at,
+        "classification": analysis["category"],
+        "finance_data": finance_result,
+        "schedule_data": schedule_result
+    }
+
+
+async def ingest_notification(db: AsyncSession, req: WebhookRequest) -> dict:
+    """
+    Full pipeline for one notification (used by /webhook and the ingestion workers).
+    A repost of a notification already ingested returns the original result (no LLM call, no write).
+    """
+    if not settings.DEDUP_ENABLED:
+        return await run_pipeline(db, req)
+
+    key = dedup.dedup_key(req)
+    original = await dedup.recent_notifications.find(key)
+    if original is not None:
+        return original
+
+    # In flight before the DB lookup, so reposts arriving meanwhile wait for this one
+    dedup.recent_notifications.begin(key)
+    result = None
+    try:
+        # Not in this process's memory: stored by another worker or before a restart?
+        result = (await dedup.load_original([key])).get(key)
+        if result is None:
+            result = await run_pipeline(db, req, key)
+    except IntegrityError:
+        # Stored by another worker / before a restart: the unique index rejected this copy
+        # and the whole unit of work (transactions, balances) was rolled back with it
+        result = (await dedup.load_original([key])).get(key)
+        if result is None:
+            raise
+    finally:
+        dedup.recent_notifications.finish(key, result)
+    return result
+
+
+async def run_pipeline(db: AsyncSession, req: WebhookRequest, dedup_key: str = None) -> dict:
+    """
+    Classify, extract and persist one notification (no duplicate check).
+    """
+    # 1. Classify notification and run the sub-agents
+    # (before any write, so no DB write lock is held while the agents run)
+    # Old logs are pruned by the background retention job (gatekeeper/retention.py)
+    analysis = await analyze_notification(req)
+
+    # # 2. Security Check (Only for Finance)
+    # if analysis["category"] == "FINANCE":
+    #     trust_check = await security.verify_source_trust(db, req.user_id, req.source_app)
+    #     if not trust_check["is_trusted"]:
+    #         analysis.update(category="RISK", is_risk=True, priority=5, finance_data=None,
+    #                         summary=f"[SECURITY ALERT] {trust_check['reason']}")
+
+    # 3. Save log + sub-agent results in a single transaction (one commit;
+    #    grouped with concurrent requests in SQLite concurrent mode)
+    async def persist(db: AsyncSession) -> dict:
+        db.add(NotificationLog(**build_log_row(req, analysis, dedup_key)))
+        # Flushed first: a duplicate fails on the unique dedup key before touching any balance
+        await db.flush()
+        return await apply_analysis(db, req, analysis)
+
+    result = await run_write(db, persist)
+
+    # 4. New briefing material -> debounced rebuild of today's stored briefing
+    if analysis["category"] != "TRASH":
+        briefing_scheduler.mark_dirty(req.user_id)
+
+    return result
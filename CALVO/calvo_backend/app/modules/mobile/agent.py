@@ -1,52 +1,143 @@
-from datetime import date
-
-from sqlalchemy import func
+import logging
 from app.modules.gatekeeper.agent import classify_notification
-from app.modules.gatekeeper.models import NotificationLog, DailyBriefing
-from app.modules.prompts_config import SYSTEM_PROMPT_REPORTER
-from openai import OpenAI
+from app.modules.prompts_config import SYSTEM_PROMPT_REPORTER, SYSTEM_PROMPT_REPORTER_CHUNK
+from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core import metrics
+from app.modules.prompt_compaction import estimate_tokens, truncate
+from app.modules.usage.services import usage_recorder
+import asyncio
 import json
 
-def generate_mobile_briefing(db, user_id):
+logger = logging.getLogger(__name__)
+
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+
+# Longest summary kept per notification line (the Gatekeeper summary is "max 2 lines")
+MAX_SUMMARY_CHARS = 200
+# Map-reduce rounds before the remaining lines are cut down to the budget
+MAX_MAP_ROUNDS = 3
+
+DROPPED_LINES = metrics.registry.counter(
+    "calvo_briefing_dropped_lines_total", "Briefing lines dropped to fit BRIEFING_TOKEN_BUDGET after map-reduce.", ()
+)
+
+
+def serialize_log(received_at, category, priority, summary) -> str:
     """
-    USE AI AGENT TO GENERATE A BRIEFING FROM NOTIFICATION LOGS
+    One compact line per notification: "HH:MM|CATEGORY|P|summary".
     """
+    time_str = received_at.strftime("%H:%M") if received_at else "--:--"
+    summary = " ".join((summary or "").split())[:MAX_SUMMARY_CHARS]
+    return f"{time_str}|{category}|{priority}|{summary}"
 
 
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+def chunk_lines(lines: list, max_tokens: int) -> list:
+    chunks, current, current_tokens = [], [], 0
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        chunks.append(current)
+    return chunks
 
-    today = date.today()
 
-    logs = db.query(NotificationLog).filter(
-    # So sánh chỉ phần ngày của received_at với ngày hôm nay
-    func.date(NotificationLog.received_at) == today,
-    
-        NotificationLog.user_id == user_id,
-        NotificationLog.is_included_in_briefing == False,
-        NotificationLog.category != "TRASH"
-).order_by(NotificationLog.received_at.desc()).all()
-    
-    if not logs:
-        return None
+def line_priority(line: str) -> int:
+    # serialize_log() lines carry the Gatekeeper priority (1-5); map-step notes count as default (3)
+    parts = line.split("|", 3)
+    return int(parts[2]) if len(parts) == 4 and parts[2].isdigit() else 3
+
+
+def fit_to_budget(lines: list, max_tokens: int) -> list:
+    """
+    Drops the lowest-priority lines (oldest first among equals) until the rest fits in max_tokens,
+    keeping the original order. A single line still over the budget is truncated.
+    """
+    chars = len("\n".join(lines))
+    dropped = set()
+    for i in sorted(range(len(lines)), key=lambda i: line_priority(lines[i])):
+        if chars // 4 + 1 <= max_tokens or len(dropped) == len(lines) - 1:  # estimate_tokens() of the join
+            break
+        dropped.add(i)
+        chars -= len(lines[i]) + 1  # The line and its newline
+    kept = [line for i, line in enumerate(lines) if i not in dropped]
+    if kept and estimate_tokens("\n".join(kept)) > max_tokens:
+        kept = [truncate(kept[0], max_tokens - 1)]
+    return kept
+
 
+async def _chat_json(system_prompt: str, user_content: str):
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.2
+    )
+    usage_recorder.record("reporter", response)
+    return json.loads(response.choices[0].message.content)
+
+
+async def summarize_chunks(chunks: list) -> list:
+    """
+    Map step: condense each chunk of lines into short notes, in parallel (bounded).
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.BRIEFING_MAP_CONCURRENCY))
+
+    async def summarize(chunk):
+        async with semaphore:
+            notes = await _chat_json(SYSTEM_PROMPT_REPORTER_CHUNK, "\n".join(chunk))
+            return " ".join(str(notes.get("notes", "")).split())
+
+    return [n for n in await asyncio.gather(*(summarize(c) for c in chunks)) if n]
+
+
+@metrics.timed("reporter")
+async def generate_mobile_briefing(lines, previous_report=None):
+    """
+    USE AI AGENT TO GENERATE A BRIEFING FROM NOTIFICATION LOGS
+    lines: serialize_log() lines for the logs not yet included in today's briefing.
+    previous_report: today's stored report, updated with the new logs instead of rebuilt.
+    Above BRIEFING_TOKEN_BUDGET the lines are map-reduced; whatever is still over it after
+    MAX_MAP_ROUNDS is cut down (lowest priority first), so the prompt size stays bounded.
+    """
+
+    if not lines:
+        return None
 
     system_prompt = SYSTEM_PROMPT_REPORTER
-    user_content = logs
-    print(f"{user_content} [Reporter] Generating briefing for {len(logs)} logs")
+    logger.debug("Generating briefing for %d new logs", len(lines))
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": str(user_content)}
-            ],
-            temperature=0.2
-        )
+        # Map: summarize chunks until everything fits in one prompt
+        rounds = 0
+        while estimate_tokens("\n".join(lines)) > settings.BRIEFING_TOKEN_BUDGET and rounds < MAX_MAP_ROUNDS:
+            chunks = chunk_lines(lines, settings.BRIEFING_CHUNK_TOKENS)
+            logger.info("Over token budget: summarizing %d chunks", len(chunks))
+            lines = await summarize_chunks(chunks)
+            rounds += 1
+
+        # Notes that did not shrink enough: drop lines rather than send an oversized prompt
+        fitted = fit_to_budget(lines, settings.BRIEFING_TOKEN_BUDGET)
+        if fitted != lines:
+            logger.warning("Briefing still over token budget after %d rounds: dropped %d of %d lines",
+                           rounds, len(lines) - len(fitted), len(lines))
+            DROPPED_LINES.inc(amount=len(lines) - len(fitted))
+            lines = fitted
+
+        # Reduce: one call builds / updates the daily report
+        header = f"Previous report:\n{previous_report}\n\n" if previous_report else ""
+        body = "New notifications (time|category|priority|summary) or notes:\n" + "\n".join(lines)
         # Get the briefing text from the response
-        return json.loads(response.choices[0].message.content)
+        return await _chat_json(system_prompt, header + body)
 
     except Exception as e:
-        print(f"   [Reporter] Error generating briefing: {e}")
+        logger.warning("Error generating briefing: %s", e)
+        metrics.record_error("reporter")
         return None
@@ -2,32 +2,42 @@
 # Purpose: Mobile-friendly APIs for Flutter app.
 # Language: English
 
+from datetime import date
 from fastapi import APIRouter, Depends
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from opik import track
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core import tracing
+from app.core.database import get_db, get_async_db
 from app.core.security import get_current_user
 from app.modules.gatekeeper import models as gk_models
-from app.modules.mobile.agent import generate_mobile_briefing
+from app.modules.mobile.services import briefing_scheduler
 from app.modules.mobile.schemas import FrontendNotificationTrigger, MobileBriefingRequest
 
 router = APIRouter()
 
 @router.post("/briefing", response_model=MobileBriefingRequest)
-@track(name="Mobile Fetch Briefing")
+@tracing.trace("Mobile Fetch Briefing", route="mobile.briefing")
 async def fetch_briefing(req: FrontendNotificationTrigger,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    briefing = db.query(gk_models.DailyBriefing).filter(
-        gk_models.DailyBriefing.user_id == req.user_id
-    ).order_by(gk_models.DailyBriefing.created_at.desc()).first()
+    """
+    Serves the stored briefing (kept up to date by the webhook-triggered rebuilds).
+    """
+    briefing = (await db.execute(
+        select(gk_models.DailyBriefing).where(
+            gk_models.DailyBriefing.user_id == req.user_id
+        ).order_by(gk_models.DailyBriefing.briefing_date.desc()).limit(1)
+    )).scalars().first()
 
-    report = generate_mobile_briefing(db, req.user_id)
+    if not briefing or briefing.briefing_date != date.today():
+        # Nothing stored for today yet (e.g. logs arrived before a restart): build it in the background
+        briefing_scheduler.mark_dirty(req.user_id)
 
     if not briefing:
         return {
-            "report": report.get("report") if report else "No briefing available."
+            "report": "No briefing available."
         }
 
     return {
@@ -36,7 +46,7 @@ async def fetch_briefing(req: FrontendNotificationTrigger,
 
 
 @router.get("/alerts")
-@track(name="Mobile Fetch Alerts")
+@tracing.trace("Mobile Fetch Alerts", route="mobile.alerts")
 def fetch_alerts(
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user)
@@ -0,0 +1,139 @@
+# File: app/modules/mobile/services.py
+# Purpose: Materialized daily briefings.
+# Responsibility: Rebuild a user's stored briefing only when new non-TRASH logs arrive (debounced).
+
+import logging
+import asyncio
+from datetime import datetime, time, timedelta
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper.models import NotificationLog, DailyBriefing
+from app.modules.mobile.agent import generate_mobile_briefing, serialize_log
+from app.modules.usage.services import attribute_to
+
+logger = logging.getLogger(__name__)
+
+
+async def load_pending_lines(user_id: int, now: datetime) -> tuple[list, list, str | None]:
+    """
+    Read phase of a rebuild: today's not-yet-included logs as compact lines, plus the stored report.
+    Streams only the needed columns (no ORM objects) and closes the session before returning,
+    so no read transaction is held open during the LLM call.
+    """
+    day_start = datetime.combine(now.date(), time.min)
+    day_end = day_start + timedelta(days=1)
+
+    log_ids, lines = [], []
+    async with AsyncSessionLocal() as db:
+        # Half-open day range on (user_id, is_included_in_briefing, received_at)
+        result = await db.stream(
+            select(
+                NotificationLog.id, NotificationLog.category, NotificationLog.summary,
+                NotificationLog.priority, NotificationLog.received_at
+            ).where(
+                NotificationLog.user_id == user_id,
+                NotificationLog.is_included_in_briefing == False,
+                NotificationLog.received_at >= day_start,
+                NotificationLog.received_at < day_end,
+                NotificationLog.category != "TRASH"
+            ).order_by(NotificationLog.received_at).execution_options(yield_per=500)
+        )
+        async for log in result:
+            log_ids.append(log.id)
+            lines.append(serialize_log(log.received_at, log.category, log.priority, log.summary))
+
+        previous_report = (await db.execute(
+            select(DailyBriefing.content).where(
+                DailyBriefing.user_id == user_id,
+                DailyBriefing.briefing_date == now.date()
+            )
+        )).scalar()
+    return log_ids, lines, previous_report
+
+
+async def rebuild_briefing(user_id: int, now: datetime = None) -> bool:
+    """
+    Folds today's not-yet-included logs into the stored briefing and marks them included.
+    Returns True if the briefing changed.
+    """
+    now = now or datetime.now()
+
+    # 1. Read
+    log_ids, lines, previous_report = await load_pending_lines(user_id, now)
+
+    if not log_ids:
+        return False
+
+    # 2. Generate (map-reduce above the token budget)
+    with attribute_to(user_id):
+        report = await generate_mobile_briefing(lines, previous_report=previous_report)
+    if not report or not report.get("report"):
+        return False  # Logs stay pending; the next trigger retries
+
+    # 3. Write: upsert today's briefing and mark the folded logs
+    async with AsyncSessionLocal() as db:
+        briefing = (await db.execute(
+            select(DailyBriefing).where(
+                DailyBriefing.user_id == user_id,
+                DailyBriefing.briefing_date == now.date()
+            )
+        )).scalars().first()
+        if briefing is None:
+            briefing = DailyBriefing(user_id=user_id, briefing_date=now.date())
+            db.add(briefing)
+        briefing.type = "MORNING" if now.hour < 12 else "EVENING"
+        briefing.content = report["report"]
+        briefing.created_at = now
+
+        for start in range(0, len(log_ids), 500):
+            await db.execute(
+                update(NotificationLog)
+                .where(NotificationLog.id.in_(log_ids[start:start + 500]))
+                .values(is_included_in_briefing=True)
+            )
+        await db.commit()
+
+    logger.info("Rebuilt briefing for user %d with %d new logs", user_id, len(log_ids))
+    return True
+
+
+class BriefingScheduler:
+    """
+    Debounces rebuilds: all triggers for a user within the debounce window collapse
+    into one rebuild. A trigger that arrives while rebuilding schedules one more pass.
+    """
+
+    def __init__(self, debounce_seconds: float):
+        self.debounce_seconds = debounce_seconds
+        self._tasks = {}          # user_id -> running asyncio.Task
+        self._dirty_again = set()  # users triggered while their task was already running
+
+    def mark_dirty(self, user_id: int):
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            self._dirty_again.add(user_id)
+            return
+        self._tasks[user_id] = asyncio.create_task(self._run(user_id))
+
+    async def _run(self, user_id: int):
+        try:
+            while True:
+                await asyncio.sleep(self.debounce_seconds)
+                self._dirty_again.discard(user_id)
+                try:
+                    await rebuild_briefing(user_id)
+                except Exception as e:
+                    logger.warning("Rebuild failed for user %d: %s", user_id, e)
+                if user_id not in self._dirty_again:
+                    break
+        finally:
+            self._tasks.pop(user_id, None)
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+briefing_scheduler = BriefingScheduler(debounce_seconds=settings.BRIEFING_REBUILD_DEBOUNCE_SECONDS)
@@ -0,0 +1,87 @@
+# File: app/modules/prompt_compaction.py
+# Purpose: Keeps the notification text sent to the agents within a per-agent input token ceiling.
+# Responsibility: Normalize (invisible characters, whitespace, repeated lines / characters), then
+#                 truncate overlong content keeping its head and tail. Pure string work, no I/O.
+# Language: English
+
+import re
+
+from app.core.config import settings
+from app.core import metrics
+
+# Inserted where the middle of an overlong text was cut out
+TRUNCATION_MARKER = " […] "
+
+# Zero-width characters, BOM and control characters (tabs / newlines are handled as whitespace)
+_INVISIBLE = re.compile(r"[\u200b-\u200f\u2028\u2029\u2060-\u2064\ufeff\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+# The same non-digit character 4+ times in a row ("!!!!!!", "=======", emoji runs) -> 3
+_REPEATED_CHAR = re.compile(r"(\D)\1{3,}")
+
+TRUNCATIONS = metrics.registry.counter(
+    "calvo_prompt_truncations_total", "Notification texts cut down to the agent's input token ceiling.", ("agent",)
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting, and free to compute
+    return len(text) // 4 + 1
+
+
+def normalize(text: str) -> str:
+    """
+    Same meaning, fewer tokens: drops invisible characters, repeated lines (marketing footers,
+    reposted bodies) and long character runs, and collapses whitespace.
+    """
+    if not text:
+        return ""
+    text = _INVISIBLE.sub("", text)
+    lines, seen = [], set()
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if line and line not in seen:
+            seen.add(line)
+            lines.append(line)
+    return _REPEATED_CHAR.sub(r"\1\1\1", " ".join(lines))
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """
+    Keeps about two thirds of the budget from the head (sender, amount, subject) and one third
+    from the tail (balance, date, call to action).
+    """
+    budget = max_tokens * 4 - len(TRUNCATION_MARKER)
+    if len(text) <= max_tokens * 4 or budget <= 0:
+        return text[:max(0, max_tokens * 4)]
+    head = budget * 2 // 3
+    tail = budget - head
+    return text[:head].rstrip() + TRUNCATION_MARKER + text[len(text) - tail:].lstrip()
+
+
+def compact(agent: str, text: str) -> str:
+    """
+    Text ready for `agent`'s prompt. Agents without a ceiling in LLM_INPUT_TOKEN_CEILINGS
+    only get the normalization.
+    """
+    return compact_fields(agent, text)[0]
+
+
+def compact_fields(agent: str, *texts: str) -> list[str]:
+    """
+    Several fields of one prompt (e.g. content and title) under one shared ceiling: fields
+    shorter than an even share stay whole, the rest of the budget is split among the longer ones.
+    """
+    if not settings.PROMPT_COMPACTION_ENABLED:
+        return list(texts)
+    texts = [normalize(text) for text in texts]
+    ceiling = settings.LLM_INPUT_TOKEN_CEILINGS.get(agent)
+    if not ceiling or sum(estimate_tokens(text) for text in texts) <= ceiling:
+        return texts
+
+    TRUNCATIONS.inc(agent)
+    budgets, remaining = {}, ceiling
+    pending = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    while pending:
+        i = pending.pop(0)
+        budgets[i] = min(estimate_tokens(texts[i]), remaining // (len(pending) + 1))
+        remaining -= budgets[i]
+    return [text if len(text) <= budgets[i] * 4 else truncate(text, budgets[i]) for i, text in enumerate(texts)]
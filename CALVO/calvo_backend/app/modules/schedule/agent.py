@@ -2,20 +2,26 @@
 # Purpose: The Strategist Agent.
 # Responsibility: Extract event title and standard datetime format.
 
+import logging
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.config import settings
-from opik import track
+from app.core import metrics, tracing
+from app.modules.prompt_compaction import compact
+from app.modules.usage.services import usage_recorder
 from datetime import datetime
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-@track(name="Strategist Agent Extraction")
-def extract_schedule_data(content: str):
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+
+@tracing.trace("Strategist Agent Extraction", route="strategist.extract")
+@metrics.timed("schedule_extract")
+async def extract_schedule_data(content: str):
     """
     Parses text to find event details.
     """
-    print(f"   [Strategist Agent] Analyzing time: {content[:50]}...") # BREAKPOINT
+    logger.debug("Analyzing time: %.50s...", content)
     current_time = datetime.now()
     system_prompt = f"""
     Role: Expert Scheduler.
@@ -38,16 +44,19 @@ def extract_schedule_data(content: str):
     """
     
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": content}
+                {"role": "user", "content": compact("strategist", content)}
             ],
             response_format={"type": "json_object"},
             temperature=0.5
         )
+        usage_recorder.record("strategist", response)
         return json.loads(response.choices[0].message.content)
     except Exception as e:
-        print(f"   [Strategist Agent] Error: {e}")
+        logger.warning("Extraction failed: %s", e)
+        metrics.record_error("schedule_extract")
+        metrics.record_fallback("schedule_extract", "error")
         return {"event_title": None, "start_time": None, "end_time": None}
@@ -1,15 +1,20 @@
 # File: app/modules/schedule/services.py
 # Purpose: Save events to database.
 
-from sqlalchemy.orm import Session
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import metrics
 from app.modules.schedule.models import Schedule
 from datetime import datetime, timedelta
 
-def create_event(db: Session, user_id: int, title: str, start_time_str: str, source: str, end_time_str: str = None) -> dict:
+logger = logging.getLogger(__name__)
+
+async def create_event(db: AsyncSession, user_id: int, title: str, start_time_str: str, source: str, end_time_str: str = None) -> dict:
     """
     Creates a new calendar event.
+    Does not commit: changes are written by the caller's unit of work.
     """
-    print(f"   [Schedule Service] Creating event: {title} at {start_time_str}") # BREAKPOINT
+    logger.debug("Creating event: %s at %s", title, start_time_str)
     
     # Parse time string to Python datetime object
     try:
@@ -18,13 +23,15 @@ def create_event(db: Session, user_id: int, title: str, start_time_str: str, sou
     except:
         # Fallback: If AI fails format, set for 1 hour later
         start_time = datetime.now() + timedelta(hours=1)
-        print("   [Schedule Service] ⚠️ Time parsing failed. Using fallback +1h.")
+        logger.warning("Time parsing failed for %r. Using fallback +1h.", start_time_str)
+        metrics.record_fallback("schedule_time_parse", "start_plus_1h")
 
     try:
         end_time = end_time_str and datetime.strptime(end_time_str, "%Y-%m-%d %H:%M") or None
     except:
         end_time = None
-        print("   [Schedule Service] ⚠️ End time parsing failed. Setting to None.")
+        logger.warning("End time parsing failed for %r. Setting to None.", end_time_str)
+        metrics.record_fallback("schedule_time_parse", "end_none")
 
     new_event = Schedule(
         user_id=user_id,
@@ -35,8 +42,8 @@ def create_event(db: Session, user_id: int, title: str, start_time_str: str, sou
         is_auto_generated=True
     )
     db.add(new_event)
-    db.commit()
-    db.refresh(new_event)
+    # Flush (not commit) to get the database-generated id; the caller commits once
+    await db.flush()
     
     return {
         "status": "created",
@@ -0,0 +1,29 @@
+# File: app/modules/usage/models.py
+# Purpose: Per-call LLM token accounting.
+# Language: English
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from app.core.database import Base
+from datetime import datetime
+
+class LlmUsage(Base):
+    """
+    One row per successful model call (written in batches by the usage recorder).
+    """
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        # Report ranges, per agent / per user
+        Index("ix_llm_usage_created_at", "created_at"),
+        Index("ix_llm_usage_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True)     # None: call not made on behalf of a user
+    agent = Column(String)                       # gatekeeper, gatekeeper_fused, cfo, strategist, reporter
+    model = Column(String)
+
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)        # From LLM_PRICES_USD_PER_1M_TOKENS at call time
+
+    created_at = Column(DateTime, default=datetime.now)
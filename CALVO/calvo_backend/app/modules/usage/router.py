@@ -0,0 +1,38 @@
+# File: app/modules/usage/router.py
+# Purpose: LLM token / cost reports (per agent, per user).
+# Note: /report covers every user (operators only: X-Admin-Token); /me is the signed-in user's own usage.
+
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_async_db
+from app.core.date_range import resolve_range
+from app.core.security import get_current_user, require_admin
+from app.modules.usage.services import usage_report
+from app.modules.usage.schemas import UsageReportResponse
+
+router = APIRouter()
+
+
+@router.get("/report", response_model=UsageReportResponse, dependencies=[Depends(require_admin)])
+async def read_usage_report(
+    start: date | None = None,
+    end: date | None = None,
+    user_id: int | None = None,
+    top_users: int = Query(20, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    start, end = resolve_range(start, end)
+    return await usage_report(db, start, end, user_id=user_id, top_users=top_users)
+
+
+@router.get("/me", response_model=UsageReportResponse)
+async def read_my_usage(
+    start: date | None = None,
+    end: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user)
+):
+    start, end = resolve_range(start, end)
+    return await usage_report(db, start, end, user_id=user_id, top_users=1)
@@ -0,0 +1,26 @@
+# File: app/modules/usage/schemas.py
+# Purpose: Response models for the LLM usage report.
+
+from datetime import date
+from pydantic import BaseModel
+
+
+class UsageTotals(BaseModel):
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    cost_usd: float
+
+class AgentUsage(UsageTotals):
+    agent: str
+
+class UserUsage(UsageTotals):
+    user_id: int | None     # None: calls not made on behalf of a user
+
+class UsageReportResponse(BaseModel):
+    start: date
+    end: date
+    total: UsageTotals
+    by_agent: list[AgentUsage]
+    by_user: list[UserUsage]
@@ -0,0 +1,187 @@
+# File: app/modules/usage/services.py
+# Purpose: Token and cost accounting for every model call, per agent and per user.
+# Responsibility: Agents hand their response to usage_recorder.record() (in-memory, no I/O);
+#                 a background task writes the buffered rows in one insert per flush interval.
+# Language: English
+
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import select, insert, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core import metrics
+from app.modules.usage.models import LlmUsage
+
+logger = logging.getLogger(__name__)
+
+# User the current model calls are made for (set around the pipeline / briefing of one user)
+_current_user = contextvars.ContextVar("usage_user", default=None)
+
+# Models already warned about (no entry in LLM_PRICES_USD_PER_1M_TOKENS)
+_unpriced_models = set()
+
+
+@contextmanager
+def attribute_to(user_id: int):
+    """
+    with attribute_to(req.user_id): ...  -> calls inside (including gathered tasks) are billed to user_id.
+    """
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def price_of(model: str) -> tuple[float, float]:
+    """
+    (prompt, completion) USD per 1M tokens. Dated model names ("gpt-4o-mini-2024-07-18")
+    use the longest configured prefix; unknown models cost 0 (and are logged once).
+    """
+    prices = settings.LLM_PRICES_USD_PER_1M_TOKENS
+    if model in prices:
+        return tuple(prices[model])
+    matches = [name for name in prices if model.startswith(name)]
+    if not matches:
+        if model not in _unpriced_models:
+            _unpriced_models.add(model)
+            logger.warning("No price configured for model %s; its calls are recorded with cost 0", model)
+        return 0.0, 0.0
+    return tuple(prices[max(matches, key=len)])
+
+
+class UsageRecorder:
+    """
+    Bounded buffer of usage rows. When the database falls behind, the oldest rows are
+    dropped (and counted) rather than growing memory; the Prometheus counters still see every call.
+    """
+
+    def __init__(self, max_pending: int):
+        self._pending = deque(maxlen=max_pending)
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def record(self, agent: str, response):
+        """
+        Called right after a successful chat.completions.create().
+        """
+        metrics.record_llm_usage(agent, response)
+        usage = getattr(response, "usage", None)
+        if usage is None or not settings.LLM_USAGE_ACCOUNTING_ENABLED:
+            return
+        model = getattr(response, "model", None) or "unknown"
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        prompt_price, completion_price = price_of(model)
+
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append({
+            "user_id": _current_user.get(),
+            "agent": agent,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000,
+            "created_at": datetime.now(),
+        })
+        self.recorded += 1
+
+    async def flush(self) -> int:
+        """
+        Writes everything buffered in one INSERT, in its own short transaction. Returns rows written.
+        """
+        if not self._pending:
+            return 0
+        rows = list(self._pending)
+        self._pending.clear()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(LlmUsage), rows)
+                await db.commit()
+        except Exception as e:
+            self.failed += len(rows)
+            logger.warning("Writing %d usage rows failed: %s", len(rows), e)
+            return 0
+        self.written += len(rows)
+        return len(rows)
+
+    async def run_flusher(self):
+        """
+        Long-running task started with the app.
+        """
+        while True:
+            await asyncio.sleep(settings.LLM_USAGE_FLUSH_INTERVAL_SECONDS)
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "recorded": self.recorded, "written": self.written,
+                "dropped": self.dropped, "failed": self.failed}
+
+
+usage_recorder = UsageRecorder(max_pending=settings.LLM_USAGE_MAX_PENDING)
+
+metrics.registry.gauge_function(
+    "calvo_llm_usage_rows", "Usage rows by outcome since start.", ("outcome",),
+    lambda: {("written",): usage_recorder.written, ("dropped",): usage_recorder.dropped,
+             ("failed",): usage_recorder.failed}
+)
+
+
+# --- Reports ---
+
+_TOTALS = (
+    func.count(LlmUsage.id).label("calls"),
+    func.coalesce(func.sum(LlmUsage.prompt_tokens), 0).label("prompt_tokens"),
+    func.coalesce(func.sum(LlmUsage.completion_tokens), 0).label("completion_tokens"),
+    func.coalesce(func.sum(LlmUsage.cost_usd), 0.0).label("cost_usd"),
+)
+
+
+def _as_dict(row) -> dict:
+    return {
+        "calls": row.calls,
+        "prompt_tokens": row.prompt_tokens,
+        "completion_tokens": row.completion_tokens,
+        "total_tokens": row.prompt_tokens + row.completion_tokens,
+        "cost_usd": round(row.cost_usd, 6),
+    }
+
+
+async def usage_report(db: AsyncSession, start: date, end: date, user_id: int = None, top_users: int = 20) -> dict:
+    """
+    Totals for [start, end] (whole days), by agent and by user (most expensive users first).
+    Rows still buffered in memory are flushed first so the report includes them.
+    """
+    await usage_recorder.flush()
+
+    since = datetime.combine(start, time.min)
+    until = datetime.combine(end + timedelta(days=1), time.min)
+    conditions = [LlmUsage.created_at >= since, LlmUsage.created_at < until]
+    if user_id is not None:
+        conditions.append(LlmUsage.user_id == user_id)
+
+    total = (await db.execute(select(*_TOTALS).where(*conditions))).one()
+    by_agent = (await db.execute(
+        select(LlmUsage.agent, *_TOTALS).where(*conditions).group_by(LlmUsage.agent).order_by(LlmUsage.agent)
+    )).all()
+    by_user = (await db.execute(
+        select(LlmUsage.user_id, *_TOTALS).where(*conditions)
+        .group_by(LlmUsage.user_id).order_by(func.sum(LlmUsage.cost_usd).desc()).limit(top_users)
+    )).all()
+
+    return {
+        "start": start,
+        "end": end,
+        "total": _as_dict(total),
+        "by_agent": [{"agent": row.agent, **_as_dict(row)} for row in by_agent],
+        "by_user": [{"user_id": row.user_id, **_as_dict(row)} for row in by_user],
+    }
@@ -0,0 +1,380 @@
+# File: benchmarks/pipeline.py
+# Purpose: Per-stage micro-benchmarks for the notification pipeline, with baselines and regression checks.
+# Usage (from calvo_backend):
+#   python -m benchmarks.pipeline --size 10k --save benchmarks/baselines/10k.json
+#   python -m benchmarks.pipeline --size 10k --compare benchmarks/baselines/10k.json --threshold 0.15
+# Note: Model clients are replaced by an in-process stand-in (no network, no latency), so the numbers
+#       measure our own code: response handling, caches, SQL and time parsing.
+#       Seeded databases are built once per size under --data-dir and reused.
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import argparse
+import platform
+import statistics
+import contextlib
+from datetime import datetime, timedelta
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BENCH_USER = 1          # Has a fixed-size briefing backlog whatever the table size
+BENCH_PENDING_LOGS = 200
+USERS = 1000
+
+
+# --- Seeding ---
+
+def seed_database(path: str, logs: int, seed: int = 42):
+    """
+    Synthetic history: `logs` notification logs spread over 90 days and USERS users,
+    logs // 10 transactions, logs // 20 events, 3 accounts per user.
+    Written with plain sqlite3 (executemany, one transaction) to keep 10M rows practical.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=OFF")
+    con.execute("PRAGMA synchronous=OFF")
+    categories = ["FINANCE", "SCHEDULE", "OTHER", "TRASH"]
+    banks = ["Vietcombank", "Techcombank", "MB Bank"]
+
+    con.executemany(
+        "INSERT INTO accounts (user_id, institution_name, balance, currency) VALUES (?, ?, ?, ?)",
+        ((user, bank, rng.randint(1, 500) * 100000.0, "VND") for user in range(1, USERS + 1) for bank in banks)
+    )
+
+    def log_rows():
+        for n in range(logs - BENCH_PENDING_LOGS):
+            received = now - timedelta(minutes=rng.randint(24 * 60, 90 * 24 * 60))
+            yield (rng.randint(2, USERS), "MB Bank", rng.randint(1, 5), f"log {n}", f"summary {n}",
+                   rng.choice(categories), received, True, False)
+        # Today's pending backlog of the benchmark user (what a briefing rebuild reads)
+        for n in range(BENCH_PENDING_LOGS):
+            received = now.replace(hour=0, minute=0, second=0) + timedelta(seconds=n * 30)
+            yield (BENCH_USER, "MB Bank", rng.randint(2, 5), f"pending {n}", f"Payment of {n * 1000} VND",
+                   rng.choice(categories[:3]), received, False, False)
+
+    con.executemany(
+        "INSERT INTO notification_logs (user_id, source_app, priority, raw_content, summary, category,"
+        " received_at, is_included_in_briefing, is_risk) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        log_rows()
+    )
+    con.executemany(
+        "INSERT INTO transactions (user_id, account_id, amount, currency, type_of_transaction,"
+        " is_over_budget_alert, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((user, (user - 1) * 3 + rng.randint(1, 3), rng.randint(10, 5000) * 1000.0, "VND",
+          rng.choice(["WITHDRAW", "WITHDRAW", "DEPOSIT"]), False,
+          now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)))
+         for user in (rng.randint(1, USERS) for _ in range(logs // 10)))
+    )
+    con.executemany(
+        "INSERT INTO schedules (user_id, title, start_time, end_time, is_auto_generated, source_app)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        ((rng.randint(1, USERS), f"event {n}", now + timedelta(hours=n % 500), None, True, "Zalo")
+         for n in range(logs // 20))
+    )
+    con.commit()
+    con.execute("ANALYZE")
+    con.close()
+
+
+# --- In-process model stand-in ---
+
+class MockCompletions:
+    """
+    Replaces client.chat.completions: schema-valid answers from the load-test stand-in, no I/O.
+    """
+
+    async def create(self, model=None, messages=None, **kwargs):
+        from types import SimpleNamespace
+        from loadtest.fake_services import build_content, detect_agent
+        system_prompt = messages[0]["content"]
+        user_text = messages[-1]["content"]
+        content = json.dumps(build_content(detect_agent(system_prompt), system_prompt, user_text), ensure_ascii=False)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(system_prompt) // 4, completion_tokens=len(content) // 4,
+                                  total_tokens=(len(system_prompt) + len(content)) // 4)
+        )
+
+
+def mock_model_clients():
+    for module in list(sys.modules.values()):
+        client = getattr(module, "client", None) if getattr(module, "__name__", "").startswith("app.") else None
+        if client is not None and hasattr(client, "chat"):
+            client.chat.completions = MockCompletions()
+
+
+# --- Harness ---
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, iterations: int = 200, inner: int = 1):
+    """
+    Registers an async fn(ctx, i). `inner` = operations per call (for sub-microsecond functions).
+    """
+    def register(fn):
+        BENCHMARKS.append((name, fn, iterations, inner))
+        return fn
+    return register
+
+
+async def measure(fn, ctx: dict, iterations: int, inner: int) -> dict:
+    for i in range(min(10, iterations)):  # Warm-up (caches, prepared statements)
+        await fn(ctx, -1 - i)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await fn(ctx, i)
+        samples.append((time.perf_counter() - started) / inner * 1e6)
+    samples.sort()
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_us": round(samples[0], 3),
+        "ops": iterations * inner,
+    }
+
+
+# --- Benchmarks ---
+
+@benchmark("gatekeeper.classify_notification.miss", iterations=300)
+async def bench_classify_miss(ctx, i):
+    from app.modules.gatekeeper import agent
+    # Digits are normalized away by the template fingerprint: make a distinct word instead
+    tag = "".join(chr(97 + int(d)) for d in f"{ctx['run']}{i + 10**6}")
+    await agent.classify_notification("MB Bank", f"TK ****1234 -{i + 100},000VND ref {tag}", "MB Bank", datetime.now())
+
+
+@benchmark("gatekeeper.classify_notification.hit", iterations=1000)
+async def bench_classify_hit(ctx, i):
+    from app.modules.gatekeeper import agent
+    await agent.classify_notification("MB Bank", "TK ****1234 -50,000VND luc 10:22 SD: 1,000,000VND",
+                                      "MB Bank", datetime.now())
+
+
+@benchmark("gatekeeper.get_real_app_name.hit", iterations=200, inner=100)
+async def bench_app_name_hit(ctx, i):
+    from app.modules.gatekeeper import agent
+    for _ in range(100):
+        await agent.get_real_app_name("com.mbmobile")
+
+
+@benchmark("gatekeeper.get_real_app_name.miss", iterations=200)
+async def bench_app_name_miss(ctx, i):
+    from app.modules.gatekeeper import agent
+    await agent.get_real_app_name(f"vn.bench.app{ctx['run']}.n{i}")
+
+
+@benchmark("finance.get_exchange_rate", iterations=200, inner=1000)
+async def bench_exchange_rate(ctx, i):
+    from app.modules.finance import currency_service
+    for _ in range(1000):
+        currency_service.get_exchange_rate("USD", "VND")
+
+
+@benchmark("finance.convert_currency", iterations=200, inner=1000)
+async def bench_convert_currency(ctx, i):
+    from app.modules.finance import currency_service
+    for n in range(1000):
+        currency_service.convert_currency(n * 1.5, "EUR", "VND")
+
+
+@benchmark("finance.process_transaction.warm", iterations=300)
+async def bench_process_transaction_warm(ctx, i):
+    from app.core.database import AsyncSessionLocal, unit_of_work
+    from app.modules.finance import services
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await services.process_transaction(db=db, user_id=BENCH_USER, institution_name="MB Bank", amount=50000.0,
+                                               currency="VND", transaction_type="WITHDRAW", received_at=datetime.now())
+
+
+@benchmark("finance.process_transaction.cold", iterations=100)
+async def bench_process_transaction_cold(ctx, i):
+    from app.core.database import AsyncSessionLocal, unit_of_work
+    from app.modules.finance import services
+    from app.modules.finance.account_cache import account_index
+    from app.modules.finance.budget_manager import budget_engine
+    user_id = 2 + (i % (USERS - 1))
+    account_index.invalidate(user_id)
+    budget_engine.invalidate(user_id)
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await services.process_transaction(db=db, user_id=user_id, institution_name="Techcombank", amount=75000.0,
+                                               currency="USD", transaction_type="WITHDRAW", received_at=datetime.now())
+
+
+@benchmark("schedule.create_event.valid_time", iterations=300)
+async def bench_create_event_valid(ctx, i):
+    from app.core.database import AsyncSessionLocal
+    from app.modules.schedule import services
+    async with AsyncSessionLocal() as db:
+        await services.create_event(db=db, user_id=BENCH_USER, title="Họp nhóm", start_time_str="2026-10-19 15:00",
+                                    end_time_str="2026-10-19 16:00", source="Zalo")
+        await db.rollback()
+
+
+@benchmark("schedule.create_event.fallback_time", iterations=300)
+async def bench_create_event_fallback(ctx, i):
+    from app.core.database import AsyncSessionLocal
+    from app.modules.schedule import services
+    async with AsyncSessionLocal() as db:
+        await services.create_event(db=db, user_id=BENCH_USER, title="Họp nhóm", start_time_str="tomorrow 3pm",
+                                    end_time_str="later", source="Zalo")
+        await db.rollback()
+
+
+@benchmark("mobile.briefing_query", iterations=100)
+async def bench_briefing_query(ctx, i):
+    from app.modules.mobile.services import load_pending_lines
+    log_ids, _, _ = await load_pending_lines(BENCH_USER, ctx["now"])
+    assert len(log_ids) == BENCH_PENDING_LOGS, len(log_ids)
+
+
+@benchmark("mobile.generate_mobile_briefing", iterations=100)
+async def bench_generate_briefing(ctx, i):
+    from app.modules.mobile.agent import generate_mobile_briefing
+    await generate_mobile_briefing(ctx["briefing_lines"])
+
+
+# --- Runner ---
+
+async def run_all(only: str | None, scale: float) -> dict:
+    from app.modules.gatekeeper.app_resolver import app_name_resolver
+    from app.modules.gatekeeper import app_resolver
+    from app.modules.mobile.services import load_pending_lines
+    from app.core.database import async_engine
+
+    async def instant_title(package_name: str) -> str:
+        return package_name.split(".")[-1].upper()
+
+    from loadtest.fake_services import FX_RATES_PER_USD
+    from app.modules.finance import currency_service
+
+    app_resolver.fetch_app_title = instant_title
+    mock_model_clients()
+    currency_service.rate_table.rates = {code: rate / FX_RATES_PER_USD[currency_service.rate_table.base_currency]
+                                         for code, rate in FX_RATES_PER_USD.items()}
+    currency_service.rate_table.fetched_at = time.time()
+    await app_name_resolver.warm()
+    await app_name_resolver.resolve("com.mbmobile")
+
+    now = datetime.now()
+    _, lines, _ = await load_pending_lines(BENCH_USER, now)
+    ctx = {"now": now, "briefing_lines": lines, "run": int(time.time())}
+
+    results = {}
+    for name, fn, iterations, inner in BENCHMARKS:
+        if only and only not in name:
+            continue
+        # Pipeline code prints on every call; keep it out of the terminal (and the timings stable)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = await measure(fn, ctx, max(5, int(iterations * scale)), inner)
+        print(f"  {name:<42} median {results[name]['median_us']:>12.3f} us   p95 {results[name]['p95_us']:>12.3f} us",
+              file=sys.stderr)
+    await async_engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Prints new vs baseline medians; returns the names slower than baseline * (1 + threshold).
+    """
+    regressions = []
+    print(f"{'benchmark':<42}{'baseline us':>14}{'current us':>14}{'ratio':>9}")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<42}{'-':>14}{current['median_us']:>14.3f}{'new':>9}")
+            continue
+        ratio = current["median_us"] / previous["median_us"] if previous["median_us"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<42}{previous['median_us']:>14.3f}{current['median_us']:>14.3f}{ratio:>9.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calvo pipeline micro-benchmarks")
+    parser.add_argument("--size", choices=list(SIZES), default="10k", help="Seeded notification_logs rows")
+    parser.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"))
+    parser.add_argument("--only", default=None, help="Run benchmarks whose name contains this text")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every iteration count")
+    parser.add_argument("--save", default=None, help="Write results as a baseline JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    # The app reads its settings at import time: point it at the seeded copy first
+    os.makedirs(args.data_dir, exist_ok=True)
+    seeded = os.path.abspath(os.path.join(args.data_dir, f"calvo_{args.size}.db"))
+    work = os.path.abspath(os.path.join(args.data_dir, f"calvo_{args.size}_run.db"))
+    os.environ.update(DATABASE_URL=f"sqlite:///{work}", TRACING_BACKEND="none",
+                      FX_SNAPSHOT_PATH="", GATEKEEPER_CACHE_DB_PATH="")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    if not os.path.exists(seeded):
+        print(f"Seeding {SIZES[args.size]:,} logs into {seeded} (one-off)...", file=sys.stderr)
+        from sqlalchemy import create_engine
+        from app.core.database import Base
+        import app.main  # noqa: F401  (registers every model)
+        Base.metadata.create_all(bind=create_engine(f"sqlite:///{seeded}"))
+        started = time.perf_counter()
+        seed_database(seeded, SIZES[args.size])
+        from app.modules.finance.rollups import backfill_rollups
+        backfill_rollups(create_engine(f"sqlite:///{seeded}"))
+        print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    # Every run starts from the same seeded state (benchmarks write)
+    with sqlite3.connect(seeded) as source, sqlite3.connect(work) as target:
+        source.backup(target)
+
+    import app.main  # noqa: F401
+    print(f"Running benchmarks on {args.size} ({SIZES[args.size]:,} logs)", file=sys.stderr)
+    results = asyncio.run(run_all(args.only, args.scale))
+    os.remove(work)
+
+    report = {
+        "meta": {
+            "size": args.size,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("size") != args.size:
+            print(f"Warning: baseline was recorded on size {baseline['meta'].get('size')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions.")
+    elif not args.save:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
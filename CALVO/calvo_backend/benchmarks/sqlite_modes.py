@@ -0,0 +1,162 @@
+# File: benchmarks/sqlite_modes.py
+# Purpose: Compare SQLITE_MODE="default" with SQLITE_MODE="concurrent" on the ingestion write path.
+# Usage (from calvo_backend): python -m benchmarks.sqlite_modes --requests 2000 --concurrency 50
+# Note: No LLM is involved; every request writes what a FINANCE + SCHEDULE notification writes
+#       (NotificationLog, Transaction, account balance, Schedule) while a reader thread
+#       runs the /mobile/alerts query in a loop.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+MODES = ["default", "concurrent"]
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_mode(requests: int, concurrency: int, users: int) -> dict:
+    """
+    Runs inside a child process (settings are read at import time, so one mode per process).
+    """
+    import asyncio
+    import threading
+    from datetime import datetime
+    from app.main import app  # noqa: F401  (registers every model)
+    from app.core.database import (engine, Base, SessionLocal, run_write,
+                                   SQLITE_CONCURRENT_MODE, group_writer)
+    from app.modules.gatekeeper import services as gatekeeper_services
+    from app.modules.gatekeeper.models import NotificationLog
+    from app.modules.gatekeeper.schemas import WebhookRequest
+
+    Base.metadata.create_all(bind=engine)
+
+    def analysis_for(n: int) -> dict:
+        return {
+            "source_app": "Benchbank",
+            "category": "FINANCE",
+            "summary": f"Payment {n}",
+            "priority": 4,
+            "is_risk": False,
+            "finance_data": {"amount": 1000.0 + n, "currency": "VND", "type_of_transaction": "WITHDRAW"},
+            "schedule_data": {"event_title": f"Event {n}", "start_time": "2026-10-18 15:00", "end_time": None},
+        }
+
+    # Reader thread: /mobile/alerts query against the sync engine while ingestion runs
+    read_latencies = []
+    stop_reading = threading.Event()
+
+    def reader():
+        while not stop_reading.is_set():
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                db.query(NotificationLog).filter(
+                    NotificationLog.user_id == 1,
+                    NotificationLog.category.in_(["RISK", "FINANCE"]),
+                ).order_by(NotificationLog.received_at.desc()).limit(10).all()
+            read_latencies.append((time.perf_counter() - started) * 1000)
+
+    async def main():
+        if SQLITE_CONCURRENT_MODE:
+            group_writer.start()
+        semaphore = asyncio.Semaphore(concurrency)
+        write_latencies = []
+        errors = 0
+
+        async def one(n: int):
+            nonlocal errors
+            req = WebhookRequest(user_id=n % users + 1, source_app="com.bench", title="bench",
+                                 content=f"bench {n}", received_at=datetime.now())
+            analysis = analysis_for(n)
+
+            async def persist(db):
+                db.add(NotificationLog(**gatekeeper_services.build_log_row(req, analysis)))
+                return await gatekeeper_services.apply_analysis(db, req, analysis)
+
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    from app.core.database import AsyncSessionLocal
+                    async with AsyncSessionLocal() as db:
+                        await run_write(db, persist)
+                except Exception:
+                    errors += 1
+                write_latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(requests)))
+        elapsed = time.perf_counter() - started
+        stats = group_writer.stats() if SQLITE_CONCURRENT_MODE else {}
+        await group_writer.stop()
+        return elapsed, write_latencies, errors, stats
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    elapsed, write_latencies, errors, writer_stats = asyncio.run(main())
+    stop_reading.set()
+    thread.join()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "writes_per_second": round(requests / elapsed, 1),
+        "write_p50_ms": round(percentile(write_latencies, 0.50), 2),
+        "write_p99_ms": round(percentile(write_latencies, 0.99), 2),
+        "reads": len(read_latencies),
+        "read_p50_ms": round(percentile(read_latencies, 0.50), 2),
+        "read_p99_ms": round(percentile(read_latencies, 0.99), 2),
+        "read_max_ms": round(max(read_latencies), 2) if read_latencies else 0.0,
+        "read_mean_ms": round(statistics.fmean(read_latencies), 2) if read_latencies else 0.0,
+        "group_commit": writer_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.requests, args.concurrency, args.users)))
+        return
+
+    results = {}
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       SQLITE_MODE=mode,
+                       DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                       OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "benchmark",
+                       TRACING_BACKEND="none")
+            child = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.sqlite_modes", "--child", mode,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--users", str(args.users)],
+                env=env, capture_output=True, text=True
+            )
+            if child.returncode != 0:
+                print(child.stderr)
+                sys.exit(f"Benchmark failed in mode {mode}")
+            results[mode] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    keys = [k for k in results[MODES[0]] if k != "group_commit"]
+    print(f"{'metric':<20}" + "".join(f"{mode:>14}" for mode in MODES))
+    for key in keys:
+        print(f"{key:<20}" + "".join(f"{results[mode][key]:>14}" for mode in MODES))
+    print(f"group commit: {results['concurrent']['group_commit']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# File: loadtest/fake_services.py
+# Purpose: Offline stand-ins for every external dependency of the backend.
+# - POST /v1/chat/completions : OpenAI-compatible, schema-valid Gatekeeper / CFO / Strategist / Reporter / Fused JSON
+# - GET  /fx/{base}           : exchangerate-api style rate table
+# - GET  /playstore/{package} : {"title": ...} for the app resolver
+# Usage: python -m loadtest.fake_services --port 9000 --latency lognormal:400:0.5 --error-rate 0.01
+#        then start the backend with OPENAI_BASE_URL=http://127.0.0.1:9000/v1,
+#        FX_API_BASE_URL=http://127.0.0.1:9000/fx, APP_RESOLVER_BASE_URL=http://127.0.0.1:9000/playstore
+
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+AGENTS = ("gatekeeper", "cfo", "strategist", "reporter", "fused")
+
+APP_TITLES = {
+    "com.VCB": "Vietcombank",
+    "vn.com.techcombank.bb.app": "Techcombank",
+    "com.vnpay.bidv": "BIDV SmartBanking",
+    "com.mbmobile": "MB Bank",
+    "com.mservice.momo": "MoMo",
+    "vn.com.vng.zalopay": "ZaloPay",
+    "com.zing.zalo": "Zalo",
+    "com.facebook.orca": "Messenger",
+    "com.shopee.vn": "Shopee",
+    "com.lazada.android": "Lazada",
+    "com.grabtaxi.passenger": "Grab",
+}
+FINANCE_APPS = {"Vietcombank", "Techcombank", "BIDV SmartBanking", "MB Bank", "MoMo", "ZaloPay"}
+FX_RATES_PER_USD = {"USD": 1.0, "VND": 25400.0, "EUR": 0.92, "JPY": 149.0, "KRW": 1370.0}
+
+AMOUNT = re.compile(r"(?:([+-])\s*)?(\d{1,3}(?:[.,]\d{3})+|\d+)\s*(VND|VNĐ|đồng|đ)?", re.IGNORECASE)
+HOUR = re.compile(r"(\d{1,2})\s*(?:h|giờ|:00)", re.IGNORECASE)
+
+
+class LatencyModel:
+    """
+    "fixed:200", "uniform:100:500", "lognormal:400:0.5" (median ms, sigma), "exponential:300" (mean ms).
+    """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample_seconds(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "lognormal":
+            median, sigma = self.params[0], (self.params[1] if len(self.params) > 1 else 0.5)
+            ms = median * rng.lognormvariate(0, sigma)
+        else:
+            ms = rng.expovariate(1 / self.params[0])
+        return max(0.0, ms) / 1000
+
+
+def detect_agent(system_prompt: str) -> str:
+    if "Fused Agent" in system_prompt:
+        return "fused"
+    if "Gatekeeper" in system_prompt:
+        return "gatekeeper"
+    if "Reporter" in system_prompt:
+        return "reporter"
+    if "Scheduler" in system_prompt:
+        return "strategist"
+    if "CFO" in system_prompt or "amount" in system_prompt:
+        return "cfo"
+    return "unknown"
+
+
+def parse_gatekeeper_input(text: str) -> tuple[str, str]:
+    match = re.search(r"App:\s*(.*?),\s*Content:\s*(.*),\s*Title:", text, re.DOTALL)
+    return (match.group(1), match.group(2)) if match else ("", text)
+
+
+def find_amount(text: str) -> re.Match | None:
+    """
+    First number that carries a sign or a currency (skips masked account numbers such as ****1234).
+    """
+    return next((m for m in AMOUNT.finditer(text) if m.group(1) or m.group(3)), None)
+
+
+def classify(app_name: str, content: str) -> dict:
+    lowered = content.lower()
+    is_spam = any(word in lowered for word in ("giảm giá", "ưu đãi", "voucher", "flash sale", "khuyến mãi"))
+    if is_spam:
+        classification, priority = "OTHER", 1
+    elif app_name in FINANCE_APPS and find_amount(content):
+        classification, priority = "FINANCE", 4
+    elif any(word in lowered for word in ("họp", "meeting", "lịch", "hẹn", "khám", "học")):
+        classification, priority = "SCHEDULE", 4
+    else:
+        classification, priority = "OTHER", 3
+    return {
+        "source_app": app_name,
+        "is_spam": is_spam,
+        "classification": classification,
+        "priority": priority,
+        "summary": content[:160],
+        "reasoning": "loadtest stand-in",
+        "confidence_score": 0.9,
+    }
+
+
+def extract_finance(text: str, received_at: str = "") -> dict:
+    match = find_amount(text)
+    if not match:
+        return {"amount": 0.0, "currency": "VND", "created_at": received_at, "type_of_transaction": "UNKNOWN",
+                "confidence_score": 0.2, "reasoning": "no amount"}
+    deposit = match.group(1) == "+" or any(word in text.lower() for word in ("nhận", "received", "deposit"))
+    return {
+        "amount": float(re.sub(r"[.,]", "", match.group(2))),
+        "currency": "VND",
+        "created_at": received_at,
+        "type_of_transaction": "DEPOSIT" if deposit else "WITHDRAW",
+        "confidence_score": 0.9,
+        "reasoning": "loadtest stand-in",
+    }
+
+
+def extract_schedule(text: str, today: datetime) -> dict:
+    match = HOUR.search(text)
+    hour = int(match.group(1)) % 24 if match else 9
+    start = (today + timedelta(days=1)).replace(hour=hour, minute=0, second=0, microsecond=0)
+    title = re.sub(r"^[^:]*:\s*", "", text).split(" lúc ")[0][:60] or "Event"
+    return {
+        "event_title": title,
+        "start_time": start.strftime("%Y-%m-%d %H:%M"),
+        "end_time": (start + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def build_content(agent: str, system_prompt: str, user_text: str) -> dict:
+    now = datetime.now()
+    if agent == "gatekeeper":
+        return classify(*parse_gatekeeper_input(user_text))
+    if agent == "cfo":
+        received = re.search(r"received_at:\s*(\S+(?: \S+)?)", user_text)
+        return extract_finance(user_text.split("received_at:")[0], received.group(1) if received else "")
+    if agent == "strategist":
+        return extract_schedule(user_text, now)
+    if agent == "reporter":
+        if "Notification Condenser" in system_prompt:
+            return {"notes": f"SCHEDULE: {user_text.count('SCHEDULE')} items. FINANCE: {user_text.count('FINANCE')} items."}
+        return {"report": "SCHEDULE\nA few meetings are coming up.\n\nFINANCE\nSeveral transactions today."}
+    if agent == "fused":
+        result = classify(*parse_gatekeeper_input(user_text))
+        _, content = parse_gatekeeper_input(user_text)
+        finance = extract_finance(content, now.strftime("%Y-%m-%d %H:%M:%S"))
+        result["finance"] = ({key: finance[key] for key in ("amount", "currency", "type_of_transaction", "created_at")}
+                             if result["classification"] == "FINANCE" and finance["type_of_transaction"] != "UNKNOWN" else None)
+        if result["classification"] == "FINANCE" and result["finance"] is None:
+            result["classification"] = "OTHER"
+        result["schedule"] = extract_schedule(content, now) if result["classification"] == "SCHEDULE" else None
+        return result
+    return {}
+
+
+def create_app(latency: dict, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+               malformed_rate: float = 0.0, unknown_package_rate: float = 0.0, seed: int = 7) -> FastAPI:
+    """
+    latency: agent name (or "default", "fx", "playstore") -> LatencyModel
+    """
+    app = FastAPI(title="Calvo load-test stand-ins")
+    rng = random.Random(seed)
+    stats = {"requests": {}, "errors": 0, "rate_limited": 0, "malformed": 0, "started": time.time()}
+
+    def delay(name: str) -> float:
+        return (latency.get(name) or latency["default"]).sample_seconds(rng)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user_text = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        agent = detect_agent(system_prompt)
+        stats["requests"][agent] = stats["requests"].get(agent, 0) + 1
+
+        await asyncio.sleep(delay(agent))
+
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(status_code=429, headers={"retry-after": "0.2"},
+                                content={"error": {"message": "Rate limit reached", "type": "rate_limit_error"}})
+        if roll < rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+        content = json.dumps(build_content(agent, system_prompt, user_text), ensure_ascii=False)
+        if rng.random() < malformed_rate:
+            stats["malformed"] += 1
+            content = content[: len(content) // 2]  # Truncated JSON exercises the agents' fallbacks
+
+        prompt_tokens = (len(system_prompt) + len(user_text)) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-loadtest-{rng.randrange(10**12)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @app.get("/fx/{base}")
+    async def fx_rates(base: str):
+        await asyncio.sleep(delay("fx"))
+        base = base.upper()
+        if base not in FX_RATES_PER_USD:
+            return JSONResponse(status_code=404, content={"error": "unsupported base"})
+        per_base = {code: rate / FX_RATES_PER_USD[base] for code, rate in FX_RATES_PER_USD.items()}
+        return {"base": base, "date": datetime.now().strftime("%Y-%m-%d"), "rates": per_base}
+
+    @app.get("/playstore/{package_name}")
+    async def playstore(package_name: str):
+        await asyncio.sleep(delay("playstore"))
+        title = APP_TITLES.get(package_name)
+        if title is None and rng.random() < unknown_package_rate:
+            return JSONResponse(status_code=404, content={"error": "App not found"})
+        return {"title": title or package_name.split(".")[-1].capitalize()}
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, "uptime_seconds": round(time.time() - stats["started"], 1)}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", default="lognormal:400:0.5", help="Default LLM latency distribution")
+    for agent in AGENTS:
+        parser.add_argument(f"--latency-{agent}", default=None, help=f"Override for the {agent} agent")
+    parser.add_argument("--latency-fx", default="fixed:50")
+    parser.add_argument("--latency-playstore", default="uniform:300:900")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM calls answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of LLM calls answered with HTTP 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of LLM answers with truncated JSON")
+    parser.add_argument("--unknown-package-rate", type=float, default=0.0, help="Share of unknown packages answered 404")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def app_from_args(args) -> FastAPI:
+    latency = {"default": LatencyModel(args.latency), "fx": LatencyModel(args.latency_fx),
+               "playstore": LatencyModel(args.latency_playstore)}
+    for agent in AGENTS:
+        spec = getattr(args, f"latency_{agent}")
+        if spec:
+            latency[agent] = LatencyModel(spec)
+    return create_app(latency, args.error_rate, args.rate_limit_rate, args.malformed_rate,
+                      args.unknown_package_rate, args.seed)
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Offline OpenAI / Play Store / FX stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
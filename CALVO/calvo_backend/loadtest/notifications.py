@@ -0,0 +1,100 @@
+# File: loadtest/notifications.py
+# Purpose: Synthetic Vietnamese notifications for load tests (bank SMS, e-wallets, messengers, promos).
+# Note: Bank messages follow the layouts in app/modules/finance/bank_formats.py, plus some
+#       free-form ones that force the LLM path.
+
+import random
+from datetime import datetime
+
+BANK_APPS = ["com.VCB", "vn.com.techcombank.bb.app", "com.vnpay.bidv", "com.mbmobile"]
+WALLET_APPS = ["com.mservice.momo", "vn.com.vng.zalopay"]
+MESSENGER_APPS = ["com.zing.zalo", "com.facebook.orca"]
+PROMO_APPS = ["com.shopee.vn", "com.lazada.android", "com.grabtaxi.passenger"]
+
+NAMES = ["Lan", "Minh", "Hùng", "Trang", "Nam", "Hoa"]
+EVENTS = ["họp nhóm", "họp dự án", "đi khám răng", "ăn tối với khách hàng", "học tiếng Anh", "meeting with the team"]
+PROMOS = [
+    "Giảm giá 50% cho đơn hàng đầu tiên, chỉ hôm nay!",
+    "Flash sale 12h: ưu đãi lên tới 70%",
+    "Bạn có 1 voucher freeship sắp hết hạn",
+]
+CHATS = ["Ăn trưa không?", "Gửi mình file báo cáo nhé", "Cuối tuần đi cà phê nha", "Ok, cảm ơn bạn"]
+
+
+def vnd(amount: int) -> str:
+    return f"{amount:,}"
+
+
+def bank_message(rng: random.Random, now: datetime) -> tuple[str, str, str]:
+    sign = rng.choice(["+", "-", "-", "-"])
+    amount = rng.choice([20, 50, 100, 150, 200, 500, 1000, 2500, 5000]) * 1000
+    balance = rng.randint(1, 500) * 100000
+    account = f"{rng.randint(10**9, 10**10 - 1)}"
+    layout = rng.randrange(5)
+    if layout == 0:
+        return "com.VCB", "Vietcombank", (
+            f"SD TK {account} {sign}{vnd(amount)}VND luc {now:%d-%m-%Y %H:%M:%S}. SD {vnd(balance)}VND. Ref MBVCB.{rng.randint(1000, 9999)}"
+        )
+    if layout == 1:
+        return "vn.com.techcombank.bb.app", "Techcombank", (
+            f"TK {account[:4]}xxxx{account[-4:]} So tien GD:{sign}{vnd(amount)} So du:{vnd(balance)} ND: chuyen tien"
+        )
+    if layout == 2:
+        return "com.vnpay.bidv", "BIDV", (
+            f"Số dư TK BIDV {account} {sign}{vnd(amount)}VND vào {now:%H:%M} {now:%d/%m/%Y}. Số dư: {vnd(balance)}VND"
+        )
+    if layout == 3:
+        return "com.mbmobile", "MB Bank", (
+            f"TK ****{account[-4:]} {sign}{vnd(amount)}VND lúc {now:%H:%M} SD: {vnd(balance)}VND"
+        )
+    # Free-form: no registered format matches, so the CFO LLM call runs
+    verb = "Bạn vừa nhận" if sign == "+" else "Tài khoản của bạn vừa bị trừ"
+    return "com.mbmobile", "MB Bank", f"{verb} {vnd(amount)} đồng. Số dư hiện tại {vnd(balance)} đồng."
+
+
+def wallet_message(rng: random.Random) -> tuple[str, str, str]:
+    amount = rng.choice([15, 35, 60, 120, 300]) * 1000
+    app = rng.choice(WALLET_APPS)
+    if rng.random() < 0.5:
+        return app, "Ví điện tử", f"Bạn đã nhận {vnd(amount)}đ từ {rng.choice(NAMES)}"
+    return app, "Ví điện tử", f"Thanh toán thành công {vnd(amount)}đ tại Circle K"
+
+
+def messenger_message(rng: random.Random) -> tuple[str, str, str]:
+    app = rng.choice(MESSENGER_APPS)
+    name = rng.choice(NAMES)
+    if rng.random() < 0.5:
+        hour = rng.randint(8, 20)
+        return app, name, f"{name}: Nhớ {rng.choice(EVENTS)} lúc {hour}h ngày mai nhé"
+    return app, name, f"{name}: {rng.choice(CHATS)}"
+
+
+def promo_message(rng: random.Random) -> tuple[str, str, str]:
+    return rng.choice(PROMO_APPS), "Ưu đãi", rng.choice(PROMOS)
+
+
+# Share of each kind in the generated stream
+MIX = [(bank_message, 0.45), (wallet_message, 0.15), (messenger_message, 0.25), (promo_message, 0.15)]
+
+
+def generate(count: int, users: int = 50, seed: int = 42) -> list[dict]:
+    """
+    Deterministic list of /api/v1/webhook payloads.
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    payloads = []
+    for _ in range(count):
+        now = datetime.now()
+        kind = rng.choices(kinds, weights)[0]
+        source_app, title, content = kind(rng, now) if kind is bank_message else kind(rng)
+        payloads.append({
+            "user_id": rng.randint(1, users),
+            "source_app": source_app,
+            "title": title,
+            "content": content,
+            "language": "Vietnamese",
+            "received_at": now.isoformat(timespec="seconds"),
+        })
+    return payloads
@@ -0,0 +1,186 @@
+# File: loadtest/run.py
+# Purpose: Replay synthetic notifications against /api/v1/webhook and report throughput + latency percentiles.
+# Usage (from calvo_backend):
+#   Fully offline, starts the stand-ins and a backend on a temporary database:
+#       python -m loadtest.run --spawn --requests 500 --concurrency 32
+#   Against an already running backend:
+#       python -m loadtest.run --target http://127.0.0.1:8000 --requests 500
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+
+from loadtest.notifications import generate
+from loadtest import fake_services
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def replay(target: str, endpoint: str, payloads: list[dict], concurrency: int,
+                 duration: float | None, timeout: float) -> dict:
+    """
+    Closed-loop load: `concurrency` workers each send the next payload as soon as the previous one returns.
+    With --duration the payload list is cycled until time runs out.
+    """
+    latencies = []
+    statuses = {}
+    next_index = 0
+    started = time.perf_counter()
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal next_index
+        while True:
+            if duration is None and next_index >= len(payloads):
+                return
+            if duration is not None and time.perf_counter() - started >= duration:
+                return
+            payload = payloads[next_index % len(payloads)]
+            next_index += 1
+
+            sent = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=payload)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - sent) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    ok = statuses.get("200", 0) + statuses.get("202", 0)
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "statuses": statuses,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+def spawn_stack(args, workdir: str) -> tuple[str, list]:
+    """
+    Starts the stand-ins and a backend wired to them. Returns the backend URL and the processes.
+    """
+    fake_port, backend_port = free_port(), free_port()
+    fake_cmd = [sys.executable, "-m", "loadtest.fake_services", "--port", str(fake_port),
+                "--latency", args.latency, "--latency-fx", args.latency_fx,
+                "--latency-playstore", args.latency_playstore,
+                "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+                "--malformed-rate", str(args.malformed_rate),
+                "--unknown-package-rate", str(args.unknown_package_rate), "--seed", str(args.seed)]
+    for agent in fake_services.AGENTS:
+        spec = getattr(args, f"latency_{agent}")
+        if spec:
+            fake_cmd += [f"--latency-{agent}", spec]
+
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir}/loadtest.db",
+        OPENAI_API_KEY="loadtest",
+        OPENAI_BASE_URL=f"{fake_url}/v1",
+        FX_API_BASE_URL=f"{fake_url}/fx",
+        FX_SNAPSHOT_PATH=f"{workdir}/fx_rates.json",
+        APP_RESOLVER_BASE_URL=f"{fake_url}/playstore",
+        TRACING_BACKEND="none",
+    )
+    backend_cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                   "--port", str(backend_port), "--log-level", "warning"]
+
+    log = open(os.path.join(workdir, "backend.log"), "w")
+    processes = [
+        subprocess.Popen(fake_cmd, stdout=subprocess.DEVNULL),
+        subprocess.Popen(backend_cmd, env=env, stdout=log, stderr=subprocess.STDOUT),
+    ]
+    asyncio.run(wait_until_up(f"{fake_url}/stats"))
+    backend_url = f"http://127.0.0.1:{backend_port}"
+    asyncio.run(wait_until_up(f"{backend_url}/docs"))
+    return backend_url, processes
+
+
+def print_report(report: dict):
+    print(f"Requests      : {report['requests']} ({report['ok']} ok, {report['errors']} failed) in {report['seconds']}s")
+    print(f"Throughput    : {report['throughput_rps']} req/s")
+    print(f"Latency (ms)  : p50 {report['p50_ms']} | p95 {report['p95_ms']} | p99 {report['p99_ms']} | max {report['max_ms']}")
+    print(f"Status codes  : {report['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calvo webhook load generator")
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/api/v1/webhook")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run (cycles the payloads)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent (and not measured) before the run")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--spawn", action="store_true", help="Start the stand-ins + a backend on a temporary database")
+    fake_services.add_arguments(parser)
+    args = parser.parse_args()
+
+    payloads = generate(args.requests, users=args.users, seed=args.seed)
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            target = args.target
+            if args.spawn:
+                target, processes = spawn_stack(args, workdir)
+            if args.warmup:
+                asyncio.run(replay(target, args.endpoint, generate(args.warmup, args.users, args.seed + 1),
+                                   min(args.concurrency, args.warmup), None, args.timeout))
+            report = asyncio.run(replay(target, args.endpoint, payloads, args.concurrency, args.duration, args.timeout))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
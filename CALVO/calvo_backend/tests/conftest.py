@@ -0,0 +1,115 @@
+# File: tests/conftest.py
+# Purpose: Shared test setup: a throw-away SQLite database and offline settings.
+# Note: The environment is set before anything under app/ is imported (settings are read at import time).
+# Usage: cd CALVO/calvo_backend && python -m pytest -q
+# Language: English
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix="calvo-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{TMP_DIR}/test.db",
+    OPENAI_API_KEY="test",
+    TRACING_BACKEND="none",
+    FX_SNAPSHOT_PATH=os.path.join(TMP_DIR, "fx_rates.json"),
+    GATEKEEPER_CACHE_DB_PATH="",
+    LLM_USAGE_ACCOUNTING_ENABLED="false",
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fresh_db():
+    """
+    Empty tables for one test (models registered through app.main).
+    """
+    import app.main  # noqa: F401
+    from app.core.database import engine, async_engine, Base
+    from app.modules.finance.account_cache import account_index
+    from app.modules.finance.budget_manager import budget_engine
+    # Pooled aiosqlite connections belong to the previous test's event loop
+    async_engine.sync_engine.dispose(close=False)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    account_index.clear()   # Per-process caches of rows that were just dropped
+    budget_engine.clear()
+    yield engine
+
+
+class FakeCompletions:
+    """
+    Stands in for client.chat.completions: schema-valid answers from the load-test stand-in,
+    after a short delay so concurrent requests really overlap.
+    """
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, model=None, messages=None, **kwargs):
+        import asyncio
+        import json
+        from types import SimpleNamespace
+        from loadtest.fake_services import build_content, detect_agent
+
+        system_prompt, user_text = messages[0]["content"], messages[-1]["content"]
+        agent = detect_agent(system_prompt)
+        self.calls.append(agent)
+        await asyncio.sleep(self.delay)
+        content = json.dumps(build_content(agent, system_prompt, user_text), ensure_ascii=False)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=len(system_prompt) // 4, completion_tokens=len(content) // 4),
+        )
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Every agent's model client and the Play Store lookup, offline. Returns the fake (its .calls).
+    """
+    from app.modules.gatekeeper import agent as gatekeeper_agent, app_resolver
+    from app.modules.gatekeeper.app_resolver import app_name_resolver
+    from app.modules.gatekeeper.cache import classification_cache
+    from app.modules.gatekeeper.dedup import recent_notifications
+    from app.modules.finance import agent as cfo_agent
+    from app.modules.schedule import agent as strategist_agent
+    from app.modules.mobile import agent as reporter_agent
+    from app.modules.mobile.services import briefing_scheduler
+
+    fake = FakeCompletions()
+    for module in (gatekeeper_agent, cfo_agent, strategist_agent, reporter_agent):
+        monkeypatch.setattr(module.client.chat, "completions", fake)
+
+    async def title(package_name):
+        return package_name.split(".")[-1].upper()
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", title)
+    classification_cache.clear()
+    recent_notifications.clear()
+    app_name_resolver._entries.clear()
+    yield fake
+    briefing_scheduler.cancel_all()
+
+
+@pytest.fixture
+async def client(fresh_db, fake_llm):
+    """
+    HTTP client on the app (no lifespan: no background jobs, default write path).
+    """
+    import httpx
+    from app.main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
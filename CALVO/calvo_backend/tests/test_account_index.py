@@ -0,0 +1,79 @@
+# File: tests/test_account_index.py
+# Purpose: Per-process account index vs. accounts created by another worker.
+
+import pytest
+from sqlalchemy import select, insert, update
+
+from app.core.database import AsyncSessionLocal, unit_of_work
+from app.modules.finance.models import Account
+from app.modules.finance.account_cache import AccountIndex, account_index
+from app.modules.finance.services import process_transaction
+
+pytestmark = pytest.mark.anyio
+
+
+async def accounts_of(user_id: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Account).where(Account.user_id == user_id))).scalars().all()
+
+
+async def create_elsewhere(user_id: int, institution_name: str):
+    # Written straight to the DB, the way another worker would
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await db.execute(insert(Account).values(user_id=user_id, institution_name=institution_name, balance=0.0))
+
+
+async def test_miss_on_cached_user_is_looked_up_in_db(fresh_db):
+    index = AccountIndex(max_users=10)
+    await create_elsewhere(1, "MB Bank")
+    async with AsyncSessionLocal() as db:
+        assert await index.find(db, 1, "Vietcombank") is None  # User is now cached
+    await create_elsewhere(1, "Vietcombank")
+
+    async with AsyncSessionLocal() as db:
+        assert await index.is_trusted(db, 1, "vietcombank")
+        assert (await index.find(db, 1, "Vietcombank")).institution_name == "Vietcombank"
+    assert index.stats()["db_lookups"] == 1  # Cached after the lookup
+
+
+async def test_transaction_reuses_account_created_by_another_worker(fresh_db):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await process_transaction(db, user_id=1, institution_name="MB Bank", amount=100.0, transaction_type="DEPOSIT")
+    await create_elsewhere(1, "Vietcombank")
+
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            result = await process_transaction(db, user_id=1, institution_name="Vietcombank", amount=50.0,
+                                               transaction_type="DEPOSIT")
+
+    assert result["new_balance"] == 50.0
+    assert sorted(a.institution_name for a in await accounts_of(1)) == ["MB Bank", "Vietcombank"]
+    assert account_index.stats()["users"] == 1
+
+
+async def test_duplicate_account_insert_is_rejected(fresh_db):
+    await create_elsewhere(1, "MB Bank")
+    with pytest.raises(Exception):
+        await create_elsewhere(1, "MB Bank")
+    assert len(await accounts_of(1)) == 1
+
+
+async def test_balance_comes_from_the_database_not_the_index(fresh_db):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await process_transaction(db, user_id=1, institution_name="MB Bank", amount=100.0, transaction_type="DEPOSIT")
+    # Another worker moves the balance: this process's index still says 100
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await db.execute(update(Account).where(Account.user_id == 1).values(balance=Account.balance + 1000.0))
+
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            result = await process_transaction(db, user_id=1, institution_name="MB Bank", amount=50.0,
+                                               transaction_type="WITHDRAW")
+
+    assert result["new_balance"] == 1050.0
+    async with AsyncSessionLocal() as db:
+        assert (await account_index.find(db, 1, "MB Bank")).balance == 1050.0
@@ -0,0 +1,81 @@
+# File: tests/test_app_resolver.py
+# Purpose: Package name -> app title resolver (single flight, app_packages upsert).
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper import app_resolver
+from app.modules.gatekeeper.app_resolver import AppNameResolver
+from app.modules.gatekeeper.models import AppPackage
+
+pytestmark = pytest.mark.anyio
+
+
+def new_resolver() -> AppNameResolver:
+    return AppNameResolver(max_entries=100, refresh_after=3600, failure_ttl=3600)
+
+
+async def stored(package_name: str):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(AppPackage).where(AppPackage.package_name == package_name))).scalar_one_or_none()
+
+
+async def test_concurrent_misses_share_one_scrape(fresh_db, monkeypatch):
+    calls = []
+
+    async def slow_title(package_name):
+        calls.append(package_name)
+        await asyncio.sleep(0.05)
+        return "MB Bank"
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", slow_title)
+    resolver = new_resolver()
+    titles = await asyncio.gather(*(resolver.resolve("com.mbmobile") for _ in range(20)))
+
+    assert titles == ["MB Bank"] * 20
+    assert calls == ["com.mbmobile"]
+    assert (await stored("com.mbmobile")).title == "MB Bank"
+
+
+async def test_memory_miss_is_served_from_the_table(fresh_db, monkeypatch):
+    async def title(package_name):
+        return "MB Bank"
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", title)
+    await new_resolver().resolve("com.mbmobile")
+
+    async def unreachable(package_name):
+        raise AssertionError("scraped a package that is already stored")
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", unreachable)
+    restarted = new_resolver()
+    assert await restarted.resolve("com.mbmobile") == "MB Bank"
+    assert restarted.stats()["scrapes"] == 0
+
+
+async def test_failed_refresh_keeps_the_stored_title(fresh_db, monkeypatch):
+    async def title(package_name):
+        return "MB Bank"
+
+    async def failing(package_name):
+        raise RuntimeError("store unreachable")
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", title)
+    await new_resolver()._fetch_and_store("com.mbmobile")
+    monkeypatch.setattr(app_resolver, "fetch_app_title", failing)
+    await new_resolver()._fetch_and_store("com.mbmobile")  # Fresh process: no title in memory
+
+    row = await stored("com.mbmobile")
+    assert (row.title, row.is_resolved) == ("MB Bank", True)
+
+
+async def test_unknown_package_falls_back_to_its_last_segment(fresh_db, monkeypatch):
+    async def failing(package_name):
+        raise RuntimeError("not on the store")
+
+    monkeypatch.setattr(app_resolver, "fetch_app_title", failing)
+    assert await new_resolver().resolve("com.example.wallet") == "Wallet"
+    assert (await stored("com.example.wallet")).is_resolved is False
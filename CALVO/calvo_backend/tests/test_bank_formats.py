@@ -0,0 +1,66 @@
+# File: tests/test_bank_formats.py
+# Purpose: Deterministic bank / e-wallet parser (CFO fast path).
+# Note: A wrong parse skips the LLM and corrupts the balance, so ambiguous texts must return None.
+
+from datetime import datetime
+
+import pytest
+
+from app.modules.finance.bank_formats import ExtractorRegistry, registry, parse_amount
+
+RECEIVED_AT = datetime(2026, 10, 18, 10, 0, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SD TK 0011001234567 +1,000,000VND luc 18-10-2026 10:22:33. SD 5,000,000VND. Ref 123",
+     ("DEPOSIT", 1000000.0, 5000000.0)),
+    ("TK 1903xxxx1234 So tien GD:-500,000 So du:1,234,567 ND: chuyen tien", ("WITHDRAW", 500000.0, 1234567.0)),
+    ("Số dư TK BIDV 1234567 +200,000VND vào 10:22 18/10/2026. Số dư: 1,000,000VND", ("DEPOSIT", 200000.0, 1000000.0)),
+    ("TK ****1234 -50,000VND lúc 10:22 SD: 12,345,678VND", ("WITHDRAW", 50000.0, 12345678.0)),
+    ("Bạn đã nhận 50.000đ từ Nguyen Van B", ("DEPOSIT", 50000.0, None)),
+    ("Ví MoMo: Bạn vừa thanh toán 45.000đ cho Grab. Số dư ví: 1.200.000đ", ("WITHDRAW", 45000.0, 1200000.0)),
+    ("Thanh toán thành công 45.000đ tại Circle K", ("WITHDRAW", 45000.0, None)),
+])
+def test_known_formats(text, expected):
+    result = registry.extract(text, RECEIVED_AT)
+    assert result is not None
+    assert (result["type_of_transaction"], result["amount"], result["balance"]) == expected
+    assert result["confidence_score"] == 1.0
+
+
+@pytest.mark.parametrize("text", [
+    "Nguyen Van A đã chuyển 500.000đ cho bạn",                           # Incoming, not a payment
+    "Ví MoMo: Bạn đã thanh toán 45.000đ cho Grab. Ưu đãi nhận 10.000đ",  # Promotion amount
+    "Bạn vừa chuyển 200.000đ đến B. Người nhận 200.000đ",                # Two amounts
+    "Mã OTP 123456. Giao dịch thanh toán 1,000,000 VND",                 # OTP
+    "Nhan 1.5 VND",                                                      # No subject, not a VND amount
+    "Bạn vừa nhận 1.5 VND",
+    "Ưu đãi: nhận ngay 50.000đ khi thanh toán qua ví",
+])
+def test_ambiguous_texts_fall_back_to_the_llm(text):
+    assert registry.extract(text, RECEIVED_AT) is None
+
+
+def test_match_and_miss_counters():
+    counted = ExtractorRegistry()
+    counted.register("Test", r"(?P<sign>[+-])(?P<amount>\d+)VND")
+    counted.extract("+100VND")
+    counted.extract("hello")
+    assert counted.stats()["matches"] == 1 and counted.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("raw, currency, expected", [
+    ("5,000,000", "VND", 5000000.0),
+    ("5.000.000", "VND", 5000000.0),
+    ("1,000,000.00", "VND", 1000000.0),
+    ("1.5", "VND", None),
+    ("12.50", "USD", 12.5),
+    ("1,234.5", "USD", 1234.5),
+])
+def test_parse_amount(raw, currency, expected):
+    assert parse_amount(raw, currency) == expected
+
+
+def test_timestamp_from_text_is_day_first():
+    result = registry.extract("SD TK 001 +1,000VND luc 05-03-2026 08:15:00. SD 2,000VND", RECEIVED_AT)
+    assert result["created_at"] == "2026-03-05 08:15:00"
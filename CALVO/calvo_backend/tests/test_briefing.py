@@ -0,0 +1,60 @@
+# File: tests/test_briefing.py
+# Purpose: The briefing prompt stays within BRIEFING_TOKEN_BUDGET even when map-reduce cannot shrink the input.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.modules.mobile import agent as reporter_agent
+from app.modules.mobile.agent import fit_to_budget, serialize_log
+from app.modules.prompt_compaction import estimate_tokens
+from app.modules.prompts_config import SYSTEM_PROMPT_REPORTER_CHUNK
+
+pytestmark = pytest.mark.anyio
+
+
+def day_of_logs(count: int) -> list:
+    start = datetime(2026, 10, 18, 8, 0)
+    return [serialize_log(start + timedelta(minutes=i), "OTHER", 5 if i % 10 == 0 else 1,
+                          f"Notification {i}: " + "lorem ipsum " * 12) for i in range(count)]
+
+
+def test_lowest_priority_lines_are_dropped_first():
+    lines = day_of_logs(30)
+
+    kept = fit_to_budget(lines, 200)
+
+    assert estimate_tokens("\n".join(kept)) <= 200
+    assert [line for line in lines if line in kept] == kept  # Original order
+    assert all(line in kept for line in lines if reporter_agent.line_priority(line) == 5)
+
+
+def test_single_oversized_line_is_truncated():
+    [line] = fit_to_budget(["x" * 4000], 100)
+
+    assert estimate_tokens(line) <= 100
+
+
+async def test_oversized_input_produces_a_prompt_within_budget(monkeypatch):
+    prompts = []
+
+    async def chat_json(system_prompt, user_content):
+        prompts.append(user_content)
+        # A map step that does not condense anything: its notes are as long as its chunk
+        if system_prompt == SYSTEM_PROMPT_REPORTER_CHUNK:
+            return {"notes": " ".join(user_content.splitlines())}
+        return {"ok": True}
+
+    monkeypatch.setattr(reporter_agent, "_chat_json", chat_json)
+    monkeypatch.setattr(settings, "BRIEFING_TOKEN_BUDGET", 500)
+    monkeypatch.setattr(settings, "BRIEFING_CHUNK_TOKENS", 250)
+    dropped_before = reporter_agent.DROPPED_LINES.value()
+
+    assert await reporter_agent.generate_mobile_briefing(day_of_logs(200)) == {"ok": True}
+
+    header = "New notifications (time|category|priority|summary) or notes:\n"
+    final = prompts[-1]
+    assert final.startswith(header)
+    assert estimate_tokens(final[len(header):]) <= 500
+    assert reporter_agent.DROPPED_LINES.value() > dropped_before
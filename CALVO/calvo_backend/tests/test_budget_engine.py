@@ -0,0 +1,84 @@
+# File: tests/test_budget_engine.py
+# Purpose: Budget engine running totals: write-through and reconciliation with other workers.
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, unit_of_work
+from app.modules.finance.models import Account, BudgetRule, Transaction
+from app.modules.finance.budget_manager import BudgetEngine, reevaluate
+from app.modules.finance.services import process_transaction
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_day_rule(user_id: int, limit: float):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            db.add(BudgetRule(user_id=user_id, window="DAY", limit_amount=limit, currency="VND"))
+
+
+async def withdraw(amount: float) -> dict:
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            return await process_transaction(db, user_id=1, institution_name="MB Bank", amount=amount,
+                                             transaction_type="WITHDRAW")
+
+
+async def deposit_elsewhere(amount: float):
+    # Recorded by another worker: this process's account index does not see it
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            account = (await db.execute(select(Account).where(Account.user_id == 1))).scalar_one()
+            db.add(Transaction(user_id=1, account_id=account.id, amount=amount, currency="VND",
+                               type_of_transaction="DEPOSIT", created_at=datetime.now()))
+            await db.execute(update(Account).where(Account.id == account.id).values(balance=Account.balance + amount))
+
+
+async def violations(engine: BudgetEngine, amount: float) -> int:
+    async with AsyncSessionLocal() as db:
+        return len(await engine.evaluate(db, 1, 1, "MB Bank", amount, 0.0, datetime.now()))
+
+
+async def test_withdrawals_accumulate_in_the_day_window(fresh_db):
+    await add_day_rule(1, 100000)
+
+    assert not (await withdraw(60000))["is_over_budget_alert"]
+    assert (await withdraw(60000))["is_over_budget_alert"]
+
+
+async def test_spend_of_other_workers_is_reconciled(fresh_db, monkeypatch):
+    await add_day_rule(1, 100000)
+    await withdraw(1000)  # Creates the account
+    other_worker = BudgetEngine(max_users=10)
+    assert await violations(other_worker, 30000) == 0  # Loaded: 1000 spent
+
+    await withdraw(80000)  # Recorded by this process's engine only
+
+    monkeypatch.setattr(settings, "BUDGET_RECONCILE_SECONDS", 3600)
+    assert await violations(other_worker, 30000) == 0  # Still within the reconcile interval
+    monkeypatch.setattr(settings, "BUDGET_RECONCILE_SECONDS", 0)
+    assert await violations(other_worker, 30000) == 1  # Reloaded from the rollups: 81000 + 30000
+
+
+async def test_percent_of_balance_uses_the_database_balance(fresh_db):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            db.add(BudgetRule(user_id=1, window="TRANSACTION", percent_of_balance=0.5))
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await process_transaction(db, user_id=1, institution_name="MB Bank", amount=100.0, transaction_type="DEPOSIT")
+    await deposit_elsewhere(1000)
+
+    result = await withdraw(200)  # 200 of 1100, under half
+    assert not result["is_over_budget_alert"]
+    await deposit_elsewhere(1000)  # After the withdrawal: the index still says 900
+
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            assert (await reevaluate(db, 1))["alerts"] == 0
+        alerts = (await db.execute(select(Transaction.is_over_budget_alert))).scalars().all()
+    assert not any(alerts)
@@ -0,0 +1,95 @@
+# File: tests/test_classification_cache.py
+# Purpose: Template-fingerprint cache (memory tier, SQLite tier, TTL).
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.modules.gatekeeper import agent as gatekeeper_agent
+from app.modules.gatekeeper.cache import (
+    ClassificationCache, template_fingerprint, summary_template, fill_summary, classification_cache
+)
+
+pytestmark = pytest.mark.anyio
+
+VALUE = {"classification": "FINANCE", "priority": 4, "is_spam": False}
+
+
+def test_fingerprint_ignores_amounts_and_accounts():
+    a = template_fingerprint("com.mbmobile", "Bien dong", "TK ****1234 +5,000,000VND luc 10:22")
+    b = template_fingerprint("com.mbmobile", "Bien dong", "TK ****9876 +120,000VND luc 08:05")
+    assert a == b
+
+
+async def test_memory_hit_and_miss():
+    cache = ClassificationCache(max_entries=10)
+    assert await cache.get("k") is None
+    await cache.put("k", VALUE)
+    assert await cache.get("k") == VALUE
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+async def test_persistent_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    await ClassificationCache(db_path=path).put("k", VALUE)
+
+    restarted = ClassificationCache(db_path=path)
+    assert await restarted.get("k") == VALUE
+    assert restarted.stats()["persistent_hits"] == 1
+    assert restarted.contains("k")  # Promoted to the memory tier
+
+
+async def test_expired_entries_are_misses(tmp_path):
+    cache = ClassificationCache(ttl_seconds=0, db_path=str(tmp_path / "cache.db"))
+    await cache.put("k", VALUE)
+    assert await cache.get("k") is None
+
+
+CONTENT = "TK ****1234 -50,000VND lúc 10:22 SD: 1,000,000VND"
+NEXT_CONTENT = "TK ****9876 -120,000VND lúc 08:05 SD: 880,000VND"
+
+
+def test_summary_template_is_filled_with_the_new_numbers():
+    template = summary_template("Rút 50.000 VND từ TK ****1234, số dư 1,000,000 VND", "MB Bank", CONTENT)
+
+    assert template == "Rút <v1> VND từ TK ****<v0>, số dư <v4> VND"
+    assert fill_summary(template, "MB Bank", NEXT_CONTENT) == "Rút 120,000 VND từ TK ****9876, số dư 880,000 VND"
+
+
+def test_summary_with_untraceable_numbers_is_not_templated():
+    assert summary_template("Đã chi 3 lần hôm nay", "MB Bank", CONTENT) is None  # 3: not in the notification
+    assert summary_template("Số dư 10", "MB Bank", "10:10 SD 5") is None  # 10: which one?
+    assert fill_summary(None, "MB Bank", CONTENT) is None
+
+
+class SummaryModel:
+    """
+    client.chat.completions returning a fixed, already redacted summary.
+    """
+
+    def __init__(self, summary: str):
+        self.summary = summary
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps({"classification": "OTHER", "priority": 5, "is_spam": False,
+                              "summary": self.summary, "confidence_score": 0.95})
+        return SimpleNamespace(model="gpt-4o-mini", usage=None,
+                               choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def test_cache_hit_never_returns_the_raw_notification(monkeypatch):
+    model = SummaryModel("Mã OTP đăng nhập Vietcombank, hiệu lực 5 phút")
+    monkeypatch.setattr(gatekeeper_agent.client.chat, "completions", model)
+    classification_cache.clear()
+
+    first = await gatekeeper_agent.classify_notification(
+        "Vietcombank", "Ma OTP 482913 dang nhap VCB, hieu luc 5 phut. Khong chia se.", "Vietcombank", None)
+    hit = await gatekeeper_agent.classify_notification(
+        "Vietcombank", "Ma OTP 771054 dang nhap VCB, hieu luc 5 phut. Khong chia se.", "Vietcombank", None)
+
+    assert model.calls == 1 and hit["cached"]
+    assert hit["summary"] == first["summary"] == "Mã OTP đăng nhập Vietcombank, hiệu lực 5 phút"
+    assert "771054" not in hit["summary"]
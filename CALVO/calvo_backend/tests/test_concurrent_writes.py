@@ -0,0 +1,73 @@
+# File: tests/test_concurrent_writes.py
+# Purpose: Concurrent write path on the default SQLite mode (no group-commit writer).
+# Note: Regression test: deferred read-then-write transactions used to fail with "database is locked".
+
+import asyncio
+
+import pytest
+from sqlalchemy import select, func
+
+from app.core.database import AsyncSessionLocal, unit_of_work
+from app.modules.finance.models import Account, Transaction
+from app.modules.gatekeeper.models import NotificationLog
+
+pytestmark = pytest.mark.anyio
+
+
+def notification(user_id: int, amount: int) -> dict:
+    return {
+        "user_id": user_id,
+        "source_app": "MB Bank",  # The stand-in model only treats known bank app names as FINANCE
+        "title": "MB Bank",
+        "content": f"TK ****1234 -{amount:,}VND lúc 10:22 SD: 1,000,000VND",
+        "received_at": "2026-10-18T10:00:00",
+    }
+
+
+async def count(model) -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def test_read_then_write_units_of_work_do_not_fail(fresh_db):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            db.add(Account(user_id=1, institution_name="MB Bank", balance=0.0))
+
+    async def increment():
+        async with AsyncSessionLocal() as db:
+            async with unit_of_work(db):
+                account = (await db.execute(select(Account).where(Account.user_id == 1))).scalar_one()
+                await asyncio.sleep(0.005)  # Let the other transactions read in between
+                account.balance += 1
+
+    await asyncio.gather(*(increment() for _ in range(30)))
+
+    async with AsyncSessionLocal() as db:
+        account = (await db.execute(select(Account).where(Account.user_id == 1))).scalar_one()
+    assert account.balance == 30  # Serialized: no lost update, no "database is locked"
+
+
+async def test_concurrent_webhooks_all_persist(client):
+    responses = await asyncio.gather(*(
+        client.post("/api/v1/webhook", json=notification(user_id, 10000 + user_id)) for user_id in range(1, 61)
+    ))
+
+    assert [r.status_code for r in responses] == [200] * 60
+    assert await count(NotificationLog) == 60
+    assert await count(Transaction) == 60
+    assert await count(Account) == 60
+
+
+async def test_concurrent_batches_all_persist(client):
+    async def batch(user_id: int):
+        items = [notification(user_id, 20000), notification(user_id, 30000)]
+        return await client.post("/api/v1/webhook/batch", json={"items": items})
+
+    responses = await asyncio.gather(*(batch(user_id) for user_id in range(1, 41)))
+
+    assert [r.status_code for r in responses] == [200] * 40
+    failures = [item for r in responses for item in r.json()["results"] if not item["success"]]
+    assert failures == []
+    assert await count(NotificationLog) == 80
+    assert await count(Account) == 40
@@ -0,0 +1,72 @@
+# File: tests/test_dedup.py
+# Purpose: Reposted notifications: memory hit, DB hit after a memory miss, in-flight originals.
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, func
+
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper.cache import classification_cache
+from app.modules.gatekeeper.dedup import dedup_key, recent_notifications
+from app.modules.gatekeeper.models import NotificationLog
+
+pytestmark = pytest.mark.anyio
+
+NOTIFICATION = {
+    "user_id": 1,
+    "source_app": "MB Bank",  # The stand-in model only treats known bank app names as FINANCE
+    "title": "MB Bank",
+    "content": "TK ****1234 -50,000VND lúc 10:22 SD: 1,000,000VND",
+    "received_at": "2026-10-18T10:00:00",
+}
+
+
+async def logs() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(NotificationLog))).scalar_one()
+
+
+async def test_repost_in_memory_returns_the_original(client, fake_llm):
+    first = (await client.post("/api/v1/webhook", json=NOTIFICATION)).json()
+    calls = len(fake_llm.calls)
+
+    again = (await client.post("/api/v1/webhook", json=NOTIFICATION)).json()
+
+    assert again == first
+    assert len(fake_llm.calls) == calls
+    assert recent_notifications.stats()["hits"] == 1
+    assert await logs() == 1
+
+
+async def test_memory_miss_is_answered_from_the_stored_log(client, fake_llm):
+    first = (await client.post("/api/v1/webhook", json=NOTIFICATION)).json()
+    calls = len(fake_llm.calls)
+    # Another worker / a restart: nothing in this process's memory
+    recent_notifications.clear()
+    classification_cache.clear()
+
+    again = (await client.post("/api/v1/webhook", json=NOTIFICATION)).json()
+
+    assert len(fake_llm.calls) == calls  # Pipeline not run again
+    assert (again["classification"], again["is_spam"]) == (first["classification"], first["is_spam"])
+    assert await logs() == 1
+
+
+async def test_concurrent_reposts_run_the_pipeline_once(client, fake_llm):
+    responses = await asyncio.gather(*(client.post("/api/v1/webhook", json=NOTIFICATION) for _ in range(5)))
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len({r.text for r in responses}) == 1
+    assert await logs() == 1
+
+
+def test_key_changes_with_the_window_only():
+    def request(received_at: str, content: str = NOTIFICATION["content"]):
+        return SimpleNamespace(**{**NOTIFICATION, "content": content, "received_at": datetime.fromisoformat(received_at)})
+
+    base = dedup_key(request("2026-10-18T10:00:00"))
+    assert dedup_key(request("2026-10-18T10:00:00", "TK ****1234  -50,000VND lúc 10:22\nSD: 1,000,000VND")) == base
+    assert dedup_key(request("2026-10-18T12:00:00")) != base
@@ -0,0 +1,63 @@
+# File: tests/test_group_commit_writer.py
+# Purpose: Group-commit writer: shutdown and batch failures never leave a caller waiting.
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core import database
+from app.core.database import AsyncSessionLocal, GroupCommitWriter, run_write
+from app.modules.finance.models import Account
+
+pytestmark = pytest.mark.anyio
+
+
+def add_account(name: str):
+    async def work(db):
+        db.add(Account(user_id=1, institution_name=name, balance=0.0, currency="VND"))
+        await db.flush()
+        return name
+    return work
+
+
+async def account_count() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count(Account.id)))).scalar_one()
+
+
+async def test_stop_writes_everything_already_queued(fresh_db):
+    writer = GroupCommitWriter(max_batch=2, window_ms=50)
+    writer.start()
+    writes = [asyncio.create_task(writer.submit(add_account(f"Bank {i}"))) for i in range(5)]
+    await asyncio.sleep(0)  # All five queued
+    await writer.stop()
+
+    assert [write.result() for write in writes] == [f"Bank {i}" for i in range(5)]
+    assert not writer.is_running
+    assert await account_count() == 5
+
+
+async def test_failed_batch_stops_the_writer_and_writes_fall_back(fresh_db, monkeypatch):
+    writer = GroupCommitWriter(max_batch=1, window_ms=0)
+    writer.start()
+    monkeypatch.setattr(database, "group_writer", writer)
+
+    def broken():
+        raise RuntimeError("no connection")
+
+    monkeypatch.setattr(writer, "_session_factory", broken)
+    async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+        results = await asyncio.wait_for(asyncio.gather(
+            run_write(first, add_account("MB Bank")),
+            run_write(second, add_account("VCB")),  # Queued behind the failing batch
+            return_exceptions=True,
+        ), timeout=5)
+
+    assert isinstance(results[0], RuntimeError) and str(results[0]) == "no connection"
+    assert results[1] == "VCB"
+    assert not writer.is_running
+    async with AsyncSessionLocal() as db:
+        assert await run_write(db, add_account("ACB")) == "ACB"  # Straight to a unit of work
+    assert await account_count() == 2
+    await writer.stop()
@@ -0,0 +1,123 @@
+# File: tests/test_ingestion_queue.py
+# Purpose: Durable ingestion queue: claiming, lease recovery, processing and retries.
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.database import AsyncSessionLocal
+from app.modules.gatekeeper import services as gatekeeper_services
+from app.modules.gatekeeper.models import IngestionJob
+from app.modules.gatekeeper.queue import IngestionQueue
+from app.modules.gatekeeper.schemas import WebhookRequest
+
+pytestmark = pytest.mark.anyio
+
+
+def new_queue(lease: float = 300.0) -> IngestionQueue:
+    return IngestionQueue(workers=2, max_attempts=2, retry_backoff=0.01, poll_interval=0.02, lease=lease)
+
+
+def request(user_id: int = 1) -> WebhookRequest:
+    return WebhookRequest(
+        user_id=user_id,
+        source_app="MB Bank",  # The stand-in model only treats known bank app names as FINANCE
+        title="MB Bank",
+        content="TK ****1234 -50,000VND lúc 10:22 SD: 1,000,000VND",
+        received_at=datetime(2026, 10, 18, 10, 0),
+    )
+
+
+async def jobs() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(IngestionJob).order_by(IngestionJob.id))).scalars().all()
+
+
+async def wait_for(status: str, timeout: float = 5.0) -> list:
+    for _ in range(int(timeout / 0.02)):
+        current = await jobs()
+        if current and all(job.status == status for job in current):
+            return current
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"jobs did not reach {status}: {[job.status for job in await jobs()]}")
+
+
+async def test_concurrent_claims_never_share_a_job(fresh_db):
+    queue = new_queue()
+    for user_id in (1, 2):
+        await queue.enqueue(request(user_id))
+
+    claimed = await asyncio.gather(*(queue._claim() for _ in range(6)))
+
+    ids = [job.id for job in claimed if job is not None]
+    assert sorted(ids) == [job.id for job in await jobs()]
+    assert all(job.status == "RUNNING" and job.attempts == 1 for job in await jobs())
+
+
+async def test_only_expired_leases_are_recovered(fresh_db):
+    queue = new_queue(lease=60)
+    for user_id in (1, 2):
+        await queue.enqueue(request(user_id))
+    live, crashed = await queue._claim(), await queue._claim()
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IngestionJob).where(IngestionJob.id == crashed.id).values(updated_at=datetime.now() - timedelta(minutes=5))
+        )
+        await db.commit()
+
+    assert await queue.recover_expired() == 1
+    assert {job.id: job.status for job in await jobs()} == {live.id: "RUNNING", crashed.id: "PENDING"}
+
+
+async def test_workers_process_jobs(fresh_db, fake_llm):
+    queue = new_queue()
+    for user_id in (1, 2, 3):
+        await queue.enqueue(request(user_id))
+    await queue.start()
+    try:
+        done = await wait_for("DONE")
+    finally:
+        await queue.stop()
+
+    assert [json.loads(job.result)["classification"] for job in done] == ["FINANCE"] * 3
+    assert queue.stats()["processed"] == 3
+
+
+async def test_failing_job_is_retried_then_dead_lettered(fresh_db, monkeypatch):
+    async def broken(db, req):
+        raise RuntimeError("pipeline down")
+
+    monkeypatch.setattr(gatekeeper_services, "ingest_notification", broken)
+    queue = new_queue()
+    await queue.enqueue(request())
+    await queue.start()
+    try:
+        [job] = await wait_for("DEAD")
+    finally:
+        await queue.stop()
+
+    assert job.attempts == 2
+    assert job.last_error == "pipeline down"
+    assert queue.stats()["retried"] == 1
+
+
+async def test_running_job_renews_its_lease(fresh_db, monkeypatch):
+    async def slow(db, req):
+        await asyncio.sleep(0.4)
+        return {"classification": "OTHER"}
+
+    monkeypatch.setattr(gatekeeper_services, "ingest_notification", slow)
+    queue, other_process = new_queue(lease=0.15), new_queue(lease=0.15)
+    await queue.enqueue(request())
+    await queue.start()
+    try:
+        await asyncio.sleep(0.3)  # Past the lease: only the renewals keep the job claimed
+        assert await other_process.recover_expired() == 0
+        [job] = await wait_for("DONE")
+    finally:
+        await queue.stop()
+
+    assert job.attempts == 1
@@ -0,0 +1,58 @@
+# File: tests/test_migrations.py
+# Purpose: `python -m app.core.migrations` on a database with the original (baseline) schema.
+
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT, TMP_DIR
+
+
+def run_cli(db_path: str) -> subprocess.CompletedProcess:
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}  # Not needed to migrate
+    env["DATABASE_URL"] = f"sqlite:///{db_path}"
+    return subprocess.run([sys.executable, "-m", "app.core.migrations"], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def baseline_copy(name: str) -> str:
+    # calvo.db as shipped: accounts, notification_logs, daily_briefings, schedules, transactions only
+    path = os.path.join(TMP_DIR, name)
+    shutil.copy(os.path.join(ROOT, "calvo.db"), path)
+    return path
+
+
+def test_cli_upgrades_a_baseline_database():
+    from app.core.database import Base
+    import app.core.migrations  # noqa: F401  (registers every model)
+
+    path = baseline_copy("baseline.db")
+    result = run_cli(path)
+    assert result.returncode == 0, result.stderr
+
+    with sqlite3.connect(path) as db:
+        tables = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        indexes = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        log_columns = {row[1] for row in db.execute("PRAGMA table_info(notification_logs)")}
+    assert set(Base.metadata.tables) <= tables
+    assert {"ux_accounts_user_institution", "ix_notification_logs_user_received"} <= indexes
+    assert {"priority", "is_risk", "dedup_key"} <= log_columns
+
+
+def test_duplicate_accounts_are_merged_before_the_unique_index():
+    path = baseline_copy("duplicates.db")
+    with sqlite3.connect(path) as db:
+        db.executemany("INSERT INTO accounts (id, user_id, institution_name, balance, currency) VALUES (?, ?, ?, ?, ?)",
+                       [(1, 1, "MB Bank", 100.0, "VND"), (2, 1, "MB Bank", 50.0, "VND"), (3, 2, "MB Bank", 10.0, "VND")])
+        db.executemany("INSERT INTO transactions (user_id, account_id, amount, type_of_transaction) VALUES (?, ?, ?, ?)",
+                       [(1, 1, 100.0, "DEPOSIT"), (1, 2, 50.0, "DEPOSIT")])
+
+    result = run_cli(path)
+    assert result.returncode == 0, result.stderr
+
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT id, user_id, balance FROM accounts ORDER BY id").fetchall() == [(1, 1, 150.0), (3, 2, 10.0)]
+        assert db.execute("SELECT DISTINCT account_id FROM transactions").fetchall() == [(1,)]
+        assert db.execute("SELECT count(*) FROM sqlite_master WHERE name = 'ux_accounts_user_institution'").fetchone() == (1,)
@@ -0,0 +1,47 @@
+# File: tests/test_prompt_compaction.py
+# Purpose: Prompt compaction: normalization and one token ceiling shared by a prompt's fields.
+
+import pytest
+
+from app.core.config import settings
+from app.modules.prompt_compaction import compact, compact_fields, normalize, TRUNCATION_MARKER
+
+
+@pytest.fixture
+def ceiling(monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_COMPACTION_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_INPUT_TOKEN_CEILINGS", {"gatekeeper": 50})
+    return 50
+
+
+def test_normalize_drops_noise():
+    text = "Giao dịch​ thành công!!!!!!\n\nGiao dịch​ thành công!!!!!!\n  SD:   1,000,000VND "
+    assert normalize(text) == "Giao dịch thành công!!! SD: 1,000,000VND"
+
+
+def test_fields_within_the_ceiling_are_only_normalized(ceiling):
+    assert compact_fields("gatekeeper", "TK  -50,000VND", " MB Bank ") == ["TK -50,000VND", "MB Bank"]
+
+
+def test_long_title_and_content_share_one_budget(ceiling):
+    content, title = "nội dung " * 100, "tiêu đề " * 100
+
+    short_content, short_title = compact_fields("gatekeeper", content, title)
+
+    assert len(short_content) + len(short_title) <= ceiling * 4
+    assert TRUNCATION_MARKER in short_content and TRUNCATION_MARKER in short_title
+
+
+def test_short_field_stays_whole_and_the_long_one_gets_the_rest(ceiling):
+    content, title = " ".join(f"dòng{i}" for i in range(300)), "MB Bank"
+
+    short_content, short_title = compact_fields("gatekeeper", content, title)
+
+    assert short_title == "MB Bank"
+    assert len(short_content) + len(short_title) <= ceiling * 4
+    assert len(short_content) > ceiling * 4 - 20  # Nearly all of the budget
+
+
+def test_agent_without_a_ceiling_is_not_truncated(ceiling):
+    text = " ".join(f"dòng{i}" for i in range(300))
+    assert compact("cfo", text) == text
@@ -0,0 +1,87 @@
+# File: tests/test_rollups.py
+# Purpose: Daily spending rollups: the ON CONFLICT upsert, period buckets and the backfill.
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.database import AsyncSessionLocal, unit_of_work
+from app.modules.finance.models import DailySpendingRollup
+from app.modules.finance.rollups import record_rollup, upsert_statement, spending_by_period, backfill_rollups
+from app.modules.finance.services import process_transaction
+
+pytestmark = pytest.mark.anyio
+
+DAY = date(2026, 10, 14)  # A Wednesday
+
+
+async def record(day: date, amount: float, transaction_type: str = "WITHDRAW", account_id: int = 1):
+    async with AsyncSessionLocal() as db:
+        async with unit_of_work(db):
+            await record_rollup(db, 1, account_id, day, transaction_type, "VND", amount)
+
+
+async def rollups() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(DailySpendingRollup).order_by(DailySpendingRollup.day, DailySpendingRollup.type_of_transaction)
+        )).scalars().all()
+
+
+async def test_same_bucket_is_summed_in_one_row(fresh_db):
+    await record(DAY, 50000)
+    await record(DAY, 25000)
+
+    [row] = await rollups()
+    assert (row.day, row.total_amount, row.tx_count) == (DAY, 75000, 2)
+
+
+async def test_key_parts_keep_separate_rows(fresh_db):
+    await record(DAY, 50000)
+    await record(DAY, 10000, transaction_type="DEPOSIT")
+    await record(DAY, 20000, account_id=2)
+    await record(date(2026, 10, 15), 30000)
+
+    assert len(await rollups()) == 4
+
+
+async def test_concurrent_upserts_lose_no_update(fresh_db):
+    await asyncio.gather(*(record(DAY, 1000) for _ in range(25)))
+
+    [row] = await rollups()
+    assert (row.total_amount, row.tx_count) == (25000, 25)
+
+
+def test_upsert_compiles_for_postgresql():
+    sql = str(upsert_statement("postgresql", [{
+        "user_id": 1, "account_id": 1, "day": DAY, "type_of_transaction": "WITHDRAW",
+        "currency": "VND", "total_amount": 1.0, "tx_count": 1,
+    }]).compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (user_id, account_id, day, type_of_transaction) DO UPDATE" in sql
+
+
+async def test_period_buckets(fresh_db):
+    await record(date(2026, 10, 12), 10000)  # Monday
+    await record(DAY, 20000)
+    await record(date(2026, 10, 20), 40000)  # Next week
+
+    async with AsyncSessionLocal() as db:
+        weeks = await spending_by_period(db, 1, date(2026, 10, 1), date(2026, 10, 31), "week", "WITHDRAW", "VND")
+    assert [(w["period_start"], w["total"], w["count"]) for w in weeks] == [
+        (date(2026, 10, 12), 30000, 2), (date(2026, 10, 19), 40000, 1)
+    ]
+
+
+async def test_backfill_matches_incremental_rollups(fresh_db):
+    for amount, transaction_type in ((50000, "WITHDRAW"), (20000, "WITHDRAW"), (100000, "DEPOSIT")):
+        async with AsyncSessionLocal() as db:
+            async with unit_of_work(db):
+                await process_transaction(db, user_id=1, institution_name="MB Bank", amount=amount,
+                                          transaction_type=transaction_type)
+    incremental = [(r.type_of_transaction, r.total_amount, r.tx_count) for r in await rollups()]
+
+    assert await asyncio.to_thread(backfill_rollups) == 2
+    assert [(r.type_of_transaction, r.total_amount, r.tx_count) for r in await rollups()] == incremental
@@ -0,0 +1,77 @@
+# File: tests/test_tracing.py
+# Purpose: Sampling decides per trace: a trace is exported whole or not at all.
+
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+from app.core import tracing
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+CALLS = 200
+
+
+class StubBackend:
+    name = "stub"
+
+    def export(self, spans: list):
+        pass
+
+    def flush(self):
+        pass
+
+
+@pytest.fixture
+def buffered(monkeypatch):
+    """
+    An exporter that is never started: finished spans stay in its buffer.
+    """
+    exporter = tracing.BatchSpanExporter(StubBackend(), buffer_size=10 * CALLS, batch_size=100, flush_interval=1.0)
+    monkeypatch.setattr(tracing, "exporter", exporter)
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 0.5)
+    return exporter
+
+
+def traces(exporter) -> dict:
+    by_trace = defaultdict(list)
+    while not exporter._buffer.empty():
+        span = exporter._buffer.get_nowait()
+        by_trace[span.trace_id].append(span.name)
+    return {trace_id: sorted(names) for trace_id, names in by_trace.items()}
+
+
+def test_sync_traces_are_all_or_nothing(buffered):
+    @tracing.trace("child", route="test.child")
+    def child():
+        return 1
+
+    @tracing.trace("parent", route="test.parent")
+    def parent():
+        return child() + child()
+
+    for _ in range(CALLS):
+        parent()
+
+    recorded = traces(buffered)
+    assert 0 < len(recorded) < CALLS
+    assert all(names == ["child", "child", "parent"] for names in recorded.values())
+
+
+async def test_async_traces_are_all_or_nothing(buffered):
+    @tracing.trace("child", route="test.child")
+    async def child():
+        await asyncio.sleep(0)
+        return 1
+
+    @tracing.trace("parent", route="test.parent")
+    async def parent():
+        return sum(await asyncio.gather(child(), child()))
+
+    await asyncio.gather(*(parent() for _ in range(CALLS)))
+
+    recorded = traces(buffered)
+    assert 0 < len(recorded) < CALLS
+    assert all(names == ["child", "child", "parent"] for names in recorded.values())
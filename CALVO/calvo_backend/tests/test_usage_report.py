@@ -0,0 +1,39 @@
+# File: tests/test_usage_report.py
+# Purpose: LLM usage report endpoints: operator token on /report, bearer token on /me.
+
+import pytest
+
+from app.core.config import settings
+from app.core.security import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+REPORT = "/api/v1/usage/report?start=2026-10-01&end=2026-10-31"
+
+
+async def test_report_requires_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+
+    assert (await client.get(REPORT)).status_code == 403
+    assert (await client.get(REPORT, headers={"X-Admin-Token": "wrong"})).status_code == 403
+    response = await client.get(REPORT, headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json()["total"]["calls"] == 0
+
+
+async def test_report_is_disabled_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+
+    assert (await client.get(REPORT, headers={"X-Admin-Token": ""})).status_code == 403
+
+
+async def test_own_usage_needs_a_signed_in_user(client):
+    assert (await client.get("/api/v1/usage/me")).status_code == 401
+    response = await client.get("/api/v1/usage/me", headers={"Authorization": f"Bearer {create_access_token(7)}"})
+    assert response.status_code == 200
+
+
+async def test_inverted_range_is_rejected(client):
+    response = await client.get("/api/v1/usage/me?start=2026-10-31&end=2026-10-01",
+                                headers={"Authorization": f"Bearer {create_access_token(7)}"})
+    assert response.status_code == 400